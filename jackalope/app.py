@@ -6,8 +6,13 @@
     Run Jackalope's VendorCoordinator.
 
 """
+import logging
+import signal
+
 import tornado.httpserver
 import tornado.ioloop
+import tornado.netutil
+import tornado.process
 import tornado.web
 from tornado.options import options
 
@@ -15,6 +20,13 @@ from redflag import redflag
 
 import settings
 from urls import url_patterns
+from handlers.admission import AdmissionController
+from model.affinity import Affinity
+from model.data.db_worker import DbWorker
+from model.intake import IntakeQueue
+from model.pool import pool
+from model.sweeper import Sweeper
+from model.worker.registry import WorkerRegistry
 
 
 class VendorCoordinatorApp(tornado.web.Application):
@@ -22,12 +34,23 @@ class VendorCoordinatorApp(tornado.web.Application):
     """ The Tornado instance for VendorCoordinator. """
 
 
-    def __init__(self):
-        """ Construct a Tornado application. """
+    def __init__(self, affinity):
+        """ Construct a Tornado application.
+
+        affinity is this process's share of the task pairs when the server
+        runs as several processes.
+
+        """
         settings_dict = settings.settings
         tornado.web.Application.__init__(self, url_patterns, **settings_dict)
 
+        self.affinity = affinity
+
         self.initialize_mailer()
+        self.initialize_admission()
+        self.initialize_registry()
+        self.initialize_intake()
+        self.initialize_sweeper()
 
 
     def initialize_mailer(self):
@@ -37,12 +60,121 @@ class VendorCoordinatorApp(tornado.web.Application):
                 "jack@sendjack.com")
 
 
+    def initialize_admission(self):
+        self.admission = AdmissionController(
+                settings.ADMISSION_ROUTE_LIMIT,
+                settings.ADMISSION_VENDOR_LIMIT,
+                settings.ADMISSION_LIMITS,
+                settings.ADMISSION_RETRY_AFTER)
+
+
+    def initialize_registry(self):
+        self.registry = WorkerRegistry()
+        self._registry_refresher = None
+        self._synched_ts_flusher = None
+
+
+    def initialize_intake(self):
+        self.intake = IntakeQueue(
+                settings.INTAKE_CONSUMERS,
+                settings.INTAKE_POLL_INTERVAL,
+                settings.INTAKE_LEASE,
+                settings.INTAKE_MAX_ATTEMPTS,
+                settings.INTAKE_DEBOUNCE,
+                settings.INTAKE_VENDOR_CONCURRENCY,
+                self.affinity,
+                self.registry)
+
+
+    def initialize_sweeper(self):
+        self.sweeper = Sweeper(
+                settings.SWEEP_INTERVAL,
+                settings.SWEEP_FULL_INTERVAL,
+                self.affinity,
+                self.registry)
+
+
+    def start(self, run_sweeper):
+        """Build the shared workers, then start the background services."""
+        self.registry.start()
+        if settings.REGISTRY_REFRESH_INTERVAL:
+            self._registry_refresher = tornado.ioloop.PeriodicCallback(
+                    self.refresh_registry,
+                    settings.REGISTRY_REFRESH_INTERVAL * 1000)
+            self._registry_refresher.start()
+
+        # buffered synched_ts updates are also flushed when they get old, but
+        # only when another update comes in to notice.
+        self._synched_ts_flusher = tornado.ioloop.PeriodicCallback(
+                self.flush_synched_ts,
+                settings.SYNCHED_TS_FLUSH_INTERVAL * 1000)
+        self._synched_ts_flusher.start()
+
+        self.intake.start()
+        if run_sweeper:
+            self.sweeper.start()
+
+
+    def refresh_registry(self):
+        """Rebuild the shared workers on the worker pool."""
+        pool.run(self.registry.refresh, callback=lambda result: None)
+
+
+    def flush_synched_ts(self):
+        """Write the buffered synched_ts updates on the worker pool."""
+        pool.run(_flush_synched_ts, callback=lambda result: None)
+
+
+    def shutdown(self):
+        """Stop the background services and release the shared workers."""
+        logging.info("shutting down")
+        if self._registry_refresher:
+            self._registry_refresher.stop()
+        if self._synched_ts_flusher:
+            self._synched_ts_flusher.stop()
+        self.sweeper.stop()
+        self.intake.stop()
+        self.registry.shutdown()
+        _flush_synched_ts()
+        tornado.ioloop.IOLoop.instance().stop()
+
+
+def _flush_synched_ts():
+    try:
+        DbWorker().flush_vendor_synched_ts()
+    except Exception:
+        # the updates stay buffered for the next flush.
+        logging.exception("could not flush synched_ts updates")
+
+
 def main():
-    """ main loop for Python script. """
-    app = VendorCoordinatorApp()
+    """ main loop for Python script.
+
+    With more than one process the sockets are bound first and then the
+    server forks; the app, its database connections, worker pool and vendor
+    workers are all built after the fork so every child owns its own.
+
+    """
+    process_count = settings.PROCESSES
+    if process_count <= 0:
+        process_count = tornado.process.cpu_count()
+
+    sockets = tornado.netutil.bind_sockets(options.port)
+    process_index = 0
+    if process_count > 1:
+        process_index = tornado.process.fork_processes(process_count)
+
+    app = VendorCoordinatorApp(Affinity(process_index, process_count))
     http_server = tornado.httpserver.HTTPServer(app)
-    http_server.listen(options.port)
-    tornado.ioloop.IOLoop.instance().start()
+    http_server.add_sockets(sockets)
+    # one scheduled sweep is enough; it queues the pairs other processes own.
+    app.start(process_index == 0)
+
+    io_loop = tornado.ioloop.IOLoop.instance()
+    signal.signal(
+            signal.SIGTERM,
+            lambda signum, frame: io_loop.add_callback(app.shutdown))
+    io_loop.start()
 
 
 if __name__ == "__main__":
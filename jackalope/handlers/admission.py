@@ -0,0 +1,175 @@
+"""
+    admission
+    ---------
+
+    Admission control for the handlers. Every route and every vendor has a
+    limit on requests in flight; a request over either limit is answered 503
+    with a Retry-After header instead of piling more work on the process.
+
+"""
+from jutil.decorators import constant
+
+from model.metrics import metrics
+
+from .metered import MeteredHandler
+
+
+class _AdmissionField(object):
+
+    """Keys of the admission stats dict."""
+
+    @constant
+    def ROUTES(self):
+        return "routes"
+
+    @constant
+    def VENDORS(self):
+        return "vendors"
+
+    @constant
+    def IN_FLIGHT(self):
+        return "in_flight"
+
+    @constant
+    def LIMIT(self):
+        return "limit"
+
+    @constant
+    def REJECTED(self):
+        return "rejected"
+
+ADMISSION_FIELD = _AdmissionField()
+
+
+class AdmissionController(object):
+
+    """Count requests in flight per route and per vendor and turn away the
+    ones over the limit. Only used from the IOLoop thread.
+
+    Attributes
+    ----------
+    retry_after : `int`
+        Seconds rejected clients are told to wait.
+    _route_limit : `int`
+    _vendor_limit : `int`
+    _limits : {name, `int`}
+        Overrides for individual routes (handler class names) or vendors.
+    _in_flight : {name, `int`}
+    _rejected : {name, `int`}
+    _route_names : set
+    _vendor_names : set
+
+    """
+
+
+    def __init__(self, route_limit, vendor_limit, limits, retry_after):
+        self.retry_after = retry_after
+        self._route_limit = route_limit
+        self._vendor_limit = vendor_limit
+        self._limits = limits
+        self._in_flight = {}
+        self._rejected = {}
+        self._route_names = set()
+        self._vendor_names = set()
+
+
+    def admit(self, route_name, vendor_name=None):
+        """Take a slot for the route and vendor and return True, or count a
+        rejection and return False if either is full."""
+        names = [route_name]
+        self._route_names.add(route_name)
+        if vendor_name:
+            names.append(vendor_name)
+            self._vendor_names.add(vendor_name)
+
+        for name in names:
+            if self._in_flight.get(name, 0) >= self._get_limit(name):
+                self._rejected[name] = self._rejected.get(name, 0) + 1
+                metrics.increment("admission_rejected_total", name=name)
+                return False
+
+        for name in names:
+            self._in_flight[name] = self._in_flight.get(name, 0) + 1
+        return True
+
+
+    def release(self, route_name, vendor_name=None):
+        """Give back the slots taken by admit."""
+        self._in_flight[route_name] -= 1
+        if vendor_name:
+            self._in_flight[vendor_name] -= 1
+
+
+    def stats(self):
+        """Return in flight, limit and rejection counts per route and
+        vendor."""
+        return {
+                ADMISSION_FIELD.ROUTES: self._stats_for(self._route_names),
+                ADMISSION_FIELD.VENDORS: self._stats_for(self._vendor_names),
+                }
+
+
+    def _stats_for(self, names):
+        stats = {}
+        for name in names:
+            stats[name] = {
+                    ADMISSION_FIELD.IN_FLIGHT: self._in_flight.get(name, 0),
+                    ADMISSION_FIELD.LIMIT: self._get_limit(name),
+                    ADMISSION_FIELD.REJECTED: self._rejected.get(name, 0),
+                    }
+        return stats
+
+
+    def _get_limit(self, name):
+        default_limit = self._route_limit
+        if name in self._vendor_names:
+            default_limit = self._vendor_limit
+        return self._limits.get(name, default_limit)
+
+
+class AdmittedHandler(MeteredHandler):
+
+    """A MeteredHandler that goes through the app's AdmissionController
+    before doing any work. Rejected requests are metered as shed, not as
+    errors.
+
+    Attributes
+    ----------
+    vendor : str, optional
+        Subclasses that serve a vendor are also limited per vendor.
+    _admitted : `bool`
+
+    """
+
+    vendor = None
+
+
+    def prepare(self):
+        super(AdmittedHandler, self).prepare()
+        self._admitted = False
+        admission = self.application.admission
+        if admission.admit(self._route_name(), self.vendor):
+            self._admitted = True
+        else:
+            self._shed = True
+            self.set_status(503)
+            self.set_header("Retry-After", str(admission.retry_after))
+            self.finish()
+
+
+    def on_finish(self):
+        super(AdmittedHandler, self).on_finish()
+        self._release()
+
+
+    def on_connection_close(self):
+        super(AdmittedHandler, self).on_connection_close()
+        self._release()
+
+
+    def _release(self):
+        if self._admitted:
+            self._admitted = False
+            self.application.admission.release(
+                    self._route_name(),
+                    self.vendor)
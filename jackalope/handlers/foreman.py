@@ -2,16 +2,44 @@
     foreman
     ----
 
-    Handle incoming requests to check all tasks.
+    Report on and trigger the background sweep over all tasks.
+
+    GET /jackalope used to run a sweep inside the request. It now only
+    reports on the sweep; sweeps run on the Sweeper's schedule
+    (--sweep_interval) or when something POSTs to /jackalope, so a cron job
+    or monitor that swept with GET has to POST instead.
 
 """
 import tornado.web
+from tornado import gen
+
+from .admission import AdmittedHandler
+
 
-from model.foreman import Foreman
+class ForemanHandler(AdmittedHandler):
 
+    """GET reports the current or last sweep of any server process and never
+    starts one. POST starts a sweep unless one is already running in any
+    process, and answers 202 if it started."""
 
-class ForemanHandler(tornado.web.RequestHandler):
+    def initialize(self):
+        self._sweeper = self.application.sweeper
 
+
+    @tornado.web.asynchronous
+    @gen.engine
     def get(self):
-        foreman = Foreman()
-        foreman.send_jack()
+        status = yield gen.Task(self._sweeper.status)
+        self.write(status)
+        self.finish()
+
+
+    @tornado.web.asynchronous
+    @gen.engine
+    def post(self):
+        started = yield gen.Task(self._sweeper.trigger)
+        if started:
+            self.set_status(202)
+        status = yield gen.Task(self._sweeper.status)
+        self.write(status)
+        self.finish()
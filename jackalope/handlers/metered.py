@@ -0,0 +1,63 @@
+"""
+    metered
+    -------
+
+    Base handler that records per-route latency, request, error, shed and
+    in-flight metrics.
+
+"""
+import tornado.web
+
+from model.metrics import metrics
+
+
+class MeteredHandler(tornado.web.RequestHandler):
+
+    """Record every request's latency and outcome under its route, the
+    handler class name.
+
+    Attributes
+    ----------
+    _metered : `bool`
+        True while this request is counted in the in-flight gauge.
+    _shed : `bool`
+        True if the request was turned away to shed load; it is counted as
+        shed rather than as an error.
+
+    """
+
+    def prepare(self):
+        self._metered = True
+        self._shed = False
+        metrics.add_to_gauge("requests_in_flight", 1, route=self._route_name())
+
+
+    def on_finish(self):
+        self._stop_metering()
+        route = self._route_name()
+        metrics.observe(
+                "request_seconds",
+                self.request.request_time(),
+                route=route)
+        metrics.increment("requests_total", route=route)
+        if self._shed:
+            metrics.increment("requests_shed_total", route=route)
+        elif self.get_status() >= 500:
+            metrics.increment("request_errors_total", route=route)
+
+
+    def on_connection_close(self):
+        self._stop_metering()
+
+
+    def _stop_metering(self):
+        if self._metered:
+            self._metered = False
+            metrics.add_to_gauge(
+                    "requests_in_flight",
+                    -1,
+                    route=self._route_name())
+
+
+    def _route_name(self):
+        return type(self).__name__
@@ -0,0 +1,28 @@
+"""
+    status
+    ------
+
+    Report how the process is holding up under load.
+
+"""
+import tornado.web
+
+from model.metrics import metrics
+
+
+class AdmissionHandler(tornado.web.RequestHandler):
+
+    """Report requests in flight, limits and rejections per route and
+    vendor, for sizing capacity."""
+
+    def get(self):
+        self.write(self.application.admission.stats())
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+
+    """Serve every metric in the Prometheus text exposition format."""
+
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4")
+        self.write(metrics.render())
@@ -5,26 +5,95 @@
     Callback handlers for any notifications from Task Rabbit.
 
 """
+import logging
+
+from tornado import gen
+
+from jutil.decorators import constant
+
 from model.worker.transformer import FIELD
 from model.worker.task_rabbit_employee import TASK_RABBIT, TASK_RABBIT_FIELD
 
 from .vendor import TaskVendorHandler, CommentVendorHandler
 
 
+class _ItemStatus(object):
+
+    """Per-item results reported back for a batch notification."""
+
+    @constant
+    def ACCEPTED(self):
+        return "accepted"
+
+    @constant
+    def COALESCED(self):
+        return "coalesced"
+
+    @constant
+    def FAILED(self):
+        return "failed"
+
+ITEM_STATUS = _ItemStatus()
+
+
 class TaskRabbitTaskHandler(TaskVendorHandler):
 
+    """Handle single and batch task notifications. A batch is enqueued
+    concurrently on the worker pool, one failed item doesn't affect the
+    others, and the per-item results are returned in the response."""
+
     vendor = TASK_RABBIT.VENDOR
 
 
-    def _process_request(self):
+    @gen.engine
+    def _process_request(self, callback):
+        response = None
         if self._id is not None:
-            self._foreman.send_jack_for_task(self.vendor, self._id)
+            yield gen.Task(self._intake.enqueue_task, self.vendor, self._id)
         else:
             body = self._get_request_body()
             items = body.get(TASK_RABBIT_FIELD.ITEMS)
+            # a batch can name the same task more than once.
+            ids = []
             for item in items:
-                id = item.get(TASK_RABBIT_FIELD.TASK).get(FIELD.ID)
-                self._foreman.send_jack_for_task(self.vendor, id)
+                id = self._get_item_id(item)
+                if id is None or id not in ids:
+                    ids.append(id)
+
+            statuses = yield [
+                    gen.Task(self._enqueue_item, id)
+                    for id in ids
+                    ]
+            response = {
+                    TASK_RABBIT_FIELD.ITEMS: [
+                            {FIELD.ID: id, FIELD.STATUS: status}
+                            for (id, status) in zip(ids, statuses)
+                            ]
+                    }
+        callback(response)
+
+
+    @gen.engine
+    def _enqueue_item(self, id, callback):
+        status = ITEM_STATUS.FAILED
+        if id is not None:
+            try:
+                job = yield gen.Task(
+                        self._intake.enqueue_task,
+                        self.vendor,
+                        id)
+                if job:
+                    status = ITEM_STATUS.ACCEPTED
+                else:
+                    status = ITEM_STATUS.COALESCED
+            except Exception:
+                logging.exception("could not enqueue task %s", id)
+        callback(status)
+
+
+    def _get_item_id(self, item):
+        task = item.get(TASK_RABBIT_FIELD.TASK) or {}
+        return task.get(FIELD.ID)
 
 
 class TaskRabbitCommentHandler(CommentVendorHandler):
@@ -12,38 +12,57 @@
 """
 import json
 import tornado.web
+from tornado import gen
 
-from model.foreman import Foreman
 from model.comment import COMMENT
 
+from .admission import AdmittedHandler
 
-class VendorHandler(tornado.web.RequestHandler):
+
+class VendorHandler(AdmittedHandler):
 
     """Handle incoming requests from vendors.
 
+    Notifications are persisted to the application's IntakeQueue and
+    answered with 202 Accepted; the reconciliation happens in the background.
+    If _process_request passes a dict to its callback, it is written as the
+    response body. Requests over the route or vendor limit get a 503.
+
     Attributes:
     -----------
     vendor : str
     _id : str
-    _foreman : Foreman
+    _intake : IntakeQueue
 
     """
 
     def initialize(self):
-        self._foreman = Foreman()
+        self._intake = self.application.intake
 
 
+    @tornado.web.asynchronous
+    @gen.engine
     def get(self, id=None):
         self._id = id
-        self._process_request()
+        response = yield gen.Task(self._process_request)
+        self.set_status(202)
+        if response is not None:
+            self.write(response)
+        self.finish()
 
 
+    @tornado.web.asynchronous
+    @gen.engine
     def post(self, id=None):
         self._id = id
-        self._process_request()
+        response = yield gen.Task(self._process_request)
+        self.set_status(202)
+        if response is not None:
+            self.write(response)
+        self.finish()
 
 
-    def _process_request(self):
+    def _process_request(self, callback):
         raise NotImplementedError()
 
 
@@ -55,16 +74,24 @@ class TaskVendorHandler(VendorHandler):
 
     """Handle incoming task requests."""
 
-    def _process_request(self):
-        self._foreman.send_jack_for_task(self.vendor, self._id)
+    @gen.engine
+    def _process_request(self, callback):
+        yield gen.Task(self._intake.enqueue_task, self.vendor, self._id)
+        callback()
 
 
 class CommentVendorHandler(VendorHandler):
 
     """Handle incoming comment requests."""
 
-    def _process_request(self):
+    @gen.engine
+    def _process_request(self, callback):
         body = self._get_request_body()
         message = body.get(COMMENT.MESSAGE)
 
-        self._foreman.ferry_comment(self.vendor, self._id, message)
+        yield gen.Task(
+                self._intake.enqueue_comment,
+                self.vendor,
+                self._id,
+                message)
+        callback()
@@ -0,0 +1,236 @@
+"""
+    actions
+    -------
+
+    Reconciliation is split into planning and execution. A Workflow plans:
+    it works out in memory what has to change and returns a list of Actions
+    without writing anything. The ActionExecutor then runs the Actions.
+
+    The executor groups the Actions by target, which is a vendor or the
+    database. The groups run concurrently on the write pool, and the Actions
+    within a group run in the order they were planned, so a write and the
+    comment that follows it still arrive in that order. None of the vendor
+    APIs take batched writes, so grouping and concurrency are where the I/O
+    savings come from. The executor takes Actions planned for any number of
+    pairs at once.
+
+"""
+import sys
+
+from jutil.decorators import constant
+from jutil.errors import OverrideRequiredError
+
+from .data.db_worker import DbWorker
+from .metrics import metrics
+from .pool import write_pool
+from .unit_of_work import current_unit_of_work, joined
+
+
+class _ActionTarget(object):
+
+    @constant
+    def DATABASE(self):
+        """Actions on our own database rather than a vendor's."""
+        return "database"
+
+ACTION_TARGET = _ActionTarget()
+
+
+class Action(object):
+
+    """One write planned by a Workflow.
+
+    Attributes
+    ----------
+    target : str
+        The vendor name, or ACTION_TARGET.DATABASE.
+
+    """
+
+
+    def __init__(self, target):
+        self.target = target
+
+
+    def run(self):
+        raise OverrideRequiredError()
+
+
+class UpdateTask(Action):
+
+    """Push a Task to its service."""
+
+
+    def __init__(self, worker, task):
+        super(UpdateTask, self).__init__(worker.name)
+        self._worker = worker
+        self._task = task
+
+
+    def run(self):
+        self._worker.update_task(self._task)
+
+
+class AddComment(Action):
+
+    """Post a comment on a task in a service."""
+
+
+    def __init__(self, worker, task_id, message):
+        super(AddComment, self).__init__(worker.name)
+        self._worker = worker
+        self._task_id = task_id
+        self._message = message
+
+
+    def run(self):
+        self._worker.add_comment(self._task_id, self._message)
+
+
+class FerryComment(Action):
+
+    """Post a comment from one task on its reciprocal task once.
+
+    The comment is claimed in the ferried_comments ledger before it is
+    posted and marked ferried after, so a reconciliation that is retried
+    after a partial failure doesn't post it a second time. The claim is
+    taken out again if posting fails. If the process dies between the claim
+    and the mark, the claim stays pending until lease_expired_ts catches up
+    with it, and then a later sweep posts the comment: losing a comment is
+    worse than posting it twice.
+
+    """
+
+
+    def __init__(
+            self,
+            comment,
+            vendor_task_id,
+            vendor_name,
+            reciprocal_worker,
+            reciprocal_task_id,
+            lease_expired_ts):
+        super(FerryComment, self).__init__(reciprocal_worker.name)
+        self._comment = comment
+        self._vendor_task_id = vendor_task_id
+        self._vendor_name = vendor_name
+        self._reciprocal_worker = reciprocal_worker
+        self._reciprocal_task_id = reciprocal_task_id
+        self._lease_expired_ts = lease_expired_ts
+
+
+    def run(self):
+        db_worker = DbWorker()
+        is_claimed = db_worker.claim_comment_ferry(
+                self._comment.id(),
+                self._vendor_name,
+                self._vendor_task_id,
+                self._reciprocal_task_id,
+                self._reciprocal_worker.name,
+                self._lease_expired_ts)
+        if not is_claimed:
+            metrics.increment("comments_already_ferried_total")
+            return
+
+        try:
+            self._reciprocal_worker.add_comment(
+                    self._reciprocal_task_id,
+                    self._comment.message())
+        except Exception:
+            db_worker.release_comment_ferry(
+                    self._comment.id(),
+                    self._vendor_name)
+            raise
+
+        db_worker.mark_comment_ferried(self._comment.id(), self._vendor_name)
+
+
+class UpdateCommentCursor(Action):
+
+    """Move a vendor task's comment cursor past the comments ferried from
+    it. It targets the vendor the comments went to, so it runs after them
+    and not at all if one of them fails."""
+
+
+    def __init__(
+            self,
+            target,
+            vendor_task_id,
+            vendor_name,
+            cursor_ts,
+            cursor_id):
+        super(UpdateCommentCursor, self).__init__(target)
+        self._vendor_task_id = vendor_task_id
+        self._vendor_name = vendor_name
+        self._cursor_ts = cursor_ts
+        self._cursor_id = cursor_id
+
+
+    def run(self):
+        DbWorker().update_comment_cursor(
+                self._vendor_task_id,
+                self._vendor_name,
+                self._cursor_ts,
+                self._cursor_id)
+
+
+class UpdateSynchedTs(Action):
+
+    """Record when a vendor task was last synched."""
+
+
+    def __init__(self, vendor_task_id, vendor_name, synched_ts):
+        super(UpdateSynchedTs, self).__init__(ACTION_TARGET.DATABASE)
+        self._vendor_task_id = vendor_task_id
+        self._vendor_name = vendor_name
+        self._synched_ts = synched_ts
+
+
+    def run(self):
+        DbWorker().update_vendor_synched_ts(
+                self._vendor_task_id,
+                self._vendor_name,
+                self._synched_ts)
+
+
+class ActionExecutor(object):
+
+    """Run planned Actions, one concurrent group per target."""
+
+
+    def execute(self, actions):
+        """Run every Action and block until they are done. Every group runs
+        to its end or its first failure; then the first failure, if any, is
+        raised."""
+        groups = {}
+        for action in actions:
+            groups.setdefault(action.target, []).append(action)
+
+        if not groups:
+            return
+        # the pool threads join this thread's UnitOfWork so that what the
+        # writes return stays visible to it.
+        work = current_unit_of_work()
+        if len(groups) == 1:
+            outcomes = [_run_group(work, groups.values()[0])]
+        else:
+            outcomes = write_pool.map(
+                    lambda group: _run_group(work, group),
+                    groups.values())
+
+        for exc_info in outcomes:
+            if exc_info:
+                raise exc_info[0], exc_info[1], exc_info[2]
+
+
+def _run_group(work, actions):
+    """Run actions in order and return the exc_info of the first failure, or
+    None."""
+    with joined(work):
+        for action in actions:
+            try:
+                action.run()
+            except Exception:
+                return sys.exc_info()
+            metrics.increment("actions_executed_total", target=action.target)
+    return None
@@ -0,0 +1,33 @@
+"""
+    affinity
+    --------
+
+    When the server runs as several processes, every vendor task pair belongs
+    to exactly one of them. Affinity describes this process's share so the
+    intake consumers and the sweep only reconcile the pairs they own, and two
+    processes never work on the same pair at once.
+
+"""
+
+
+class Affinity(object):
+
+    """This process's share of the task pairs.
+
+    Attributes
+    ----------
+    process_index : `int`
+    process_count : `int`
+
+    """
+
+
+    def __init__(self, process_index=0, process_count=1):
+        self.process_index = process_index
+        self.process_count = process_count
+
+
+    def owns(self, task_affinity):
+        """Return True if this process reconciles a pair with the given
+        affinity hash."""
+        return task_affinity % self.process_count == self.process_index
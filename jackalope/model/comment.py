@@ -30,6 +30,8 @@ class Comment(object):
 
     """
 
+    __slots__ = ("_id", "_created_ts", "_message")
+
 
     def __init__(self, id, created_ts, message):
         self._id = id
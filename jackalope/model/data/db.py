@@ -3,23 +3,32 @@
     db
     --
 
-    Database singleton.
+    Database singleton. Each thread gets its own Postgres connection because
+    psycopg2 cursors cannot be shared between threads. Connections are opened
+    on first use so that forked server processes never share one.
 
 """
+import threading
 
 from postgres import Postgres
 
 
-class _DatabseSingleton(object):
+class _DatabseSingleton(threading.local):
 
 
     def __init__(self):
-        self._db = Postgres()
+        self._db = None
 
 
     @property
     def db(self):
+        if self._db is None:
+            self._db = Postgres()
         return self._db
 
 
-db = _DatabseSingleton().db
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+
+db = _DatabseSingleton()
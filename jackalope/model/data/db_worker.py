@@ -10,9 +10,13 @@
     is for another day.
 
 """
+import zlib
+from time import time
+
 from jutil.decorators import constant
 
 from .db import db
+from .write_behind import synched_ts_buffer
 
 
 class _JackField(object):
@@ -43,9 +47,89 @@ class _JackField(object):
     def SYNCHED_TS(self):
         return "synched_ts"
 
+    @constant
+    def JOB_ID(self):
+        return "job_id"
+
+    @constant
+    def KIND(self):
+        return "kind"
+
+    @constant
+    def MESSAGE(self):
+        return "message"
+
+    @constant
+    def AFFINITY(self):
+        return "affinity"
+
+    @constant
+    def ATTEMPTS(self):
+        return "attempts"
+
+    @constant
+    def RUN_AFTER_TS(self):
+        return "run_after_ts"
+
+    @constant
+    def CREATED_TS(self):
+        return "created_ts"
+
+    @constant
+    def SWEEP_NAME(self):
+        return "sweep_name"
+
+    @constant
+    def MODIFIED_SINCE_TS(self):
+        return "modified_since_ts"
+
+    @constant
+    def FULL_SWEEP_TS(self):
+        return "full_sweep_ts"
+
+    @constant
+    def COMMENT_CURSOR_TS(self):
+        return "comment_cursor_ts"
+
+    @constant
+    def COMMENT_CURSOR_ID(self):
+        return "comment_cursor_id"
+
+    @constant
+    def VENDOR_COMMENT_ID(self):
+        return "vendor_comment_id"
+
+    @constant
+    def CLAIMED_TS(self):
+        return "claimed_ts"
+
+    @constant
+    def FERRIED_TS(self):
+        return "ferried_ts"
+
 JACK_FIELD = _JackField()
 
 
+class _LockNamespace(object):
+
+    """The first key of each kind of Postgres advisory lock, keeping the
+    kinds apart."""
+
+    @constant
+    def PAIR(self):
+        return 1
+
+    @constant
+    def SWEEP(self):
+        return 2
+
+LOCK_NAMESPACE = _LockNamespace()
+
+# the Foreman's sweep over every employer; its lock key and status row.
+_SWEEP_KEY = 0
+_SWEEP_NAME = "send_jack"
+
+
 class DbWorker(object):
 
     """Interface between the database and the Jackalope objects."""
@@ -53,6 +137,10 @@ class DbWorker(object):
 
     def __init__(self):
         self._vendor_tasks_table = db.vendor_tasks
+        self._webhook_jobs_table = db.webhook_jobs
+        self._sweep_watermarks_table = db.sweep_watermarks
+        self._sweep_status_table = db.sweep_status
+        self._ferried_comments_table = db.ferried_comments
 
 
     def does_task_exist(self, vendor_task_id, vendor_name):
@@ -87,16 +175,227 @@ class DbWorker(object):
 
 
     def get_synched_ts(self, vendor_task_id, vendor_name):
+        # a buffered update is newer than the row.
+        synched_ts = synched_ts_buffer.get(vendor_task_id, vendor_name)
+        if synched_ts is not None:
+            return synched_ts
+
         result_dict = self._vendor_tasks_table.read_by_pk(
                 vendor_task_id,
                 vendor_name)
 
-        synched_ts = None
         if result_dict:
             synched_ts = result_dict.get(JACK_FIELD.SYNCHED_TS)
 
         return synched_ts
 
+
+    def get_synched_ts_many(self, vendor_task_ids, vendor_name):
+        """Return the synched_ts of many vendor tasks in one query, as a dict
+        keyed on the unicode vendor_task_id. Tasks without a row are left
+        out."""
+        ids = [unicode(vendor_task_id) for vendor_task_id in vendor_task_ids]
+        synched_ts_by_id = dict(self._vendor_tasks_table.read_synched_ts_many(
+                ids,
+                vendor_name))
+
+        # a buffered update is newer than the row.
+        for vendor_task_id in ids:
+            synched_ts = synched_ts_buffer.get(vendor_task_id, vendor_name)
+            if synched_ts is not None:
+                synched_ts_by_id[vendor_task_id] = synched_ts
+        return synched_ts_by_id
+
+
+    def get_pair_states(self, vendor_task_ids, vendor_name):
+        """Return a dict keyed on the unicode vendor_task_id of (fingerprint,
+        reciprocal_vendor_task_id, reciprocal_vendor_name,
+        reciprocal_fingerprint, reciprocal_status_code) as of the pair's last
+        reconciliation, read in one query. Unpaired tasks are left out."""
+        rows = self._vendor_tasks_table.read_pair_states_many(
+                [unicode(task_id) for task_id in vendor_task_ids],
+                vendor_name)
+        return dict([(row[0], row[1:]) for row in rows])
+
+
+    def update_fingerprints(self, fingerprints):
+        """Store the fingerprints and status codes of reconciled tasks.
+        fingerprints is a list of (vendor_task_id, vendor_name, fingerprint,
+        status_code)."""
+        if not fingerprints:
+            return 0
+
+        return self._vendor_tasks_table.update_fingerprint_many([
+                (unicode(vendor_task_id), vendor_name, fingerprint, code)
+                for (vendor_task_id, vendor_name, fingerprint, code)
+                        in fingerprints
+                ])
+
+
+    def get_comment_cursor(self, vendor_task_id, vendor_name):
+        """Return (cursor_ts, cursor_id) of the last comment read from the
+        vendor task. Without a cursor that is (synched_ts, None)."""
+        result_dict = self._vendor_tasks_table.read_by_pk(
+                vendor_task_id,
+                vendor_name)
+        if not result_dict:
+            return (None, None)
+
+        cursor_ts = result_dict.get(JACK_FIELD.COMMENT_CURSOR_TS)
+        if cursor_ts is None:
+            return (self.get_synched_ts(vendor_task_id, vendor_name), None)
+        return (cursor_ts, result_dict.get(JACK_FIELD.COMMENT_CURSOR_ID))
+
+
+    def update_comment_cursor(
+            self,
+            vendor_task_id,
+            vendor_name,
+            cursor_ts,
+            cursor_id):
+        properties = {
+                JACK_FIELD.COMMENT_CURSOR_TS: cursor_ts,
+                JACK_FIELD.COMMENT_CURSOR_ID: unicode(cursor_id),
+                }
+
+        return self._vendor_tasks_table.update_by_pk(
+                vendor_task_id,
+                vendor_name,
+                properties)
+
+
+    def get_settled_comment_ids(
+            self,
+            vendor_comment_ids,
+            vendor_name,
+            lease_expired_ts):
+        """Return the set of unicode ids of the comments that were ferried or
+        are claimed by a sweep whose lease hasn't expired since
+        lease_expired_ts, checked in one query. The rest need ferrying."""
+        return self._ferried_comments_table.read_settled_ids_many(
+                [unicode(comment_id) for comment_id in vendor_comment_ids],
+                vendor_name,
+                lease_expired_ts)
+
+
+    def claim_comment_ferry(
+            self,
+            vendor_comment_id,
+            vendor_name,
+            vendor_task_id,
+            reciprocal_task_id,
+            reciprocal_vendor_name,
+            lease_expired_ts):
+        """Claim the comment in the ledger and return True, or return False
+        if it was ferried or another sweep's claim on it is still live. A
+        pending claim from before lease_expired_ts is taken over."""
+        claimed_ts = int(time())
+        properties = {
+                JACK_FIELD.VENDOR_COMMENT_ID: unicode(vendor_comment_id),
+                JACK_FIELD.VENDOR_NAME: vendor_name,
+                JACK_FIELD.VENDOR_TASK_ID: unicode(vendor_task_id),
+                JACK_FIELD.RECIPROCAL_VENDOR_TASK_ID: unicode(
+                        reciprocal_task_id),
+                JACK_FIELD.RECIPROCAL_VENDOR_NAME: reciprocal_vendor_name,
+                JACK_FIELD.CLAIMED_TS: claimed_ts,
+                JACK_FIELD.FERRIED_TS: None,
+                }
+
+        if self._ferried_comments_table.create_unless_exists(properties):
+            return True
+
+        return self._ferried_comments_table.reclaim_expired(
+                unicode(vendor_comment_id),
+                vendor_name,
+                claimed_ts,
+                lease_expired_ts) is not None
+
+
+    def mark_comment_ferried(self, vendor_comment_id, vendor_name):
+        """Record that a claimed comment was sent, settling its claim."""
+        return self._ferried_comments_table.update_by_pk(
+                unicode(vendor_comment_id),
+                vendor_name,
+                {JACK_FIELD.FERRIED_TS: int(time())})
+
+
+    def release_comment_ferry(self, vendor_comment_id, vendor_name):
+        """Take a comment that couldn't be sent back out of the ledger."""
+        return self._ferried_comments_table.delete_by_pk(
+                unicode(vendor_comment_id),
+                vendor_name)
+
+
+    def get_pair_key(self, vendor_task_id, vendor_name, is_employer):
+        """Return a key naming the task's pair. The key is always the
+        employer task's vendor and id: an employee task is resolved to its
+        employer task through the reciprocal lookup, so both tasks in a pair
+        get the same key. An employee task that hasn't been paired yet is
+        keyed on itself."""
+        if not is_employer:
+            (reciprocal_task_id, reciprocal_vendor_name) = (
+                    self.get_reciprocal_task_info(vendor_task_id, vendor_name))
+            if reciprocal_task_id:
+                vendor_task_id = reciprocal_task_id
+                vendor_name = reciprocal_vendor_name
+
+        return unicode("{}:{}").format(vendor_name, unicode(vendor_task_id))
+
+
+    def get_task_affinity(self, vendor_task_id, vendor_name, is_employer):
+        """Return a stable, non-negative hash of the task's pair key."""
+        key = self.get_pair_key(vendor_task_id, vendor_name, is_employer)
+        return zlib.crc32(key.encode("utf-8")) & 0xffffffff
+
+
+    def lock_pair(self, pair_key):
+        """Block until this thread's connection holds the advisory lock on the
+        pair key, shutting out every other process sharing the database."""
+        db.lock(LOCK_NAMESPACE.PAIR, _get_lock_key(pair_key))
+
+
+    def unlock_pair(self, pair_key):
+        db.unlock(LOCK_NAMESPACE.PAIR, _get_lock_key(pair_key))
+
+
+    def try_lock_sweep(self):
+        """Take the sweep advisory lock on this thread's connection and
+        return True, or return False if a sweep is running in any process."""
+        return db.try_lock(LOCK_NAMESPACE.SWEEP, _SWEEP_KEY)
+
+
+    def unlock_sweep(self):
+        db.unlock(LOCK_NAMESPACE.SWEEP, _SWEEP_KEY)
+
+
+    def get_sweep_status(self):
+        """Return the shared status of the current or last sweep as a dict,
+        or None if there hasn't been one."""
+        result_dict = self._sweep_status_table.read_by_pk(_SWEEP_NAME)
+        if not result_dict:
+            return None
+
+        status = dict(result_dict)
+        status.pop(JACK_FIELD.SWEEP_NAME)
+        return status
+
+
+    def update_sweep_status(self, properties):
+        """Write the sweep status; only call it holding the sweep lock."""
+        return self._sweep_status_table.create_or_update_by_pk(
+                _SWEEP_NAME,
+                properties)
+
+
+    def update_running_sweep_status(self, started_ts, properties):
+        """Write the progress of the sweep that started at started_ts unless
+        it has already finished."""
+        return self._sweep_status_table.update_if_running(
+                _SWEEP_NAME,
+                started_ts,
+                properties)
+
+
     def create_vendor_task(
             self,
             vendor_task_id,
@@ -120,15 +419,150 @@ class DbWorker(object):
             vendor_task_id,
             vendor_name,
             synched_ts):
+        """Buffer the update; it is written with others on the next flush."""
+        synched_ts_buffer.add(vendor_task_id, vendor_name, synched_ts)
+
+
+    def flush_vendor_synched_ts(self):
+        """Write the buffered synched_ts updates now."""
+        synched_ts_buffer.flush()
+
+
+    def get_sweep_watermark(self, vendor_name):
+        """Return (modified_since_ts, full_sweep_ts) for the employer, either
+        of which is None if there hasn't been a clean sweep of that kind."""
+        result_dict = self._sweep_watermarks_table.read_by_pk(vendor_name)
+        if not result_dict:
+            return (None, None)
+
+        return (
+                result_dict.get(JACK_FIELD.MODIFIED_SINCE_TS),
+                result_dict.get(JACK_FIELD.FULL_SWEEP_TS))
+
+
+    def update_sweep_watermark(
+            self,
+            vendor_name,
+            modified_since_ts,
+            full_sweep_ts=None):
+        """Move the employer's watermark to modified_since_ts, and its last
+        full sweep to full_sweep_ts if given."""
         properties = {
-                JACK_FIELD.SYNCHED_TS: synched_ts
+                JACK_FIELD.MODIFIED_SINCE_TS: modified_since_ts,
                 }
+        if full_sweep_ts is not None:
+            properties[JACK_FIELD.FULL_SWEEP_TS] = full_sweep_ts
 
-        return self._vendor_tasks_table.update_by_pk(
-                vendor_task_id,
+        return self._sweep_watermarks_table.create_or_update_by_pk(
                 vendor_name,
                 properties)
 
 
+    def create_webhook_job(
+            self,
+            kind,
+            vendor_name,
+            vendor_task_id,
+            is_employer,
+            message=None):
+        properties = {
+                JACK_FIELD.KIND: kind,
+                JACK_FIELD.VENDOR_NAME: vendor_name,
+                JACK_FIELD.VENDOR_TASK_ID: vendor_task_id,
+                JACK_FIELD.MESSAGE: message,
+                JACK_FIELD.AFFINITY: self.get_task_affinity(
+                        vendor_task_id,
+                        vendor_name,
+                        is_employer),
+                JACK_FIELD.CREATED_TS: int(time()),
+                }
+
+        return self._webhook_jobs_table.create(properties)
+
+
+    def create_or_coalesce_task_job(
+            self,
+            kind,
+            vendor_name,
+            vendor_task_id,
+            is_employer,
+            debounce_seconds):
+        """Create a task job that becomes ready after debounce_seconds, unless
+        one is already waiting for the task. Return the new job or None if the
+        notification was coalesced."""
+        current_ts = int(time())
+        properties = {
+                JACK_FIELD.KIND: kind,
+                JACK_FIELD.VENDOR_NAME: vendor_name,
+                JACK_FIELD.VENDOR_TASK_ID: vendor_task_id,
+                JACK_FIELD.AFFINITY: self.get_task_affinity(
+                        vendor_task_id,
+                        vendor_name,
+                        is_employer),
+                JACK_FIELD.RUN_AFTER_TS: current_ts + debounce_seconds,
+                JACK_FIELD.CREATED_TS: current_ts,
+                }
+        pending_key = {
+                JACK_FIELD.KIND: kind,
+                JACK_FIELD.VENDOR_NAME: vendor_name,
+                JACK_FIELD.VENDOR_TASK_ID: vendor_task_id,
+                }
+
+        return self._webhook_jobs_table.create_unless_pending(
+                properties,
+                pending_key)
+
+
+    def claim_webhook_job(
+            self,
+            lease_seconds,
+            max_attempts,
+            excluded_vendor_names=(),
+            process_index=0,
+            process_count=1):
+        """Claim the next webhook job for lease_seconds and return it, or None
+        if no job is ready."""
+        current_ts = int(time())
+        return self._webhook_jobs_table.claim_next(
+                current_ts,
+                current_ts - lease_seconds,
+                max_attempts,
+                excluded_vendor_names,
+                process_index,
+                process_count)
+
+
+    def delete_webhook_job(self, job_id):
+        return self._webhook_jobs_table.delete_by_pk(job_id)
+
+
+    def dead_letter_webhook_job(self, job_id):
+        """Flag a job that failed its last attempt dead and return it."""
+        return self._webhook_jobs_table.dead_letter_by_pk(job_id, int(time()))
+
+
+    def dead_letter_exhausted_webhook_jobs(
+            self,
+            lease_seconds,
+            max_attempts,
+            process_index=0,
+            process_count=1):
+        """Flag the jobs that used up max_attempts and whose lease expired
+        dead and return them."""
+        current_ts = int(time())
+        return self._webhook_jobs_table.dead_letter_exhausted(
+                current_ts,
+                current_ts - lease_seconds,
+                max_attempts,
+                process_index,
+                process_count)
+
+
 #update_reciprocal_vendor_task_pk(reciprocal_vendor_task_pk)
 #get_vendor_name(vendor_task_id)
+
+
+def _get_lock_key(pair_key):
+    """Hash a pair key into the signed 32 bits an advisory lock key takes.
+    Two pairs sharing a hash only wait on each other."""
+    return zlib.crc32(pair_key.encode("utf-8"))
@@ -0,0 +1,158 @@
+"""
+
+    ferried_comments
+    ----------------
+
+    The ledger of comments ferried to the reciprocal task, keyed on the
+    comment they came from. A comment is claimed in the ledger before it is
+    sent, with claimed_ts set and ferried_ts NULL, and marked ferried once it
+    has been sent, so a retried reconciliation doesn't send it twice. A claim
+    is taken out again if sending fails. A claim that is still pending once
+    its lease has expired, because the process died between the claim and
+    the send, can be claimed again by a later sweep.
+
+    CREATE TABLE ferried_comments (
+        vendor_comment_id VARCHAR(32),
+        vendor_name VARCHAR(32),
+        vendor_task_id VARCHAR(32),
+        reciprocal_vendor_task_id VARCHAR(32),
+        reciprocal_vendor_name VARCHAR(32),
+        claimed_ts INTEGER,
+        ferried_ts INTEGER,
+        PRIMARY KEY (vendor_comment_id, vendor_name)
+    );
+
+"""
+
+import psycopg2
+
+from jutil.decorators import constant
+
+from table import _Table, Table
+
+
+class _FerriedCommentsTable(_Table):
+
+    @constant
+    def NAME(self):
+        return "ferried_comments"
+
+    @constant
+    def COLUMNS(self):
+        return [
+                "vendor_comment_id",
+                "vendor_name",
+                "vendor_task_id",
+                "reciprocal_vendor_task_id",
+                "reciprocal_vendor_name",
+                "claimed_ts",
+                "ferried_ts",
+                ]
+
+    @constant
+    def PRIMARY_KEY(self):
+        return [
+                "vendor_comment_id",
+                "vendor_name",
+                ]
+
+    @constant
+    def UNIQUE_KEYS(self):
+        return []
+
+    @constant
+    def FOREIGN_KEYS(self):
+        return []
+
+FERRIED_COMMENTS = _FerriedCommentsTable()
+
+
+class FerriedCommentsTable(Table):
+
+    def __init__(self, cursor):
+        super(FerriedCommentsTable, self).__init__(
+                FERRIED_COMMENTS.NAME,
+                FERRIED_COMMENTS.COLUMNS,
+                FERRIED_COMMENTS.PRIMARY_KEY,
+                cursor)
+
+        self._use_auto_key(False)
+
+
+    def _primary_key_properties(self, vendor_comment_id, vendor_name):
+        return {
+                FERRIED_COMMENTS.PRIMARY_KEY[0]: vendor_comment_id,
+                FERRIED_COMMENTS.PRIMARY_KEY[1]: vendor_name,
+                }
+
+
+    def create_unless_exists(self, properties):
+        """Create the row and return it, or return None if the comment is
+        already in the ledger."""
+        try:
+            return self._create_row(properties)
+        except psycopg2.IntegrityError:
+            return None
+
+
+    def read_by_pk(self, vendor_comment_id, vendor_name):
+        pk = self._primary_key_properties(vendor_comment_id, vendor_name)
+        return self._read_row(pk)
+
+
+    def update_by_pk(self, vendor_comment_id, vendor_name, properties):
+        pk = self._primary_key_properties(vendor_comment_id, vendor_name)
+        return self._update_row(pk, properties)
+
+
+    def delete_by_pk(self, vendor_comment_id, vendor_name):
+        pk = self._primary_key_properties(vendor_comment_id, vendor_name)
+        return self._delete_row(pk)
+
+
+    def reclaim_expired(
+            self,
+            vendor_comment_id,
+            vendor_name,
+            claimed_ts,
+            lease_expired_ts):
+        """Renew a pending claim whose lease has expired and return the row,
+        or return None if the comment was ferried or its claim is live. The
+        row lock keeps two sweeps from both taking over the claim."""
+        sql = (
+                "UPDATE {0} SET claimed_ts = %s "
+                "WHERE vendor_comment_id = %s AND vendor_name = %s "
+                "AND ferried_ts IS NULL "
+                "AND (claimed_ts IS NULL OR claimed_ts < %s) "
+                "RETURNING *").format(self._name)
+        return self._query_one(
+                sql,
+                [claimed_ts, vendor_comment_id, vendor_name, lease_expired_ts])
+
+
+    def read_settled_ids_many(
+            self,
+            vendor_comment_ids,
+            vendor_name,
+            lease_expired_ts):
+        """Return the set of vendor_comment_ids that were ferried or have a
+        live claim, in one query. Comments whose claim expired are left out,
+        so they are tried again."""
+        if not vendor_comment_ids:
+            return set()
+
+        sql = (
+                "SELECT vendor_comment_id FROM {} "
+                "WHERE vendor_name = %s "
+                "AND (ferried_ts IS NOT NULL OR claimed_ts >= %s) "
+                "AND vendor_comment_id IN ({})").format(
+                        self._name,
+                        ", ".join(["%s" for id in vendor_comment_ids]))
+        parameters = [vendor_name, lease_expired_ts] + list(
+                vendor_comment_ids)
+
+        self._cursor.execute(sql, parameters)
+        return set([
+                row["vendor_comment_id"]
+                for row in self._cursor.fetchall()
+                ])
@@ -27,6 +27,10 @@ from jutil import environment
 
 from database import Database
 from vendor_tasks import VENDOR_TASKS, VendorTasksTable
+from webhook_jobs import WEBHOOK_JOBS, WebhookJobsTable
+from sweep_watermarks import SWEEP_WATERMARKS, SweepWatermarksTable
+from sweep_status import SWEEP_STATUS, SweepStatusTable
+from ferried_comments import FERRIED_COMMENTS, FerriedCommentsTable
 #from tasks import TASKS, TasksTable
 
 
@@ -85,15 +89,63 @@ class Postgres(Database):
     def _load_tables(self):
         self._tables = {
                 VENDOR_TASKS.NAME: VendorTasksTable(self._cursor),
+                WEBHOOK_JOBS.NAME: WebhookJobsTable(self._cursor),
+                SWEEP_WATERMARKS.NAME: SweepWatermarksTable(self._cursor),
+                SWEEP_STATUS.NAME: SweepStatusTable(self._cursor),
+                FERRIED_COMMENTS.NAME: FerriedCommentsTable(self._cursor),
                 #TASKS.NAME: TasksTable(self._cursor),
                 }
 
 
+    def lock(self, namespace, key):
+        """Block until this connection holds the advisory lock (namespace,
+        key). Both are 32 bit signed integers. The lock is held until unlock
+        or until the connection closes."""
+        self._cursor.execute(
+                "SELECT pg_advisory_lock(%s, %s);",
+                (namespace, key))
+
+
+    def try_lock(self, namespace, key):
+        """Take the advisory lock (namespace, key) and return True, or return
+        False right away if another connection holds it."""
+        self._cursor.execute(
+                "SELECT pg_try_advisory_lock(%s, %s) AS locked;",
+                (namespace, key))
+        return self._cursor.fetchone()["locked"]
+
+
+    def unlock(self, namespace, key):
+        self._cursor.execute(
+                "SELECT pg_advisory_unlock(%s, %s);",
+                (namespace, key))
+
+
     @property
     def vendor_tasks(self):
         return self._tables.get(VENDOR_TASKS.NAME)
 
 
+    @property
+    def webhook_jobs(self):
+        return self._tables.get(WEBHOOK_JOBS.NAME)
+
+
+    @property
+    def sweep_watermarks(self):
+        return self._tables.get(SWEEP_WATERMARKS.NAME)
+
+
+    @property
+    def sweep_status(self):
+        return self._tables.get(SWEEP_STATUS.NAME)
+
+
+    @property
+    def ferried_comments(self):
+        return self._tables.get(FERRIED_COMMENTS.NAME)
+
+
     #@property
     #def tasks(self):
     #    return self._tables.get(TASKS.NAME)
@@ -0,0 +1,115 @@
+"""
+
+    sweep_status
+    ------------
+
+    The current or last sweep, shared by all server processes. Only the
+    process holding the sweep advisory lock writes it; any process can read
+    it to report on the sweep.
+
+    CREATE TABLE sweep_status (
+        sweep_name VARCHAR(32),
+        state VARCHAR(16),
+        started_ts DOUBLE PRECISION,
+        finished_ts DOUBLE PRECISION,
+        tasks_read INTEGER,
+        tasks_processed INTEGER,
+        tasks_routed INTEGER,
+        pairs_skipped INTEGER,
+        errors INTEGER,
+        sweeps INTEGER,
+        PRIMARY KEY (sweep_name)
+    );
+
+"""
+
+from jutil.decorators import constant
+
+from table import _Table, Table
+
+
+class _SweepStatusTable(_Table):
+
+    @constant
+    def NAME(self):
+        return "sweep_status"
+
+    @constant
+    def COLUMNS(self):
+        return [
+                "sweep_name",
+                "state",
+                "started_ts",
+                "finished_ts",
+                "tasks_read",
+                "tasks_processed",
+                "tasks_routed",
+                "pairs_skipped",
+                "errors",
+                "sweeps",
+                ]
+
+    @constant
+    def PRIMARY_KEY(self):
+        return [
+                "sweep_name",
+                ]
+
+    @constant
+    def UNIQUE_KEYS(self):
+        return []
+
+    @constant
+    def FOREIGN_KEYS(self):
+        return []
+
+SWEEP_STATUS = _SweepStatusTable()
+
+
+class SweepStatusTable(Table):
+
+    def __init__(self, cursor):
+        super(SweepStatusTable, self).__init__(
+                SWEEP_STATUS.NAME,
+                SWEEP_STATUS.COLUMNS,
+                SWEEP_STATUS.PRIMARY_KEY,
+                cursor)
+
+        self._use_auto_key(False)
+
+
+    def _primary_key_properties(self, sweep_name):
+        return {
+                SWEEP_STATUS.PRIMARY_KEY[0]: sweep_name,
+                }
+
+
+    def read_by_pk(self, sweep_name):
+        pk = self._primary_key_properties(sweep_name)
+        return self._read_row(pk)
+
+
+    def create_or_update_by_pk(self, sweep_name, properties):
+        pk = self._primary_key_properties(sweep_name)
+        return self._create_or_update_row(pk, properties)
+
+
+    def update_if_running(self, sweep_name, started_ts, properties):
+        """Update the row only while the sweep that started at started_ts
+        hasn't finished, so a late progress report can't overwrite the
+        final one. Return the row or None if it was left alone."""
+        if not self._in_columns(properties):
+            raise KeyError()
+
+        set_expressions = [column + " = %s" for column in properties.keys()]
+        parameters = properties.values() + [sweep_name, started_ts]
+
+        sql = (
+                "UPDATE {} SET {} "
+                "WHERE sweep_name = %s AND started_ts = %s "
+                "AND finished_ts IS NULL "
+                "RETURNING *").format(
+                        self._name,
+                        ", ".join(set_expressions))
+
+        return self._query_one(sql, parameters)
@@ -0,0 +1,81 @@
+"""
+
+    sweep_watermarks
+    ----------------
+
+    How far each employer has been swept. modified_since_ts is when the last
+    clean sweep of the employer started, so the next one only has to read
+    the tasks modified since. full_sweep_ts is when the last clean full sweep
+    started; the full sweeps catch anything the incremental ones missed.
+
+    CREATE TABLE sweep_watermarks (
+        vendor_name VARCHAR(32),
+        modified_since_ts INTEGER,
+        full_sweep_ts INTEGER,
+        PRIMARY KEY (vendor_name)
+    );
+
+"""
+
+from jutil.decorators import constant
+
+from table import _Table, Table
+
+
+class _SweepWatermarksTable(_Table):
+
+    @constant
+    def NAME(self):
+        return "sweep_watermarks"
+
+    @constant
+    def COLUMNS(self):
+        return [
+                "vendor_name",
+                "modified_since_ts",
+                "full_sweep_ts",
+                ]
+
+    @constant
+    def PRIMARY_KEY(self):
+        return [
+                "vendor_name",
+                ]
+
+    @constant
+    def UNIQUE_KEYS(self):
+        return []
+
+    @constant
+    def FOREIGN_KEYS(self):
+        return []
+
+SWEEP_WATERMARKS = _SweepWatermarksTable()
+
+
+class SweepWatermarksTable(Table):
+
+    def __init__(self, cursor):
+        super(SweepWatermarksTable, self).__init__(
+                SWEEP_WATERMARKS.NAME,
+                SWEEP_WATERMARKS.COLUMNS,
+                SWEEP_WATERMARKS.PRIMARY_KEY,
+                cursor)
+
+        self._use_auto_key(False)
+
+
+    def _primary_key_properties(self, vendor_name):
+        return {
+                SWEEP_WATERMARKS.PRIMARY_KEY[0]: vendor_name,
+                }
+
+
+    def read_by_pk(self, vendor_name):
+        pk = self._primary_key_properties(vendor_name)
+        return self._read_row(pk)
+
+
+    def create_or_update_by_pk(self, vendor_name, properties):
+        pk = self._primary_key_properties(vendor_name)
+        return self._create_or_update_row(pk, properties)
@@ -183,8 +183,16 @@ class Table(object):
 
 
     def _create_or_update_row(self, unique_key, properties):
-        # INSERT ... ON DUPLICATE KEY UPDATE
-        raise NotImplementedError()
+        """Update the row matching unique_key or create it if there is none.
+        This isn't atomic, so two concurrent creates of the same row make one
+        of them raise an IntegrityError."""
+        row = self._update_row(unique_key, dict(properties))
+        if row is None:
+            new_properties = dict(properties)
+            new_properties.update(unique_key)
+            row = self._create_row(new_properties)
+
+        return row
 
 
     def _read_row(self, unique_key):
@@ -228,7 +236,13 @@ class Table(object):
 
 
     def _delete_row(self, unique_key):
-        raise NotImplementedError()
+        (condition, parameters) = self._all_equal(unique_key)
+
+        sql = "DELETE FROM {} WHERE {} RETURNING *".format(
+                self._name,
+                condition)
+
+        return self._query_one(sql, parameters)
 
 
     def _query_one(self, sql, parameters):
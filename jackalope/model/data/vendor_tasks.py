@@ -3,6 +3,15 @@
     vendor_tasks
     ------------
 
+    comment_cursor_ts and comment_cursor_id mark the last comment read from
+    the vendor task, so only the comments after it are ferried. Rows from
+    before the cursor existed fall back on synched_ts.
+
+    fingerprint and status_code are the Task's fingerprint and status code
+    when its pair was last reconciled. A sweep skips a pair whose Tasks both
+    still have their fingerprints, and evaluates a pair it has no fresh
+    reciprocal status for with the stored one.
+
     CREATE TABLE vendor_tasks (
         vendor_task_id VARCHAR(32),
         vendor_name VARCHAR(32),
@@ -10,6 +19,10 @@
         reciprocal_vendor_task_id VARCHAR(32),
         reciprocal_vendor_name VARCHAR(32),
         synched_ts INTEGER,
+        comment_cursor_ts INTEGER,
+        comment_cursor_id VARCHAR(32),
+        fingerprint VARCHAR(40),
+        status_code SMALLINT,
         created_ts INTEGER,
         updated_ts INTEGER,
         deleted_ts INTEGER,
@@ -38,6 +51,10 @@ class _VendorTasksTable(_Table):
                 "reciprocal_vendor_task_id",
                 "reciprocal_vendor_name",
                 "synched_ts",
+                "comment_cursor_ts",
+                "comment_cursor_id",
+                "fingerprint",
+                "status_code",
                 "created_ts",
                 "updated_ts",
                 "deleted_ts",
@@ -112,3 +129,99 @@ class VendorTasksTable(Table):
     def delete_by_pk(self, vendor_task_id, vendor_name):
         pk = self._primary_key_properties(vendor_task_id, vendor_name)
         return self._delete_row(pk)
+
+
+    def read_synched_ts_many(self, vendor_task_ids, vendor_name):
+        """Return a list of (vendor_task_id, synched_ts) for the rows of
+        vendor_task_ids in one query."""
+        if not vendor_task_ids:
+            return []
+
+        sql = (
+                "SELECT vendor_task_id, synched_ts FROM {} "
+                "WHERE vendor_name = %s AND vendor_task_id IN ({})").format(
+                        self._name,
+                        ", ".join(["%s" for id in vendor_task_ids]))
+        parameters = [vendor_name] + list(vendor_task_ids)
+
+        self._cursor.execute(sql, parameters)
+        return [
+                (row["vendor_task_id"], row["synched_ts"])
+                for row in self._cursor.fetchall()
+                ]
+
+
+    def read_pair_states_many(self, vendor_task_ids, vendor_name):
+        """Return a list of (vendor_task_id, fingerprint,
+        reciprocal_vendor_task_id, reciprocal_vendor_name,
+        reciprocal_fingerprint, reciprocal_status_code) for the rows of
+        vendor_task_ids and their reciprocal rows in one query."""
+        if not vendor_task_ids:
+            return []
+
+        sql = (
+                "SELECT t.vendor_task_id, t.fingerprint, "
+                "t.reciprocal_vendor_task_id, t.reciprocal_vendor_name, "
+                "r.fingerprint AS reciprocal_fingerprint, "
+                "r.status_code AS reciprocal_status_code "
+                "FROM {} AS t JOIN {} AS r "
+                "ON r.vendor_task_id = t.reciprocal_vendor_task_id "
+                "AND r.vendor_name = t.reciprocal_vendor_name "
+                "WHERE t.vendor_name = %s "
+                "AND t.vendor_task_id IN ({})").format(
+                        self._name,
+                        self._name,
+                        ", ".join(["%s" for id in vendor_task_ids]))
+        parameters = [vendor_name] + list(vendor_task_ids)
+
+        self._cursor.execute(sql, parameters)
+        return [
+                (
+                        row["vendor_task_id"],
+                        row["fingerprint"],
+                        row["reciprocal_vendor_task_id"],
+                        row["reciprocal_vendor_name"],
+                        row["reciprocal_fingerprint"],
+                        row["reciprocal_status_code"])
+                for row in self._cursor.fetchall()
+                ]
+
+
+    def update_fingerprint_many(self, rows):
+        """Set fingerprint and status_code for many rows in one statement.
+        rows is a list of (vendor_task_id, vendor_name, fingerprint,
+        status_code)."""
+        placeholders = ["(%s, %s, %s, %s)" for row in rows]
+        parameters = [value for row in rows for value in row]
+
+        sql = (
+                "UPDATE {} AS t SET fingerprint = u.fingerprint, "
+                "status_code = u.status_code "
+                "FROM (VALUES {}) AS u (vendor_task_id, vendor_name, "
+                "fingerprint, status_code) "
+                "WHERE t.vendor_task_id = u.vendor_task_id "
+                "AND t.vendor_name = u.vendor_name").format(
+                        self._name,
+                        ", ".join(placeholders))
+
+        self._cursor.execute(sql, parameters)
+        return self._cursor.rowcount
+
+
+    def update_synched_ts_many(self, rows):
+        """Set synched_ts for many rows in one statement. rows is a list of
+        (vendor_task_id, vendor_name, synched_ts)."""
+        placeholders = ["(%s, %s, %s)" for row in rows]
+        parameters = [value for row in rows for value in row]
+
+        sql = (
+                "UPDATE {} AS t SET synched_ts = u.synched_ts "
+                "FROM (VALUES {}) AS u (vendor_task_id, vendor_name, "
+                "synched_ts) "
+                "WHERE t.vendor_task_id = u.vendor_task_id "
+                "AND t.vendor_name = u.vendor_name").format(
+                        self._name,
+                        ", ".join(placeholders))
+
+        self._cursor.execute(sql, parameters)
+        return self._cursor.rowcount
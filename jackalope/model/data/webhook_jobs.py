@@ -0,0 +1,243 @@
+"""
+
+    webhook_jobs
+    ------------
+
+    Vendor notifications waiting to be reconciled. A job is claimed by a
+    consumer for a lease period and deleted once it has been processed, so a
+    consumer that dies mid-job only delays it until the lease runs out.
+
+    affinity is a hash of the vendor task pair; with several server processes
+    each one only claims the jobs whose affinity it owns.
+
+    Task jobs are not ready until run_after_ts, and the partial unique index
+    allows only one unclaimed task job per vendor task, so notifications that
+    arrive while a job is still waiting are folded into it.
+
+    A job still failing after the last attempt is dead-lettered: dead_ts is
+    set, which keeps it out of the claims and the partial unique index so new
+    notifications for the task start a fresh job. Dead jobs are kept for
+    inspection.
+
+    CREATE TABLE webhook_jobs (
+        job_id SERIAL,
+        kind VARCHAR(16),
+        vendor_name VARCHAR(32),
+        vendor_task_id VARCHAR(32),
+        message TEXT,
+        affinity BIGINT,
+        attempts INTEGER DEFAULT 0,
+        claimed_ts INTEGER,
+        run_after_ts INTEGER,
+        created_ts INTEGER,
+        dead_ts INTEGER,
+        PRIMARY KEY (job_id)
+    );
+
+    CREATE UNIQUE INDEX webhook_jobs_pending_task
+        ON webhook_jobs (kind, vendor_name, vendor_task_id)
+        WHERE claimed_ts IS NULL AND dead_ts IS NULL AND kind = 'task';
+
+"""
+
+import psycopg2
+
+from jutil.decorators import constant
+
+from table import _Table, Table
+
+
+class _WebhookJobsTable(_Table):
+
+    @constant
+    def NAME(self):
+        return "webhook_jobs"
+
+    @constant
+    def COLUMNS(self):
+        return [
+                "job_id",
+                "kind",
+                "vendor_name",
+                "vendor_task_id",
+                "message",
+                "affinity",
+                "attempts",
+                "claimed_ts",
+                "run_after_ts",
+                "created_ts",
+                "dead_ts",
+                ]
+
+    @constant
+    def PRIMARY_KEY(self):
+        return [
+                "job_id",
+                ]
+
+    @constant
+    def UNIQUE_KEYS(self):
+        return []
+
+    @constant
+    def FOREIGN_KEYS(self):
+        return []
+
+WEBHOOK_JOBS = _WebhookJobsTable()
+
+
+class _JobKind(object):
+
+    @constant
+    def TASK(self):
+        return "task"
+
+    @constant
+    def COMMENT(self):
+        return "comment"
+
+JOB_KIND = _JobKind()
+
+
+class WebhookJobsTable(Table):
+
+    def __init__(self, cursor):
+        super(WebhookJobsTable, self).__init__(
+                WEBHOOK_JOBS.NAME,
+                WEBHOOK_JOBS.COLUMNS,
+                WEBHOOK_JOBS.PRIMARY_KEY,
+                cursor)
+
+        # job_id is a serial, so never pass it in on create.
+        self._use_auto_key(True)
+
+
+    def _primary_key_properties(self, job_id):
+        return {
+                WEBHOOK_JOBS.PRIMARY_KEY[0]: job_id,
+                }
+
+
+    def create(self, properties):
+        return self._create_row(properties)
+
+
+    def create_unless_pending(self, properties, pending_key):
+        """Create the job unless an unclaimed job already matches pending_key,
+        a dict of column/value pairs. Return the new job or None if it was
+        folded into the pending one."""
+        if not self._in_columns(properties):
+            raise KeyError()
+
+        columns = properties.keys()
+        (condition, condition_parameters) = self._all_equal(pending_key)
+        parameters = properties.values() + condition_parameters
+        placeholders = ["%s" for i in range(len(columns))]
+
+        sql = (
+                "INSERT INTO {0} ({1}) SELECT {2} "
+                "WHERE NOT EXISTS ("
+                "SELECT 1 FROM {0} WHERE {3} "
+                "AND claimed_ts IS NULL AND dead_ts IS NULL) "
+                "RETURNING *").format(
+                        self._name,
+                        ", ".join(columns),
+                        ", ".join(placeholders),
+                        condition)
+
+        try:
+            return self._query_one(sql, parameters)
+        except psycopg2.IntegrityError:
+            # a concurrent insert for the same task won the unique index.
+            return None
+
+
+    def read_by_pk(self, job_id):
+        pk = self._primary_key_properties(job_id)
+        return self._read_row(pk)
+
+
+    def delete_by_pk(self, job_id):
+        pk = self._primary_key_properties(job_id)
+        return self._delete_row(pk)
+
+
+    def claim_next(
+            self,
+            claimed_ts,
+            lease_expired_ts,
+            max_attempts,
+            excluded_vendor_names,
+            process_index,
+            process_count):
+        """Claim the oldest ready job owned by this process that is unclaimed
+        or whose lease has expired, skipping the excluded vendors, and return
+        it, or None if there is nothing to claim.
+
+        The row lock keeps two consumers from claiming the same job. A
+        consumer that loses that race gets None and polls again.
+
+        """
+        sql = (
+                "UPDATE {0} SET claimed_ts = %s, attempts = attempts + 1 "
+                "WHERE job_id = ("
+                "SELECT job_id FROM {0} "
+                "WHERE (claimed_ts IS NULL OR claimed_ts < %s) "
+                "AND (run_after_ts IS NULL OR run_after_ts <= %s) "
+                "AND attempts < %s "
+                "AND dead_ts IS NULL "
+                "AND NOT (vendor_name = ANY(%s)) "
+                "AND mod(affinity, %s) = %s "
+                "ORDER BY job_id LIMIT 1 FOR UPDATE) "
+                "RETURNING *").format(self._name)
+
+        return self._query_one(
+                sql,
+                [
+                        claimed_ts,
+                        lease_expired_ts,
+                        claimed_ts,
+                        max_attempts,
+                        list(excluded_vendor_names),
+                        process_count,
+                        process_index,
+                        ])
+
+
+    def dead_letter_by_pk(self, job_id, dead_ts):
+        """Flag the job dead and return it, or None if it was already dead
+        or deleted."""
+        sql = (
+                "UPDATE {0} SET dead_ts = %s "
+                "WHERE job_id = %s AND dead_ts IS NULL "
+                "RETURNING *").format(self._name)
+        return self._query_one(sql, [dead_ts, job_id])
+
+
+    def dead_letter_exhausted(
+            self,
+            dead_ts,
+            lease_expired_ts,
+            max_attempts,
+            process_index,
+            process_count):
+        """Flag the jobs owned by this process that used up max_attempts and
+        whose last lease has expired dead, and return them. These are the
+        jobs whose consumer died on the last attempt."""
+        sql = (
+                "UPDATE {0} SET dead_ts = %s "
+                "WHERE dead_ts IS NULL "
+                "AND attempts >= %s "
+                "AND (claimed_ts IS NULL OR claimed_ts < %s) "
+                "AND mod(affinity, %s) = %s "
+                "RETURNING *").format(self._name)
+        self._cursor.execute(
+                sql,
+                (
+                        dead_ts,
+                        max_attempts,
+                        lease_expired_ts,
+                        process_count,
+                        process_index,
+                        ))
+        return self._cursor.fetchall()
@@ -0,0 +1,135 @@
+"""
+
+    write_behind
+    ------------
+
+    SynchedTsBuffer holds vendor_tasks.synched_ts updates and writes them
+    together in one multi-row UPDATE, instead of making one autocommitted
+    round-trip per update. It flushes when it holds max_size tasks, when its
+    oldest update is max_age seconds old, at the end of a sweep, and on
+    shutdown. Reads look in the buffer first, so buffering never shows an
+    older synched_ts.
+
+    Buffered updates are lost if the process dies before a flush. The cost
+    is small: comments are tracked by their own cursor and ledger, so only
+    the record of when the pair last synched is set back. A max_size of 0
+    writes every update straight through for deployments that would rather
+    pay the round-trips.
+
+"""
+import threading
+import time
+
+import settings
+from model.metrics import metrics
+
+from .db import db
+
+
+class SynchedTsBuffer(object):
+
+    """Pending synched_ts updates keyed on (vendor_task_id, vendor_name).
+
+    Attributes
+    ----------
+    _max_size : `int`
+        Tasks held before a flush. 0 disables buffering.
+    _max_age : `float`
+        Seconds the oldest update waits before a flush.
+    _lock : `threading.Lock`
+        Guards the dicts.
+    _flush_lock : `threading.Lock`
+        Lets one flush run at a time.
+    _pending : {(vendor_task_id, vendor_name), `int`}
+    _flushing : {(vendor_task_id, vendor_name), `int`}
+        The updates of the flush in progress, still visible to reads.
+    _pending_updates : `int`
+        Updates folded into _pending, for the round-trips saved.
+    _oldest_ts : `float`
+
+    """
+
+
+    def __init__(self, max_size, max_age):
+        self._max_size = max_size
+        self._max_age = max_age
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._flushing = {}
+        self._pending_updates = 0
+        self._oldest_ts = None
+
+
+    def add(self, vendor_task_id, vendor_name, synched_ts):
+        """Buffer a synched_ts update, flushing if a threshold is reached."""
+        metrics.increment("synched_ts_updates_total")
+        key = (unicode(vendor_task_id), vendor_name)
+        if not self._max_size:
+            db.vendor_tasks.update_synched_ts_many([key + (synched_ts,)])
+            return
+
+        with self._lock:
+            self._pending[key] = max(synched_ts, self._pending.get(key))
+            self._pending_updates += 1
+            if self._oldest_ts is None:
+                self._oldest_ts = time.time()
+            is_due = (
+                    len(self._pending) >= self._max_size or
+                    time.time() - self._oldest_ts >= self._max_age)
+
+        if is_due:
+            self.flush()
+
+
+    def get(self, vendor_task_id, vendor_name):
+        """Return the buffered synched_ts, or None if there isn't one."""
+        key = (unicode(vendor_task_id), vendor_name)
+        with self._lock:
+            synched_ts = self._pending.get(key)
+            if synched_ts is None:
+                synched_ts = self._flushing.get(key)
+        return synched_ts
+
+
+    def flush(self):
+        """Write every buffered update in one statement. If the write fails
+        the updates go back in the buffer and the error is raised."""
+        with self._flush_lock:
+            with self._lock:
+                rows = self._flushing = self._pending
+                updates = self._pending_updates
+                self._pending = {}
+                self._pending_updates = 0
+                self._oldest_ts = None
+
+            if not rows:
+                return
+
+            try:
+                db.vendor_tasks.update_synched_ts_many([
+                        (vendor_task_id, vendor_name, synched_ts)
+                        for ((vendor_task_id, vendor_name), synched_ts)
+                                in rows.items()
+                        ])
+            except Exception:
+                with self._lock:
+                    for (key, synched_ts) in rows.items():
+                        self._pending[key] = max(
+                                synched_ts,
+                                self._pending.get(key))
+                    self._pending_updates += updates
+                    if self._oldest_ts is None:
+                        self._oldest_ts = time.time()
+                raise
+            finally:
+                with self._lock:
+                    self._flushing = {}
+
+        metrics.increment("synched_ts_flushes_total")
+        metrics.increment("synched_ts_round_trips_saved_total", updates - 1)
+
+
+synched_ts_buffer = SynchedTsBuffer(
+        settings.SYNCHED_TS_BUFFER_SIZE,
+        settings.SYNCHED_TS_FLUSH_INTERVAL)
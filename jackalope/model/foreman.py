@@ -5,12 +5,25 @@
     Handle all coordination between Employer and Employee workers.
 
 """
+import logging
+import time
+from array import array
+from contextlib import contextmanager
+from functools import partial
+from itertools import izip
 
-from worker.asana_employer import AsanaEmployer, ASANA
-from worker.send_jack_employer import SendJackEmployer, SEND_JACK
-from worker.task_rabbit_employee import TaskRabbitEmployee, TASK_RABBIT
+import settings
+from worker.task_rabbit_employee import TASK_RABBIT
+from worker.worker import Employer
 
 from .data.db_worker import DbWorker
+from .data.webhook_jobs import JOB_KIND
+from .locks import task_locks
+from .metrics import metrics
+from .pool import sweep_pool
+from .scheduler import PriorityScheduler
+from .transitions import TRANSITION_TABLE, TransitionTable
+from .unit_of_work import unit_of_work
 from .workflow import WorkflowFactory
 
 
@@ -18,6 +31,9 @@ class Foreman(object):
 
     """Manage all Employer, Employee, Task interactions.
 
+    A Foreman is cheap: it borrows the current workers from the app's
+    WorkerRegistry, so build one per unit of work.
+
     Attributes
     ----------
     _employers : dict
@@ -27,15 +43,8 @@ class Foreman(object):
     """
 
 
-    def __init__(self):
-        self._employers = {
-                ASANA.VENDOR: AsanaEmployer(),
-                SEND_JACK.VENDOR: SendJackEmployer()
-                }
-
-        self._employees = {
-                TASK_RABBIT.VENDOR: TaskRabbitEmployee()
-                }
+    def __init__(self, registry):
+        (self._employers, self._employees) = registry.get_worker_set()
 
         self._workers = {}
         self._workers.update(self._employers)
@@ -67,77 +76,448 @@ class Foreman(object):
         return new_comment is not None
 
 
-    def send_jack(self):
-        """Process all Jackalope services and handle `Task` updates."""
-        employer_tasks = {}
-        for employer in self._employers:
-            employer_tasks = employer.read_tasks()
-            # employer_tasks[id] = None when the task is not spec ready
-            self._process_employer_tasks(employer, employer_tasks)
+    def send_jack(self, progress=None, affinity=None, full_interval=None):
+        """Process all Jackalope services and handle `Task` updates.
+
+        The employers are listed concurrently, then their Tasks are processed
+        on the sweep pool in the order a `PriorityScheduler` gives them.
+        Tasks of the same pair are never processed at the same time, in this
+        sweep or anywhere else in the process.
+
+        Each employer is only asked for the Tasks modified since its last
+        clean sweep, except for a full read every full_interval seconds. An
+        employer's watermark only moves once all of its Tasks went through,
+        so a failed Task is read again next time.
+
+        The statuses of every pair are evaluated together before anything is
+        scheduled, and the pairs with a transition pending go first.
+
+        A full read skips the settled pairs whose Tasks both still have the
+        fingerprints they were last reconciled with, checking the employees'
+        side against one bulk read of each employee. The fingerprints don't
+        cover comments, so a pair is only skipped if the employer also
+        doesn't list its Task as modified since the watermark, and Tasks an
+        incremental read returns are never skipped. A full read doesn't move
+        the watermark of the incremental reads, so the Tasks it passes over
+        are still read incrementally if they change.
+
+        Parameters
+        ----------
+        progress : `SweepProgress`, optional
+            Updated with counts as the sweep goes.
+        affinity : `Affinity`, optional
+            Tasks whose pair belongs to another server process are queued as
+            webhook jobs for that process instead of being processed here.
+        full_interval : `int`, optional
+            Seconds between full reads of an employer. None reads every
+            employer in full.
+
+        """
+        employer_reads = sweep_pool.map(
+                partial(self._read_employer_tasks, progress, full_interval),
+                self._employers.values())
+
+        employee_tasks = {}
+        if any([
+                is_full
+                for (_, _, read_ts, is_full, _, _) in employer_reads
+                if read_ts is not None
+                ]):
+            employee_tasks = self._read_employee_tasks()
+
+        db_worker = DbWorker()
+        scheduler = self._schedule_sweep(
+                employer_reads,
+                employee_tasks,
+                progress)
+
+        # the pool starts the Tasks in the order they're handed to it.
+        outcomes = sweep_pool.map(
+                partial(self._sweep_scheduled_task, progress, affinity),
+                scheduler.drain())
+        failed_names = set([name for (name, ok) in outcomes if not ok])
+
+        # write the buffered synched_ts before the watermarks move past them.
+        db_worker.flush_vendor_synched_ts()
+        for (employer, _, read_ts, is_full, watermark_ts, _) in (
+                employer_reads):
+            if read_ts is not None and employer.name not in failed_names:
+                full_sweep_ts = None
+                modified_since_ts = read_ts
+                if is_full:
+                    full_sweep_ts = read_ts
+                    if watermark_ts is not None:
+                        modified_since_ts = watermark_ts
+                db_worker.update_sweep_watermark(
+                        employer.name,
+                        modified_since_ts,
+                        full_sweep_ts)
 
 
     def send_jack_for_task(self, vendor_name, task_id):
-        employer = self._employers.get(vendor_name)
-        if employer:
-            employer_tasks = {task_id: employer.read_task(task_id)}
-            self._process_employer_tasks(employer, employer_tasks)
-        else:
-            employee = self._employees.get(vendor_name)
-            employee_tasks = {task_id: employee.read_task(task_id)}
-            self._process_employee_tasks(employee, employee_tasks)
+        with unit_of_work():
+            employer = self._employers.get(vendor_name)
+            if employer:
+                employer_tasks = {task_id: employer.read_task(task_id)}
+                self._process_employer_tasks(employer, employer_tasks)
+            else:
+                employee = self._employees.get(vendor_name)
+                employee_tasks = {task_id: employee.read_task(task_id)}
+                self._process_employee_tasks(employee, employee_tasks)
+
+
+    def _read_employer_tasks(self, progress, full_interval, employer):
+        """Return (employer, dict of `Task` keyed on id, read_ts, is_full,
+        modified_since_ts, modified_ids). read_ts is when the read started,
+        or None if the employer couldn't be read, which is logged and counted
+        and gives no Tasks. modified_since_ts is the employer's watermark
+        before the read. modified_ids is None, or for a full read the set of
+        ids the employer lists as modified since the watermark."""
+        (modified_since_ts, full_sweep_ts) = (
+                DbWorker().get_sweep_watermark(employer.name))
+        read_ts = int(time.time())
+        is_full = (
+                full_interval is None or
+                modified_since_ts is None or
+                full_sweep_ts is None or
+                read_ts - full_sweep_ts >= full_interval)
+        read_since_ts = modified_since_ts
+        if is_full:
+            read_since_ts = None
+
+        try:
+            employer_tasks = employer.read_tasks(read_since_ts)
+        except NotImplementedError:
+            # not every employer can list its tasks.
+            return (employer, {}, None, is_full, modified_since_ts, None)
+        except Exception:
+            logging.exception("could not read %s tasks", employer.name)
+            if progress:
+                progress.add_error()
+            return (employer, {}, None, is_full, modified_since_ts, None)
+
+        modified_ids = None
+        if is_full and modified_since_ts is not None:
+            try:
+                modified_ids = employer.list_task_ids_modified_since(
+                        modified_since_ts)
+            except Exception:
+                logging.exception(
+                        "could not list modified %s tasks",
+                        employer.name)
+
+        read_mode = "incremental"
+        if is_full:
+            read_mode = "full"
+        metrics.increment(
+                "sweep_employer_reads_total",
+                vendor=employer.name,
+                mode=read_mode)
+        if progress:
+            progress.add_tasks_read(len(employer_tasks))
+        return (
+                employer,
+                employer_tasks,
+                read_ts,
+                is_full,
+                modified_since_ts,
+                modified_ids)
+
+
+    def _read_employee_tasks(self):
+        """Return {vendor_name, {unicode id, `Task`}} with every Task of each
+        employee that can list them, one read per employee. The Tasks are
+        listed as they are, so taking the snapshot changes nothing."""
+        employee_tasks = {}
+        for employee in self._employees.values():
+            try:
+                tasks = employee.list_tasks()
+            except Exception:
+                logging.exception("could not list %s tasks", employee.name)
+                continue
+
+            employee_tasks[employee.name] = dict([
+                    (task.id(), task)
+                    for task in tasks.values()
+                    ])
+        return employee_tasks
+
+
+    def _schedule_sweep(self, employer_reads, employee_tasks, progress):
+        """Return a `PriorityScheduler` holding the Tasks of the sweep whose
+        pairs need reconciling.
+
+        The statuses of every pair in the sweep are evaluated in one pass of
+        the transition table over two status code arrays. The employee's
+        status comes from the employees' snapshot if there is one, or else
+        from the pair's last reconciliation; a pair with neither is
+        evaluated against no status, which never agrees. Pairs whose
+        statuses agree are scheduled after those with a transition pending.
+
+        A full read skips a settled pair altogether when its Tasks both still
+        have the fingerprints they were last reconciled with and the
+        employer doesn't list its Task as modified since the watermark. The
+        fingerprints don't cover comments, and that listing does, so a pair
+        with a comment to ferry is never skipped. An employer that can't
+        list its modified Tasks has none of its pairs skipped.
+
+        """
+        db_worker = DbWorker()
+        entries = []
+        employer_codes = array("b")
+        employee_codes = array("b")
+        skipped_by_name = {}
+        for (employer, employer_tasks, read_ts, is_full, _, modified_ids) in (
+                employer_reads):
+            # employer_tasks[id] = None when the task is not spec ready
+            tasks = [
+                    task
+                    for task in employer_tasks.values()
+                    if task is not None
+                    ]
+            ids = [task.id() for task in tasks]
+            pair_states = db_worker.get_pair_states(ids, employer.name)
+            synched_ts_by_id = db_worker.get_synched_ts_many(
+                    ids,
+                    employer.name)
+            can_skip = (
+                    is_full and
+                    bool(employee_tasks) and
+                    modified_ids is not None)
+            if can_skip:
+                skipped_by_name[employer.name] = 0
+
+            for task in tasks:
+                task_id = unicode(task.id())
+                pair_state = pair_states.get(task_id)
+                employee_task = None
+                employee_code = 0
+                if pair_state is not None:
+                    (_, employee_task_id, employee_name, _, stored_code) = (
+                            pair_state)
+                    employee_task = employee_tasks.get(employee_name, {}).get(
+                            employee_task_id)
+                    if employee_task is not None:
+                        employee_code = employee_task.status_code()
+                    elif stored_code is not None:
+                        employee_code = stored_code
+
+                entries.append((
+                        employer,
+                        task,
+                        synched_ts_by_id.get(task_id),
+                        pair_state,
+                        employee_task,
+                        can_skip and task_id not in modified_ids))
+                employer_codes.append(task.status_code())
+                employee_codes.append(employee_code)
+
+        outcomes = TRANSITION_TABLE.evaluate_many(
+                employer_codes,
+                employee_codes)
+
+        scheduler = PriorityScheduler()
+        for (entry, employee_code, outcome) in izip(
+                entries,
+                employee_codes,
+                outcomes):
+            (employer, task, synched_ts, pair_state, employee_task,
+                    can_skip) = entry
+            is_settled = outcome == TransitionTable.NO_CHANGE
+            if (
+                    is_settled and
+                    can_skip and
+                    _is_unchanged(task, pair_state, employee_task)
+                    ):
+                skipped_by_name[employer.name] += 1
+                continue
+            scheduler.add(
+                    employer,
+                    task,
+                    synched_ts,
+                    is_settled,
+                    employee_code)
+
+        for (employer_name, skipped) in skipped_by_name.items():
+            metrics.increment(
+                    "sweep_pairs_skipped_total",
+                    skipped,
+                    vendor=employer_name)
+            if progress:
+                progress.add_pairs_skipped(skipped)
+        return scheduler
 
 
     def _process_employer_tasks(self, employer, tasks):
         """Process a dict of `Employer` service `Task` keyed on id."""
         print "\n STEP: PROCESS THE EMPLOYER TASKS ------>\n"
 
+        scheduler = PriorityScheduler()
         for task in tasks.values():
             if task is not None:
-                # hand the Tasks over to a Workflow and evaluate the statuses.
-                # keep on processing Task until it doesn't change.
-                task_to_process = task
-                id = task.id()
-                process_iterations = 0
-                print "START processing task", id
-
-                while task_to_process:
-                    task_to_process._print_task()
-                    print "\t processed task", process_iterations, "times\n"
-
-                    workflow = WorkflowFactory.instantiate_from_employer(
-                            employer,
-                            task_to_process,
-                            self)
-                    task_to_process = workflow.process()
-
-                    process_iterations = process_iterations + 1
-
-                print "END proccessing task", id, "\n"
+                scheduler.add(employer, task)
+
+        for scheduled in scheduler.drain():
+            scheduled.start()
+            self._sweep_employer_task(employer, scheduled.task)
+
+
+    def _sweep_scheduled_task(self, progress, affinity, scheduled):
+        """Sweep a `ScheduledTask` of an `Employer` and return
+        (employer name, True if it went through)."""
+        scheduled.start()
+        ok = self._sweep_employer_task(
+                scheduled.worker,
+                scheduled.task,
+                progress,
+                affinity)
+        return (scheduled.worker.name, ok)
+
+
+    def _sweep_employer_task(
+            self,
+            employer,
+            task,
+            progress=None,
+            affinity=None):
+        """Route or process one `Employer` service `Task` and return True. A
+        Task that fails is logged and counted so the rest of the sweep
+        carries on, and False is returned."""
+        try:
+            if affinity and self._route_task(employer, task, affinity):
+                if progress:
+                    progress.add_task_routed()
+                return True
+
+            self._process_employer_task(employer, task)
+        except Exception:
+            logging.exception("could not process task %s", task.id())
+            if progress:
+                progress.add_error()
+            return False
+
+        if progress:
+            progress.add_task_processed()
+        return True
+
+
+    def _route_task(self, employer, task, affinity):
+        """Queue the Task for the process that owns its pair and return True,
+        or return False if this process owns it."""
+        db_worker = DbWorker()
+        task_affinity = db_worker.get_task_affinity(
+                task.id(),
+                employer.name,
+                True)
+        if affinity.owns(task_affinity):
+            return False
+
+        db_worker.create_or_coalesce_task_job(
+                JOB_KIND.TASK,
+                employer.name,
+                task.id(),
+                True,
+                0)
+        return True
+
+
+    def _process_employer_task(self, employer, task):
+        # hand the Tasks over to a Workflow and evaluate the statuses. the
+        # Workflow keeps on processing the Task until it doesn't change.
+        id = task.id()
+        print "START processing task", id
+        task._print_task()
+
+        with self._hold_pair(employer, task), unit_of_work():
+            workflow = WorkflowFactory.instantiate_from_employer(
+                    employer,
+                    task,
+                    self)
+            process_iterations = workflow.process(
+                    settings.WORKFLOW_MAX_ITERATIONS)
+            DbWorker().update_fingerprints(workflow.get_fingerprints())
+
+        metrics.observe("workflow_iterations", process_iterations)
+        print "END proccessing task", id, process_iterations, "iterations\n"
 
 
     def _process_employee_tasks(self, employee, tasks):
         """Process a dict of `Employee` service `Task` keyed on id."""
         print "\n STEP: PROCESS THE EMPLOYEE TASKS ------>\n"
 
+        scheduler = PriorityScheduler()
         for task in tasks.values():
             if task is not None:
-                # hand the Tasks over to a Workflow and evaluate the statuses.
-                # keep on processing Task until it doesn't change.
-                task_to_process = task
-                id = task.id()
-                process_iterations = 0
-                print "START processing task", id
-
-                while task_to_process:
-                    task_to_process._print_task()
-                    print "\t processed task", process_iterations, "times\n"
-
-                    workflow = WorkflowFactory.instantiate_from_employee(
-                            employee,
-                            task_to_process,
-                            self)
-                    task_to_process = workflow.process()
-
-                    process_iterations = process_iterations + 1
-
-                print "END proccessing task", id, "\n"
+                scheduler.add(employee, task)
+
+        for scheduled in scheduler.drain():
+            scheduled.start()
+            self._process_employee_task(employee, scheduled.task)
+
+
+    def _process_employee_task(self, employee, task):
+        # hand the Tasks over to a Workflow and evaluate the statuses. the
+        # Workflow keeps on processing the Task until it doesn't change.
+        id = task.id()
+        print "START processing task", id
+        task._print_task()
+
+        with self._hold_pair(employee, task), unit_of_work():
+            workflow = WorkflowFactory.instantiate_from_employee(
+                    employee,
+                    task,
+                    self)
+            process_iterations = workflow.process(
+                    settings.WORKFLOW_MAX_ITERATIONS)
+            DbWorker().update_fingerprints(workflow.get_fingerprints())
+
+        metrics.observe("workflow_iterations", process_iterations)
+        print "END proccessing task", id, process_iterations, "iterations\n"
+
+
+    @contextmanager
+    def _hold_pair(self, worker, task):
+        """Hold the locks on the Task's pair for the duration of the with
+        block. The Workflow is built inside it, since building a
+        PairedWorkflow can create the reciprocal Task.
+
+        The process lock comes first so that threads waiting on a pair don't
+        also tie up a database connection. The advisory lock then keeps out
+        the other server processes and dynos.
+
+        """
+        db_worker = DbWorker()
+        pair_key = db_worker.get_pair_key(
+                task.id(),
+                worker.name,
+                isinstance(worker, Employer))
+
+        wait_start = time.time()
+        with task_locks.hold(pair_key):
+            locked_ts = time.time()
+            metrics.observe(
+                    "pair_lock_wait_seconds",
+                    locked_ts - wait_start,
+                    scope="process")
+
+            db_worker.lock_pair(pair_key)
+            metrics.observe(
+                    "pair_lock_wait_seconds",
+                    time.time() - locked_ts,
+                    scope="database")
+            try:
+                yield
+            finally:
+                db_worker.unlock_pair(pair_key)
+
+
+def _is_unchanged(task, pair_state, employee_task):
+    """Do an employer Task and the employee Task from the snapshot both still
+    have the fingerprints their pair was last reconciled with?"""
+    if pair_state is None or employee_task is None:
+        return False
+
+    (fingerprint, _, _, employee_fingerprint, _) = pair_state
+    return (
+            fingerprint == task.fingerprint() and
+            employee_fingerprint == employee_task.fingerprint())
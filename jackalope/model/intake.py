@@ -0,0 +1,304 @@
+"""
+    intake
+    ------
+
+    The IntakeQueue persists vendor notifications to the webhook_jobs table
+    so the handlers can answer right away, and drains that table with a set of
+    consumers running on the IOLoop. Jobs are only deleted after they have been
+    processed, which gives at-least-once delivery: a job whose consumer fails
+    or dies is claimed again once its lease expires.
+
+    Task notifications are debounced per (vendor, task_id): a task job waits
+    for the debounce window before it can be claimed, and any notification for
+    the same task that arrives meanwhile is coalesced into it, so a burst of
+    callbacks costs one reconciliation.
+
+    The consumers never hold more than the per-vendor limit of jobs for one
+    vendor, so a burst from one vendor cannot starve the others or overrun
+    the vendor's API.
+
+"""
+import logging
+import time
+
+from tornado import gen
+from tornado.ioloop import IOLoop
+
+from .data.db_worker import DbWorker, JACK_FIELD
+from .data.webhook_jobs import JOB_KIND
+from .foreman import Foreman
+from .metrics import metrics
+from .pool import pool
+
+
+class IntakeQueue(object):
+
+    """Accept vendor notifications and reconcile them in the background.
+
+    Attributes
+    ----------
+    _consumers : `int`
+        Number of jobs processed concurrently.
+    _poll_interval : `float`
+        Seconds a consumer waits after finding the table empty.
+    _lease_seconds : `int`
+        Seconds a claimed job is hidden from other consumers.
+    _max_attempts : `int`
+        Jobs are dead-lettered after this many claims.
+    _debounce_seconds : `int`
+        Seconds a task job waits to collect duplicate notifications.
+    _vendor_concurrency : `int`
+        Most jobs processed concurrently for any one vendor.
+    _in_flight : {vendor_name, `int`}
+        Jobs being processed per vendor.
+    _claims_in_flight : `int`
+        Claims sent to the database but not yet returned.
+    _affinity : `Affinity`
+        Only jobs for task pairs owned by this process are claimed.
+    _registry : `WorkerRegistry`
+    _running : `bool`
+    _dead_letter_ts : `float`
+        When the jobs abandoned on their last attempt were last looked for.
+
+    """
+
+
+    def __init__(
+            self,
+            consumers,
+            poll_interval,
+            lease_seconds,
+            max_attempts,
+            debounce_seconds,
+            vendor_concurrency,
+            affinity,
+            registry):
+        self._consumers = consumers
+        self._poll_interval = poll_interval
+        self._lease_seconds = lease_seconds
+        self._max_attempts = max_attempts
+        self._debounce_seconds = debounce_seconds
+        self._vendor_concurrency = vendor_concurrency
+        self._in_flight = {}
+        self._claims_in_flight = 0
+        self._affinity = affinity
+        self._registry = registry
+        self._running = False
+        self._dead_letter_ts = 0
+
+
+    def enqueue_task(self, vendor_name, task_id, callback):
+        """Persist a task notification and pass the job to callback, or None
+        if it was coalesced into a job already waiting for the task."""
+        pool.run(
+                _create_task_job,
+                vendor_name,
+                task_id,
+                self._is_employer(vendor_name),
+                self._debounce_seconds,
+                callback=callback)
+
+
+    def enqueue_comment(self, vendor_name, task_id, message, callback):
+        """Persist a comment notification and pass the job to callback."""
+        pool.run(
+                _create_job,
+                JOB_KIND.COMMENT,
+                vendor_name,
+                task_id,
+                self._is_employer(vendor_name),
+                message,
+                callback=callback)
+
+
+    def _is_employer(self, vendor_name):
+        """Is vendor_name one of the employers? Jobs are keyed on the
+        employer side of their pair."""
+        (employers, employees) = self._registry.get_worker_set()
+        return vendor_name in employers
+
+
+    def start(self):
+        """Start the consumers on the IOLoop."""
+        self._running = True
+        for i in range(self._consumers):
+            self._consume()
+
+
+    def stop(self):
+        """Let the consumers exit after their current job."""
+        self._running = False
+
+
+    @gen.engine
+    def _consume(self):
+        io_loop = IOLoop.instance()
+
+        while self._running:
+            job = None
+            failed_job = None
+            try:
+                job = yield gen.Task(self._claim)
+                if job:
+                    yield gen.Task(self._process, job)
+                else:
+                    yield gen.Task(self._dead_letter_abandoned)
+            except Exception:
+                # leave the job claimed; it is retried when the lease expires.
+                logging.exception("webhook job failed: %r", job)
+                failed_job = job
+                job = None
+
+            if (failed_job and
+                    failed_job.get(JACK_FIELD.ATTEMPTS) >= self._max_attempts):
+                yield gen.Task(
+                        pool.run,
+                        _dead_letter_job,
+                        failed_job.get(JACK_FIELD.JOB_ID))
+
+            if not job:
+                yield gen.Task(
+                        io_loop.add_timeout,
+                        time.time() + self._poll_interval)
+
+
+    @gen.engine
+    def _claim(self, callback):
+        """Claim a job for a vendor below its concurrency limit.
+
+        Every claim still in flight could land on any vendor, so it counts
+        against all of them; that keeps concurrent claims from overshooting
+        the limit.
+
+        """
+        job = None
+        if self._claims_in_flight < self._vendor_concurrency:
+            saturated_vendor_names = [
+                    vendor_name
+                    for (vendor_name, count) in self._in_flight.items()
+                    if count + self._claims_in_flight >=
+                            self._vendor_concurrency
+                    ]
+
+            self._claims_in_flight += 1
+            try:
+                job = yield gen.Task(
+                        pool.run,
+                        _claim_job,
+                        self._lease_seconds,
+                        self._max_attempts,
+                        saturated_vendor_names,
+                        self._affinity)
+            finally:
+                self._claims_in_flight -= 1
+
+            if job:
+                vendor_name = job.get(JACK_FIELD.VENDOR_NAME)
+                self._in_flight[vendor_name] = (
+                        self._in_flight.get(vendor_name, 0) + 1)
+        callback(job)
+
+
+    @gen.engine
+    def _dead_letter_abandoned(self, callback):
+        """Dead-letter the jobs whose consumer died on the last attempt,
+        looking at most once per lease."""
+        current_ts = time.time()
+        if current_ts - self._dead_letter_ts >= self._lease_seconds:
+            self._dead_letter_ts = current_ts
+            yield gen.Task(
+                    pool.run,
+                    _dead_letter_exhausted_jobs,
+                    self._lease_seconds,
+                    self._max_attempts,
+                    self._affinity)
+        callback()
+
+
+    @gen.engine
+    def _process(self, job, callback):
+        vendor_name = job.get(JACK_FIELD.VENDOR_NAME)
+        try:
+            foreman = Foreman(self._registry)
+            yield gen.Task(pool.run, _process_job, foreman, job)
+            yield gen.Task(
+                    pool.run,
+                    _delete_job,
+                    job.get(JACK_FIELD.JOB_ID))
+        finally:
+            self._in_flight[vendor_name] -= 1
+        callback()
+
+
+def _create_job(kind, vendor_name, vendor_task_id, is_employer, message):
+    return DbWorker().create_webhook_job(
+            kind,
+            vendor_name,
+            unicode(vendor_task_id),
+            is_employer,
+            message)
+
+
+def _create_task_job(
+        vendor_name,
+        vendor_task_id,
+        is_employer,
+        debounce_seconds):
+    return DbWorker().create_or_coalesce_task_job(
+            JOB_KIND.TASK,
+            vendor_name,
+            unicode(vendor_task_id),
+            is_employer,
+            debounce_seconds)
+
+
+def _claim_job(lease_seconds, max_attempts, excluded_vendor_names, affinity):
+    return DbWorker().claim_webhook_job(
+            lease_seconds,
+            max_attempts,
+            excluded_vendor_names,
+            affinity.process_index,
+            affinity.process_count)
+
+
+def _delete_job(job_id):
+    return DbWorker().delete_webhook_job(job_id)
+
+
+def _dead_letter_job(job_id):
+    job = DbWorker().dead_letter_webhook_job(job_id)
+    if job:
+        _record_dead_jobs([job])
+
+
+def _dead_letter_exhausted_jobs(lease_seconds, max_attempts, affinity):
+    jobs = DbWorker().dead_letter_exhausted_webhook_jobs(
+            lease_seconds,
+            max_attempts,
+            affinity.process_index,
+            affinity.process_count)
+    _record_dead_jobs(jobs)
+
+
+def _record_dead_jobs(jobs):
+    for job in jobs:
+        vendor_name = job.get(JACK_FIELD.VENDOR_NAME)
+        logging.error("webhook job dead-lettered: %r", job)
+        metrics.increment(
+                "webhook_jobs_dead_lettered_total",
+                vendor=vendor_name)
+
+
+def _process_job(foreman, job):
+    """Hand a claimed job to the Foreman."""
+    kind = job.get(JACK_FIELD.KIND)
+    vendor_name = job.get(JACK_FIELD.VENDOR_NAME)
+    vendor_task_id = job.get(JACK_FIELD.VENDOR_TASK_ID)
+
+    if kind == JOB_KIND.COMMENT:
+        foreman.ferry_comment(
+                vendor_name,
+                vendor_task_id,
+                job.get(JACK_FIELD.MESSAGE))
+    else:
+        foreman.send_jack_for_task(vendor_name, vendor_task_id)
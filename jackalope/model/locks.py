@@ -0,0 +1,55 @@
+"""
+    locks
+    -----
+
+    KeyedLock hands out one lock per key, so work on the same task pair is
+    serialized while work on different pairs runs in parallel. Locks are
+    created on demand and dropped as soon as nobody holds or waits for them,
+    so the table only ever holds the pairs being worked on.
+
+"""
+import threading
+from contextlib import contextmanager
+
+
+class KeyedLock(object):
+
+    """A lock per key, shared by every thread in the process.
+
+    Attributes
+    ----------
+    _lock : `threading.Lock`
+        Guards the table.
+    _locks : {key, [`threading.Lock`, `int`]}
+        The lock for each key and the number of threads holding or waiting
+        for it.
+
+    """
+
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._locks = {}
+
+
+    @contextmanager
+    def hold(self, key):
+        """Hold the lock for key for the duration of the with block."""
+        with self._lock:
+            entry = self._locks.get(key)
+            if entry is None:
+                entry = self._locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+
+        entry[0].acquire()
+        try:
+            yield
+        finally:
+            entry[0].release()
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[key]
+
+
+task_locks = KeyedLock()
@@ -0,0 +1,192 @@
+"""
+    metrics
+    -------
+
+    Counters, gauges and latency histograms for the whole process, rendered
+    in the Prometheus text exposition format. Recording is a dict lookup, a
+    bisect and an increment under one lock, so it is cheap enough to do on
+    every request.
+
+    Histograms use fixed buckets that grow by a factor of sqrt(2) from 1ms,
+    and p50/p95/p99 are estimated by interpolating inside the bucket the
+    quantile falls in.
+
+"""
+import threading
+from bisect import bisect_left
+
+
+class Histogram(object):
+
+    """Bucketed observations.
+
+    Attributes
+    ----------
+    BOUNDS : list
+        Upper bound of each bucket in seconds; a last bucket catches the rest.
+    _bucket_counts : list
+    _count : `int`
+    _sum : `float`
+
+    """
+
+    BOUNDS = [0.001 * 2 ** (i / 2.0) for i in range(40)]
+
+    QUANTILES = [0.5, 0.95, 0.99]
+
+
+    def __init__(self):
+        self._bucket_counts = [0] * (len(self.BOUNDS) + 1)
+        self._count = 0
+        self._sum = 0.0
+
+
+    def observe(self, value):
+        self._bucket_counts[bisect_left(self.BOUNDS, value)] += 1
+        self._count += 1
+        self._sum += value
+
+
+    def count(self):
+        return self._count
+
+
+    def sum(self):
+        return self._sum
+
+
+    def quantile(self, q):
+        """Estimate the q-th quantile, 0 < q <= 1."""
+        if not self._count:
+            return 0.0
+
+        rank = q * self._count
+        seen = 0
+        for (i, bucket_count) in enumerate(self._bucket_counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = 0.0
+                if i:
+                    lower = self.BOUNDS[i - 1]
+                # the overflow bucket has no upper bound to interpolate to.
+                if i == len(self.BOUNDS):
+                    return lower
+                fraction = (rank - seen) / bucket_count
+                return lower + (self.BOUNDS[i] - lower) * fraction
+            seen += bucket_count
+
+        return self.BOUNDS[-1]
+
+
+class Metrics(object):
+
+    """All metrics for the process, keyed on name and labels.
+
+    Attributes
+    ----------
+    _prefix : str
+        Prepended to every metric name when rendered.
+    _lock : `threading.Lock`
+        Metrics are recorded from the IOLoop and from pool threads.
+    _counters : {(name, labels), `int`}
+    _gauges : {(name, labels), `float`}
+    _histograms : {(name, labels), `Histogram`}
+
+    """
+
+
+    def __init__(self, prefix):
+        self._prefix = prefix
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+
+
+    def increment(self, name, amount=1, **labels):
+        """Add amount to a counter."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+
+    def add_to_gauge(self, name, amount, **labels):
+        """Add amount, which may be negative, to a gauge."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + amount
+
+
+    def set_gauge(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+
+    def observe(self, name, value, **labels):
+        """Record one observation, usually in seconds, in a histogram."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            self._render_simple(lines, self._counters, "counter")
+            self._render_simple(lines, self._gauges, "gauge")
+            self._render_histograms(lines)
+
+        return "\n".join(lines) + "\n"
+
+
+    def _render_simple(self, lines, values, metric_type):
+        typed_names = set()
+        for ((name, labels), value) in sorted(values.items()):
+            full_name = self._prefix + name
+            if name not in typed_names:
+                typed_names.add(name)
+                lines.append("# TYPE {} {}".format(full_name, metric_type))
+            lines.append("{}{} {}".format(
+                    full_name,
+                    _format_labels(labels),
+                    value))
+
+
+    def _render_histograms(self, lines):
+        typed_names = set()
+        for ((name, labels), histogram) in sorted(self._histograms.items()):
+            full_name = self._prefix + name
+            if name not in typed_names:
+                typed_names.add(name)
+                lines.append("# TYPE {} summary".format(full_name))
+            for q in Histogram.QUANTILES:
+                quantile_labels = labels + (("quantile", q),)
+                lines.append("{}{} {:.6f}".format(
+                        full_name,
+                        _format_labels(quantile_labels),
+                        histogram.quantile(q)))
+            lines.append("{}_sum{} {:.6f}".format(
+                    full_name,
+                    _format_labels(labels),
+                    histogram.sum()))
+            lines.append("{}_count{} {}".format(
+                    full_name,
+                    _format_labels(labels),
+                    histogram.count()))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = [
+            '{}="{}"'.format(k, unicode(v).replace('"', '\\"'))
+            for (k, v) in labels
+            ]
+    return "{" + ",".join(pairs) + "}"
+
+
+metrics = Metrics("jackalope_")
@@ -0,0 +1,94 @@
+"""
+    pool
+    ----
+
+    WorkerPool runs the blocking vendor and database calls on a pool of
+    threads so the IOLoop can keep serving other requests. Results are handed
+    back to the IOLoop thread through a callback, which makes every pool call
+    usable with tornado.gen.Task.
+
+    The sweep fans its work out on its own sweep_pool. It is separate from
+    the main pool because the sweep itself runs on a main pool thread and
+    waits for that work, which could deadlock a shared pool. For the same
+    reason planned writes run on the write_pool, which never waits on
+    anything.
+
+"""
+import sys
+from functools import partial
+from multiprocessing.pool import ThreadPool
+
+from tornado import stack_context
+from tornado.ioloop import IOLoop
+
+import settings
+
+
+class WorkerPool(object):
+
+    """Run blocking calls on threads and return the results to the IOLoop.
+
+    Attributes
+    ----------
+    _size : `int`
+    _pool : `ThreadPool`
+        Created on first use so that forked processes build their own.
+
+    """
+
+
+    def __init__(self, size):
+        self._size = size
+        self._pool = None
+
+
+    def run(self, fn, *args, **kwargs):
+        """Call fn(*args, **kwargs) on a pool thread and pass its return value
+        to *callback* on the IOLoop. If fn raises, the exception is re-raised
+        on the IOLoop inside the caller's stack context."""
+        callback = stack_context.wrap(kwargs.pop("callback"))
+        reraise = stack_context.wrap(_reraise)
+        io_loop = IOLoop.instance()
+
+        def on_outcome(outcome):
+            (result, exc_info) = outcome
+            if exc_info:
+                io_loop.add_callback(partial(reraise, exc_info))
+            else:
+                io_loop.add_callback(partial(callback, result))
+
+        self._get_pool().apply_async(
+                _call,
+                (fn, args, kwargs),
+                callback=on_outcome)
+
+
+    def map(self, fn, items):
+        """Call fn(item) for every item on the pool threads and return the
+        results in completion order. Blocks, so only call it from a thread
+        that isn't the IOLoop or one of this pool's own threads."""
+        return list(self._get_pool().imap_unordered(fn, items))
+
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ThreadPool(self._size)
+        return self._pool
+
+
+def _call(fn, args, kwargs):
+    """Run on a pool thread, capturing the exception instead of losing it in
+    the ThreadPool."""
+    try:
+        return (fn(*args, **kwargs), None)
+    except Exception:
+        return (None, sys.exc_info())
+
+
+def _reraise(exc_info):
+    raise exc_info[0], exc_info[1], exc_info[2]
+
+
+pool = WorkerPool(settings.WORKER_POOL_SIZE)
+sweep_pool = WorkerPool(settings.SWEEP_CONCURRENCY)
+write_pool = WorkerPool(settings.WRITE_CONCURRENCY)
@@ -0,0 +1,170 @@
+"""
+    scheduler
+    ---------
+
+    PriorityScheduler decides the order a sweep works through its Tasks, so a
+    Task whose status affects billing or the customer doesn't wait behind
+    hundreds of idle ones.
+
+    Tasks are ordered by the priority class of their pair first, the class
+    of whichever Task of the pair is more urgent. Within a class each
+    employer's Tasks whose pair has a status transition pending come before
+    those whose statuses already agree, then they go by price, highest
+    first, then by how long ago the Task was last synched, stalest first.
+    The employers take turns within a class: every employer's first Task
+    comes before any employer's second, so one employer with a big backlog
+    can't starve the others. How long each Task waited between being
+    scheduled and being started is reported per class.
+
+"""
+import heapq
+import time
+
+from jutil.decorators import constant
+
+from .metrics import metrics
+from .task import STATUS, STATUS_CODES
+
+
+class _Priority(object):
+
+    @constant
+    def URGENT(self):
+        """Completed, approved and canceled Tasks, which decide billing."""
+        return "urgent"
+
+    @constant
+    def ACTIVE(self):
+        """Tasks being worked on or waiting to be posted."""
+        return "active"
+
+    @constant
+    def IDLE(self):
+        """Posted Tasks nobody has taken, and everything else."""
+        return "idle"
+
+PRIORITY = _Priority()
+
+_PRIORITY_RANKS = {
+        PRIORITY.URGENT: 0,
+        PRIORITY.ACTIVE: 1,
+        PRIORITY.IDLE: 2,
+        }
+
+
+_URGENT_CODES = frozenset([
+        STATUS_CODES.index(STATUS.COMPLETED),
+        STATUS_CODES.index(STATUS.APPROVED),
+        STATUS_CODES.index(STATUS.CANCELED),
+        ])
+
+_ACTIVE_CODES = frozenset([
+        STATUS_CODES.index(STATUS.ASSIGNED),
+        STATUS_CODES.index(STATUS.CREATED),
+        ])
+
+
+def get_priority(task, reciprocal_status_code=None):
+    """Return the PRIORITY class of a `Task`'s pair: the more urgent of the
+    Task's status and reciprocal_status_code, the status code of the other
+    Task of the pair. An employee who just completed a Task the employer
+    still has as posted is as urgent as a completed employer Task."""
+    status_codes = set([task.status_code(), reciprocal_status_code])
+    if status_codes & _URGENT_CODES:
+        return PRIORITY.URGENT
+    elif status_codes & _ACTIVE_CODES:
+        return PRIORITY.ACTIVE
+    return PRIORITY.IDLE
+
+
+class ScheduledTask(object):
+
+    """A Task waiting its turn.
+
+    Attributes
+    ----------
+    worker : `ServiceWorker`
+    task : `Task`
+    priority : str
+        The PRIORITY class.
+    enqueued_ts : `float`
+
+    """
+
+
+    def __init__(self, worker, task, priority):
+        self.worker = worker
+        self.task = task
+        self.priority = priority
+        self.enqueued_ts = time.time()
+
+
+    def start(self):
+        """Record how long the Task waited; call it just before working on
+        it."""
+        metrics.observe(
+                "scheduler_queue_wait_seconds",
+                time.time() - self.enqueued_ts,
+                priority=self.priority)
+
+
+class PriorityScheduler(object):
+
+    """Order Tasks by priority with fairness across workers.
+
+    Attributes
+    ----------
+    _entries : {(priority, worker_name), list}
+        (sort_key, `ScheduledTask`) for each worker in each class.
+    _count : `int`
+        Breaks ties in the order the Tasks were added.
+
+    """
+
+
+    def __init__(self):
+        self._entries = {}
+        self._count = 0
+
+
+    def add(
+            self,
+            worker,
+            task,
+            synched_ts=None,
+            is_settled=False,
+            reciprocal_status_code=None):
+        """Schedule a Task of worker. synched_ts is when its pair was last
+        synched; None counts as never. is_settled says the pair's statuses
+        already agree. reciprocal_status_code is the status code of the
+        other Task of the pair, if known; the pair is ranked by the more
+        urgent side."""
+        scheduled = ScheduledTask(
+                worker,
+                task,
+                get_priority(task, reciprocal_status_code))
+        price = task.price() or 0
+        sort_key = (is_settled, -price, synched_ts or 0, self._count)
+        self._count += 1
+
+        key = (scheduled.priority, worker.name)
+        self._entries.setdefault(key, []).append((sort_key, scheduled))
+
+
+    def drain(self):
+        """Return every scheduled Task in the order to work on them and
+        empty the scheduler."""
+        heap = []
+        for ((priority, worker_name), entries) in self._entries.items():
+            entries.sort()
+            # the turn puts every worker's nth Task before its (n+1)th.
+            for (turn, (sort_key, scheduled)) in enumerate(entries):
+                heap.append(
+                        (_PRIORITY_RANKS[priority], turn, sort_key, scheduled))
+        heapq.heapify(heap)
+        self._entries = {}
+
+        ordered = []
+        while heap:
+            ordered.append(heapq.heappop(heap)[-1])
+        return ordered
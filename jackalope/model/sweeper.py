@@ -0,0 +1,355 @@
+"""
+    sweeper
+    -------
+
+    The Sweeper runs Foreman.send_jack in the background on an IOLoop
+    PeriodicCallback instead of inside an HTTP request. Only one sweep runs at
+    a time across all server processes, guarded by a Postgres advisory lock;
+    a trigger while a sweep is running is ignored. SweepProgress keeps the
+    counts for the current sweep, and they are reported to a row every process
+    can read.
+
+"""
+import logging
+import threading
+import time
+from functools import partial
+
+from tornado import gen, stack_context
+from tornado.ioloop import IOLoop, PeriodicCallback
+
+from jutil.decorators import constant
+
+from .data.db_worker import DbWorker
+from .foreman import Foreman
+from .metrics import metrics
+from .pool import pool
+
+
+class _SweepField(object):
+
+    """Keys of the sweep status dict."""
+
+    @constant
+    def STATE(self):
+        return "state"
+
+    @constant
+    def STARTED_TS(self):
+        return "started_ts"
+
+    @constant
+    def FINISHED_TS(self):
+        return "finished_ts"
+
+    @constant
+    def DURATION(self):
+        return "duration"
+
+    @constant
+    def TASKS_READ(self):
+        return "tasks_read"
+
+    @constant
+    def TASKS_PROCESSED(self):
+        return "tasks_processed"
+
+    @constant
+    def TASKS_ROUTED(self):
+        return "tasks_routed"
+
+    @constant
+    def PAIRS_SKIPPED(self):
+        return "pairs_skipped"
+
+    @constant
+    def ERRORS(self):
+        return "errors"
+
+    @constant
+    def SWEEPS(self):
+        return "sweeps"
+
+SWEEP_FIELD = _SweepField()
+
+
+class _SweepState(object):
+
+    @constant
+    def IDLE(self):
+        return "idle"
+
+    @constant
+    def RUNNING(self):
+        return "running"
+
+SWEEP_STATE = _SweepState()
+
+
+class SweepProgress(object):
+
+    """Counts for one sweep. The Foreman updates them from pool threads while
+    handlers read them on the IOLoop, so every access takes the lock.
+
+    Attributes
+    ----------
+    _started_ts : `float`
+    _finished_ts : `float`
+    _tasks_read : `int`
+        Tasks read from the employers.
+    _tasks_processed : `int`
+        Tasks handed to a Workflow.
+    _tasks_routed : `int`
+        Tasks queued for the server process that owns them.
+    _pairs_skipped : `int`
+        Pairs left alone because neither Task changed since they were last
+        reconciled.
+    _errors : `int`
+        Tasks or employers that raised.
+
+    """
+
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started_ts = time.time()
+        self._finished_ts = None
+        self._tasks_read = 0
+        self._tasks_processed = 0
+        self._tasks_routed = 0
+        self._pairs_skipped = 0
+        self._errors = 0
+
+
+    def add_tasks_read(self, count):
+        with self._lock:
+            self._tasks_read += count
+
+
+    def add_task_processed(self):
+        with self._lock:
+            self._tasks_processed += 1
+
+
+    def add_task_routed(self):
+        with self._lock:
+            self._tasks_routed += 1
+
+
+    def add_pairs_skipped(self, count):
+        with self._lock:
+            self._pairs_skipped += count
+
+
+    def add_error(self):
+        with self._lock:
+            self._errors += 1
+
+
+    def finish(self):
+        with self._lock:
+            self._finished_ts = time.time()
+        metrics.observe("sweep_seconds", self._finished_ts - self._started_ts)
+        metrics.increment("sweep_errors_total", self._errors)
+
+
+    def is_finished(self):
+        return self._finished_ts is not None
+
+
+    def to_dict(self):
+        with self._lock:
+            end_ts = self._finished_ts or time.time()
+            state = SWEEP_STATE.RUNNING
+            if self._finished_ts is not None:
+                state = SWEEP_STATE.IDLE
+
+            return {
+                    SWEEP_FIELD.STATE: state,
+                    SWEEP_FIELD.STARTED_TS: self._started_ts,
+                    SWEEP_FIELD.FINISHED_TS: self._finished_ts,
+                    SWEEP_FIELD.DURATION: end_ts - self._started_ts,
+                    SWEEP_FIELD.TASKS_READ: self._tasks_read,
+                    SWEEP_FIELD.TASKS_PROCESSED: self._tasks_processed,
+                    SWEEP_FIELD.TASKS_ROUTED: self._tasks_routed,
+                    SWEEP_FIELD.PAIRS_SKIPPED: self._pairs_skipped,
+                    SWEEP_FIELD.ERRORS: self._errors,
+                    }
+
+
+class Sweeper(object):
+
+    """Run a full Foreman sweep every interval seconds without overlapping.
+
+    Every server process has a Sweeper and any of them can be triggered, so
+    a sweep only runs while its process holds the sweep advisory lock, and
+    reports its progress to the shared sweep_status row. Whichever process
+    is asked, the status is that of the one sweep.
+
+    Attributes
+    ----------
+    STATUS_INTERVAL : `int`
+        Seconds between progress reports of a running sweep.
+    _interval : `int`
+        Seconds between scheduled sweeps. 0 disables the schedule, leaving
+        only manual triggers.
+    _full_interval : `int`
+        Seconds between full reads of each employer; the sweeps in between
+        only read what changed since the last one.
+    _periodic_callback : `PeriodicCallback`
+    _progress : `SweepProgress`
+        The sweep this process is running or last ran.
+    _affinity : `Affinity`
+    _registry : `WorkerRegistry`
+
+    """
+
+    STATUS_INTERVAL = 5
+
+
+    def __init__(self, interval, full_interval, affinity, registry):
+        self._interval = interval
+        self._full_interval = full_interval
+        self._affinity = affinity
+        self._registry = registry
+        self._periodic_callback = None
+        self._progress = None
+
+
+    def start(self):
+        """Start the schedule on the IOLoop."""
+        if self._interval:
+            self._periodic_callback = PeriodicCallback(
+                    self.trigger,
+                    self._interval * 1000)
+            self._periodic_callback.start()
+
+
+    def stop(self):
+        if self._periodic_callback:
+            self._periodic_callback.stop()
+
+
+    def is_running(self):
+        """Is this process running a sweep?"""
+        return self._progress is not None and not self._progress.is_finished()
+
+
+    @gen.engine
+    def trigger(self, callback=None):
+        """Start a sweep unless one is running in any process, and pass
+        callback True if it started."""
+        started = False
+        if not self.is_running():
+            progress = SweepProgress()
+            self._progress = progress
+            started = yield gen.Task(self._sweep, progress)
+            if not started:
+                self._progress = None
+
+        if callback:
+            callback(started)
+
+
+    def status(self, callback):
+        """Pass callback a dict describing the current or last sweep."""
+        pool.run(_read_status, callback=callback)
+
+
+    @gen.engine
+    def _sweep(self, progress, callback):
+        """Run a sweep on the pool if the sweep lock is free. callback learns
+        whether it is as soon as the sweep has started, not when it ends."""
+        callback = stack_context.wrap(callback)
+        io_loop = IOLoop.instance()
+
+        def on_locked(locked):
+            io_loop.add_callback(partial(callback, locked))
+
+        reporter = PeriodicCallback(
+                partial(_report_progress, progress),
+                self.STATUS_INTERVAL * 1000)
+        reporter.start()
+        try:
+            yield gen.Task(
+                    pool.run,
+                    self._send_jack_exclusively,
+                    progress,
+                    on_locked)
+        except Exception:
+            logging.exception("could not finish the sweep")
+        finally:
+            reporter.stop()
+
+
+    def _send_jack_exclusively(self, progress, on_locked):
+        """Run on a pool thread. Take the sweep lock, then sweep and report
+        the sweep's status while holding it; the lock belongs to this
+        thread's connection, so it has to be let go from here too."""
+        db_worker = DbWorker()
+        sweeps = 0
+        locked = False
+        try:
+            locked = db_worker.try_lock_sweep()
+            if locked:
+                status = db_worker.get_sweep_status() or {}
+                sweeps = status.get(SWEEP_FIELD.SWEEPS) or 0
+                db_worker.update_sweep_status(
+                        _get_status_properties(progress, sweeps))
+        except Exception:
+            on_locked(False)
+            if locked:
+                db_worker.unlock_sweep()
+            raise
+
+        on_locked(locked)
+        if not locked:
+            return
+
+        try:
+            foreman = Foreman(self._registry)
+            foreman.send_jack(progress, self._affinity, self._full_interval)
+        except Exception:
+            logging.exception("sweep failed")
+            progress.add_error()
+        finally:
+            progress.finish()
+            try:
+                db_worker.update_sweep_status(
+                        _get_status_properties(progress, sweeps + 1))
+            finally:
+                db_worker.unlock_sweep()
+
+
+def _get_status_properties(progress, sweeps):
+    """Return the sweep_status columns for progress."""
+    properties = progress.to_dict()
+    properties.pop(SWEEP_FIELD.DURATION)
+    properties[SWEEP_FIELD.SWEEPS] = sweeps
+    return properties
+
+
+def _report_progress(progress):
+    """Write the counts of a running sweep to the shared row."""
+    pool.run(_update_running_status, progress, callback=lambda result: None)
+
+
+def _update_running_status(progress):
+    properties = progress.to_dict()
+    properties.pop(SWEEP_FIELD.DURATION)
+    DbWorker().update_running_sweep_status(
+            properties.get(SWEEP_FIELD.STARTED_TS),
+            properties)
+
+
+def _read_status():
+    status = DbWorker().get_sweep_status()
+    if not status:
+        return {
+                SWEEP_FIELD.STATE: SWEEP_STATE.IDLE,
+                SWEEP_FIELD.SWEEPS: 0,
+                }
+
+    end_ts = status.get(SWEEP_FIELD.FINISHED_TS) or time.time()
+    status[SWEEP_FIELD.DURATION] = end_ts - status.get(SWEEP_FIELD.STARTED_TS)
+    return status
@@ -11,7 +11,14 @@
     superclass. The subclasses are used to define required fields and special
     functionality.
 
+    Tasks and Comments are held by the thousand during a sweep, so they keep
+    their fields in __slots__ rather than dicts, and a Task keeps its status
+    as its integer code in STATUS_CODES. Subclasses add no fields and
+    declare empty __slots__.
+
 """
+import hashlib
+import json
 from pprint import pprint
 
 from jutil.decorators import constant
@@ -89,6 +96,44 @@ class _Status(object):
 
 STATUS = _Status()
 
+# each status's integer code is its index. 0 is a Task without a status.
+STATUS_CODES = [
+        None,
+        STATUS.CREATED,
+        STATUS.POSTED,
+        STATUS.ASSIGNED,
+        STATUS.COMPLETED,
+        STATUS.APPROVED,
+        STATUS.EXPIRED,
+        STATUS.CANCELED,
+        ]
+
+_STATUS_CODE_MAP = dict([
+        (status, code)
+        for (code, status) in enumerate(STATUS_CODES)
+        ])
+
+_CREATED_CODE = _STATUS_CODE_MAP[STATUS.CREATED]
+_POSTED_CODE = _STATUS_CODE_MAP[STATUS.POSTED]
+_ASSIGNED_CODE = _STATUS_CODE_MAP[STATUS.ASSIGNED]
+_COMPLETED_CODE = _STATUS_CODE_MAP[STATUS.COMPLETED]
+_APPROVED_CODE = _STATUS_CODE_MAP[STATUS.APPROVED]
+_EXPIRED_CODE = _STATUS_CODE_MAP[STATUS.EXPIRED]
+_CANCELED_CODE = _STATUS_CODE_MAP[STATUS.CANCELED]
+
+# each field's bit in a Task's mask of updated fields.
+_FIELD_BITS = dict([
+        (field, 1 << bit)
+        for (bit, field) in enumerate([
+                FIELD.STATUS,
+                FIELD.DESCRIPTION,
+                FIELD.PRIVATE_DESCRIPTION,
+                FIELD.EMAIL,
+                FIELD.PRICE,
+                FIELD.LOCATION,
+                ])
+        ])
+
 
 class Task(object):
 
@@ -100,13 +145,35 @@ class Task(object):
     _id : `unicode`
     _name : `unicode`
 
-    _properties : `dict`
+    _status_code : `int`
+        The status's index in STATUS_CODES.
+    _description : `unicode`
+    _private_description : `unicode`
+    _email : `unicode`
+    _price : `int`
+    _location : `int`
     _comments : {id, `Comment`}, optional
-    _updated : `bool`
-        True if the Task has an updated property.
+    _updated_fields : `int`
+        A bit per field in _FIELD_BITS, set when the field changes. The
+        transformers reset it once a Task is loaded from its service, so it
+        tracks the changes the service hasn't seen.
 
     """
 
+    __slots__ = (
+            "_category",
+            "_id",
+            "_name",
+            "_status_code",
+            "_description",
+            "_private_description",
+            "_email",
+            "_price",
+            "_location",
+            "_comments",
+            "_updated_fields",
+            )
+
 
     def __init__(self, category, id, name):
         self._category = category
@@ -114,17 +181,16 @@ class Task(object):
         self._name = name
 
         # doesn't get created until it's in the DB
-        self._properties = {}
-        self._set_status(None)
-        self.set_description(None)
-        self.set_private_description(None)
-        self.set_email(None)
-        self.set_price(None)
-        self.set_location(None)
+        self._status_code = 0
+        self._description = None
+        self._private_description = None
+        self._email = None
+        self._price = None
+        self._location = None
 
         self._comments = {}
 
-        self._updated = False
+        self._updated_fields = 0
 
 
     def category(self):
@@ -141,108 +207,126 @@ class Task(object):
 
     def has_status(self):
         """If the Task has any status then return True."""
-        return self._get_status() is not None
+        return self._status_code != 0
 
 
     def has_same_status(self, other_task):
-        return self._get_status() == other_task._get_status()
+        return self._status_code == other_task._status_code
+
+
+    def status_code(self):
+        """Return the status as its integer code in STATUS_CODES."""
+        return self._status_code
+
+
+    def set_status_code(self, status_code):
+        self._set_status_code(status_code)
 
 
     def is_created(self):
-        return self._get_status() == STATUS.CREATED
+        return self._status_code == _CREATED_CODE
 
 
     def set_status_to_created(self):
-        self._set_status(STATUS.CREATED)
+        self._set_status_code(_CREATED_CODE)
 
 
     def is_posted(self):
-        return self._get_status() == STATUS.POSTED
+        return self._status_code == _POSTED_CODE
 
 
     def set_status_to_posted(self):
-        self._set_status(STATUS.POSTED)
+        self._set_status_code(_POSTED_CODE)
 
 
     def is_assigned(self):
-        return self._get_status() == STATUS.ASSIGNED
+        return self._status_code == _ASSIGNED_CODE
 
 
     def set_status_to_assigned(self):
-        self._set_status(STATUS.ASSIGNED)
+        self._set_status_code(_ASSIGNED_CODE)
 
 
     def is_completed(self):
-        return self._get_status() == STATUS.COMPLETED
+        return self._status_code == _COMPLETED_CODE
 
 
     def set_status_to_completed(self):
-        self._set_status(STATUS.COMPLETED)
+        self._set_status_code(_COMPLETED_CODE)
 
 
     def is_approved(self):
-        return self._get_status() == STATUS.APPROVED
+        return self._status_code == _APPROVED_CODE
 
 
     def set_status_to_approved(self):
-        self._set_status(STATUS.APPROVED)
+        self._set_status_code(_APPROVED_CODE)
 
 
     def is_expired(self):
-        return self._get_status() == STATUS.EXPIRED
+        return self._status_code == _EXPIRED_CODE
 
 
     def set_status_to_expired(self):
-        self._set_status(STATUS.EXPIRED)
+        self._set_status_code(_EXPIRED_CODE)
 
 
     def is_canceled(self):
-        return self._get_status() == STATUS.CANCELED
+        return self._status_code == _CANCELED_CODE
 
 
     def set_status_to_canceled(self):
-        self._set_status(STATUS.CANCELED)
+        self._set_status_code(_CANCELED_CODE)
 
 
     def description(self):
-        return self._get_property(FIELD.DESCRIPTION)
+        return self._description
 
 
     def set_description(self, description):
-        self._set_property(FIELD.DESCRIPTION, description)
+        self._mark_updated(FIELD.DESCRIPTION, self._description, description)
+        self._description = description
 
 
     def private_description(self):
-        return self._get_property(FIELD.PRIVATE_DESCRIPTION)
+        return self._private_description
 
 
     def set_private_description(self, private_description):
-        self._set_property(FIELD.PRIVATE_DESCRIPTION, private_description)
+        self._mark_updated(
+                FIELD.PRIVATE_DESCRIPTION,
+                self._private_description,
+                private_description)
+        self._private_description = private_description
 
 
     def price(self):
-        return self._get_property(FIELD.PRICE)
+        return self._price
 
 
     def set_price(self, price):
         int_price = to_integer(price)
-        self._set_property(FIELD.PRICE, int_price)
+        self._mark_updated(FIELD.PRICE, self._price, int_price)
+        self._price = int_price
+
 
     def email(self):
-        return self._get_property(FIELD.EMAIL)
+        return self._email
 
 
     def set_email(self, email):
-        self._set_property(FIELD.EMAIL, email)
+        self._mark_updated(FIELD.EMAIL, self._email, email)
+        self._email = email
 
 
     def location(self):
-        return self._get_property(FIELD.LOCATION)
+        return self._location
 
 
     def set_location(self, location_id):
         int_location = to_integer(location_id)
-        self._set_property(FIELD.LOCATION, int_location)
+        self._mark_updated(FIELD.LOCATION, self._location, int_location)
+        self._location = int_location
 
 
     def get_comments(self):
@@ -267,14 +351,51 @@ class Task(object):
         return sorted(new_comments, key=lambda c: c.created_ts())
 
 
+    def get_comments_after_cursor(self, cursor_ts, cursor_id):
+        """Return a list of the Comments after the comment cursor, oldest
+        first. Comments created in the cursor's second other than the cursor
+        comment itself are included, since ids don't order them."""
+        new_comments = [
+                comment
+                for comment in self.get_comments().values()
+                if comment.created_ts() > cursor_ts or (
+                        comment.created_ts() == cursor_ts and
+                        unicode(comment.id()) != cursor_id)
+                ]
+
+        return sorted(
+                new_comments,
+                key=lambda c: (c.created_ts(), unicode(c.id())))
+
+
     def is_updated(self):
-        """Return True if the Task has been updated since creation."""
-        return self._updated
+        """Return True if a field has changed since the Task was loaded from
+        its service or last reset."""
+        return self._updated_fields != 0
 
 
     def reset_updated(self):
-        """Reset's the Task's updated state to False."""
-        self._updated = False
+        """Reset's the Task's updated state to False, e.g. once its service
+        has the Task as it is."""
+        self._updated_fields = 0
+
+
+    def get_updated_fields(self):
+        """Return a list of the names of the fields that have changed."""
+        return [
+                field
+                for (field, bit) in _FIELD_BITS.items()
+                if self._updated_fields & bit
+                ]
+
+
+    def fingerprint(self):
+        """Return a stable hex digest of the fields status reconciliation
+        reads: the category picks the Workflow and the statuses drive it.
+        Comments aren't covered, so a Task whose fingerprint hasn't changed
+        may still have new comments to ferry."""
+        fields = [self._category, self._id, self._status_code]
+        return hashlib.sha1(json.dumps(fields)).hexdigest()
 
 
     def is_spec_ready(self):
@@ -309,22 +430,18 @@ class Task(object):
         pprint(task_dict)
 
 
-    def _get_property(self, key):
-        return self._properties.get(key)
-
+    def _get_status(self):
+        return STATUS_CODES[self._status_code]
 
-    def _set_property(self, key, value):
-        self._properties[key] = value
-        self._updated = True
-        return self._properties.get(key)
 
+    def _set_status_code(self, status_code):
+        self._mark_updated(FIELD.STATUS, self._status_code, status_code)
+        self._status_code = status_code
 
-    def _get_status(self):
-        return self._get_property(FIELD.STATUS)
 
-
-    def _set_status(self, status):
-        self._set_property(FIELD.STATUS, status)
+    def _mark_updated(self, field, value, new_value):
+        if new_value != value:
+            self._updated_fields |= _FIELD_BITS[field]
 
 
 class RegistrationTask(Task):
@@ -332,6 +449,8 @@ class RegistrationTask(Task):
     """The Task for registering new users with Jackalope. This Task uses
     SoloWorkflow."""
 
+    __slots__ = ()
+
 
     def get_required_accessors(self):
         """Return a list of required fields' accessors."""
@@ -346,6 +465,8 @@ class PricedTask(Task):
 
     """A Task that requires a price. This Task uses PairedWorkflow."""
 
+    __slots__ = ()
+
 
     def get_required_accessors(self):
         """Return a list of required fields' accessors."""
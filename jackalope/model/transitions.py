@@ -0,0 +1,195 @@
+"""
+    transitions
+    -----------
+
+    The status rules for an employer and employee task pair, compiled into a
+    transition table indexed by the integer codes of the two statuses.
+
+    The rules are kept in precedence order, like the elif ladder they
+    replace: a pair of statuses gets the first rule that matches. Two equal
+    statuses never change, and a pair no rule matches is invalid. Compiling
+    turns every lookup into one index into the table, so the statuses of a
+    whole sweep can be evaluated in a single pass with evaluate_many, which
+    the Foreman does before scheduling the sweep.
+
+"""
+from array import array
+from itertools import imap, repeat
+from operator import add, mul
+
+from jutil.decorators import constant
+
+from .task import STATUS, STATUS_CODES
+
+
+class _Side(object):
+
+    """The task of the pair a Transition changes."""
+
+    @constant
+    def EMPLOYER(self):
+        return "employer"
+
+    @constant
+    def EMPLOYEE(self):
+        return "employee"
+
+SIDE = _Side()
+
+
+class Transition(object):
+
+    """Move one side of a pair to a new status.
+
+    Attributes
+    ----------
+    side : str
+        SIDE.EMPLOYER or SIDE.EMPLOYEE.
+    status_code : `int`
+        The new status's code in STATUS_CODES.
+    note : str
+        What happened, for the logs.
+
+    """
+
+
+    def __init__(self, side, status, note):
+        self.side = side
+        self.status_code = STATUS_CODES.index(status)
+        self.note = note
+
+
+class TransitionTable(object):
+
+    """The rules for every (employer_status, employee_status) pair.
+
+    Attributes
+    ----------
+    NO_CHANGE : `int`
+        The outcome for a pair that already agrees.
+    INVALID : `int`
+        The outcome for a pair no rule covers.
+    _transitions : list
+        The Transition of each rule; other outcomes index into it.
+    _status_count : `int`
+    _table : array
+        Outcomes, row major on the employer status code.
+
+    """
+
+    NO_CHANGE = -1
+
+    INVALID = -2
+
+
+    def __init__(self, rules):
+        """rules is an ordered list of (employer_statuses, employee_statuses,
+        `Transition`), where None for the statuses matches any status."""
+        self._transitions = [transition for (_, _, transition) in rules]
+        self._status_count = len(STATUS_CODES)
+        self._table = array("b", [self.INVALID] * self._status_count ** 2)
+
+        for employer_code in range(self._status_count):
+            for employee_code in range(self._status_count):
+                self._table[self._index(employer_code, employee_code)] = (
+                        self._compile(rules, employer_code, employee_code))
+
+
+    def evaluate(self, employer_code, employee_code):
+        """Return the outcome for one pair of status codes."""
+        return self._table[self._index(employer_code, employee_code)]
+
+
+    def evaluate_many(self, employer_codes, employee_codes):
+        """Return an array("b") of the outcome for each pair of status codes
+        in two parallel sequences, such as the array("b") status codes of a
+        whole sweep. The indexes and lookups are chained maps, so no Python
+        code runs per pair."""
+        indexes = imap(
+                add,
+                imap(mul, employer_codes, repeat(self._status_count)),
+                employee_codes)
+        return array("b", imap(self._table.__getitem__, indexes))
+
+
+    def get_transition(self, outcome):
+        """Return the Transition for an outcome that isn't NO_CHANGE or
+        INVALID."""
+        return self._transitions[outcome]
+
+
+    def _index(self, employer_code, employee_code):
+        return employer_code * self._status_count + employee_code
+
+
+    def _compile(self, rules, employer_code, employee_code):
+        if employer_code == employee_code:
+            return self.NO_CHANGE
+
+        employer_status = STATUS_CODES[employer_code]
+        employee_status = STATUS_CODES[employee_code]
+        for (outcome, (employer_statuses, employee_statuses, _)) in (
+                enumerate(rules)):
+            if (
+                    _matches(employer_statuses, employer_status) and
+                    _matches(employee_statuses, employee_status)
+                    ):
+                return outcome
+
+        return self.INVALID
+
+
+def _matches(statuses, status):
+    return statuses is None or status in statuses
+
+
+TRANSITION_TABLE = TransitionTable([
+        # employer created / employee posted
+        (
+                [STATUS.CREATED],
+                [STATUS.POSTED],
+                Transition(
+                        SIDE.EMPLOYER,
+                        STATUS.POSTED,
+                        "Task just POSTED to employee")),
+        # employer posted / employee assigned
+        (
+                [STATUS.POSTED],
+                [STATUS.ASSIGNED],
+                Transition(
+                        SIDE.EMPLOYER,
+                        STATUS.ASSIGNED,
+                        "Task just ASSIGNED to employee.")),
+        # employee task is completed and employer task is assigned
+        (
+                [STATUS.POSTED, STATUS.ASSIGNED],
+                [STATUS.COMPLETED],
+                Transition(
+                        SIDE.EMPLOYER,
+                        STATUS.COMPLETED,
+                        "Task just COMPLETED by employee.")),
+        # employer approved / employee completed
+        (
+                [STATUS.APPROVED],
+                [STATUS.COMPLETED],
+                Transition(
+                        SIDE.EMPLOYEE,
+                        STATUS.APPROVED,
+                        "Task just APPROVED by employer.")),
+        # employee expired
+        (
+                None,
+                [STATUS.EXPIRED],
+                Transition(
+                        SIDE.EMPLOYER,
+                        STATUS.EXPIRED,
+                        "Task just EXPIRED by employee.")),
+        # employer canceled
+        (
+                [STATUS.CANCELED],
+                None,
+                Transition(
+                        SIDE.EMPLOYEE,
+                        STATUS.CANCELED,
+                        "Task just CANCELED by employer.")),
+        ])
@@ -0,0 +1,125 @@
+"""
+    unit_of_work
+    ------------
+
+    A UnitOfWork is an identity map of the raw vendor task dicts fetched
+    while reconciling one task pair. Inside it every vendor task is fetched
+    at most once, however many times the Workflow and the ServiceWorkers ask
+    for it, and a write replaces the cached copy with what the vendor sent
+    back.
+
+    The current UnitOfWork belongs to the thread, so the ServiceWorkers find
+    it without it being passed around; pool threads running part of the
+    reconciliation join it. Fetches and cache hits are reported as metrics
+    when it closes.
+
+"""
+import threading
+from contextlib import contextmanager
+
+from .metrics import metrics
+
+
+class UnitOfWork(object):
+
+    """Raw vendor task dicts keyed on (vendor_name, task_id).
+
+    Attributes
+    ----------
+    _lock : `threading.Lock`
+        Pool threads that joined the UnitOfWork use it too.
+    _raw_tasks : {(vendor_name, task_id), dict}
+    _fetches : {vendor_name, `int`}
+        Calls that went to the vendor.
+    _hits : {vendor_name, `int`}
+        Calls answered from the map.
+
+    """
+
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._raw_tasks = {}
+        self._fetches = {}
+        self._hits = {}
+
+
+    def read_raw_task(self, vendor_name, task_id, fetch):
+        """Return the raw task dict, calling fetch() for it the first time."""
+        key = (vendor_name, unicode(task_id))
+        with self._lock:
+            raw_task = self._raw_tasks.get(key)
+            if raw_task is not None:
+                self._hits[vendor_name] = self._hits.get(vendor_name, 0) + 1
+                return raw_task
+
+        # fetch outside the lock; two threads racing for the same task both
+        # fetch, which is harmless.
+        raw_task = fetch()
+        with self._lock:
+            self._fetches[vendor_name] = (
+                    self._fetches.get(vendor_name, 0) + 1)
+            if raw_task is not None:
+                self._raw_tasks[key] = raw_task
+        return raw_task
+
+
+    def remember_raw_task(self, vendor_name, task_id, raw_task):
+        """Replace the cached copy after a write returned the new one."""
+        with self._lock:
+            self._raw_tasks[(vendor_name, unicode(task_id))] = raw_task
+
+
+    def record_metrics(self):
+        for (vendor_name, count) in self._fetches.items():
+            metrics.increment(
+                    "vendor_task_fetches_total",
+                    count,
+                    vendor=vendor_name)
+        for (vendor_name, count) in self._hits.items():
+            metrics.increment(
+                    "vendor_task_cache_hits_total",
+                    count,
+                    vendor=vendor_name)
+        metrics.observe(
+                "vendor_task_fetches_per_reconciliation",
+                sum(self._fetches.values()))
+
+
+_local = threading.local()
+
+
+def current_unit_of_work():
+    """Return this thread's open UnitOfWork, or None."""
+    return getattr(_local, "unit_of_work", None)
+
+
+@contextmanager
+def unit_of_work():
+    """Open a UnitOfWork on this thread for the duration of the with block.
+    A block nested in another one joins the outer UnitOfWork."""
+    work = current_unit_of_work()
+    if work is not None:
+        yield work
+        return
+
+    work = UnitOfWork()
+    _local.unit_of_work = work
+    try:
+        yield work
+    finally:
+        _local.unit_of_work = None
+        work.record_metrics()
+
+
+@contextmanager
+def joined(work):
+    """Make work, which may be None, this thread's UnitOfWork for the
+    duration of the with block. Used by pool threads doing part of another
+    thread's reconciliation."""
+    previous = current_unit_of_work()
+    _local.unit_of_work = work
+    try:
+        yield work
+    finally:
+        _local.unit_of_work = previous
@@ -6,6 +6,8 @@
 
 """
 import time
+from datetime import datetime
+from functools import partial
 import dateutil.parser
 import dateutil.tz
 from asana import asana
@@ -93,6 +95,12 @@ class _Asana(object):
     def DEV_PROJECT_ID(self):
         return environment.get_integer(unicode("ASANA_DEV_PROJECT_ID"))
 
+    @constant
+    def MODIFIED_SINCE_OVERLAP(self):
+        """Seconds subtracted from a modified since filter in case our clock
+        is ahead of Asana's."""
+        return 60
+
     @constant
     def VENDOR(self):
         return "asana"
@@ -131,22 +139,30 @@ class AsanaEmployer(Employer):
 
     def read_task(self, task_id):
         """Return a Task from the vendor."""
-        raw_task = self._asana_api.get_task(task_id)
+        raw_task = self._read_raw_task(
+                task_id,
+                partial(self._asana_api.get_task, task_id))
 
-        transformer = AsanaTaskTransformer()
-        transformer.set_raw_task(raw_task)
-        return self._ready_spec(transformer.get_task())
+        return self._ready_spec(_task_transformer.construct_task(raw_task))
 
 
-    def read_tasks(self):
-        """Read all tasks from vendor and return Tasks as dict."""
+    def read_tasks(self, modified_since=None):
+        """Read all tasks, or those modified since the epoch seconds
+        modified_since, from vendor and return Tasks as dict."""
         print "\nSTEP 1: READ ALL ASANA TASKS ------>\n"
 
         test_workspace_id = self._retrieve_id(
                 self._workspaces.get(ASANA.WORKSPACE_ID))
 
-        short_asana_tasks = self._produce_dict(
-                self._asana_api.list_tasks(test_workspace_id, ASANA.ME))
+        if modified_since is None:
+            raw_short_tasks = self._asana_api.list_tasks(
+                    test_workspace_id,
+                    ASANA.ME)
+        else:
+            raw_short_tasks = self._list_tasks_modified_since(
+                    test_workspace_id,
+                    modified_since)
+        short_asana_tasks = self._produce_dict(raw_short_tasks)
 
         tasks = {}
         for asana_task_id in short_asana_tasks.keys():
@@ -160,38 +176,75 @@ class AsanaEmployer(Employer):
                         ASANA.DEV_PROJECT_ID)
 
             if process_task:
-                transformer = AsanaTaskTransformer()
-                transformer.set_raw_task(raw_task)
-                tasks[asana_task_id] = self._ready_spec(transformer.get_task())
+                tasks[asana_task_id] = self._ready_spec(
+                        _task_transformer.construct_task(raw_task))
 
         print "-------> ASANA TASKS READ. Return:", [k for k in tasks.keys()]
 
         return tasks
 
 
+    def list_task_ids_modified_since(self, modified_since):
+        """Return the set of unicode ids of the tasks modified since the
+        epoch seconds modified_since. Asana counts a new story, and so a new
+        comment, as modifying its task."""
+        workspace_id = self._retrieve_id(
+                self._workspaces.get(ASANA.WORKSPACE_ID))
+        raw_short_tasks = self._list_tasks_modified_since(
+                workspace_id,
+                modified_since)
+        return set([
+                unicode(self._retrieve_id(raw_short_task))
+                for raw_short_task in raw_short_tasks
+                ])
+
+
+    def _list_tasks_modified_since(self, workspace_id, modified_since):
+        """List the short tasks modified since the epoch seconds
+        modified_since, less an overlap for clock skew with Asana."""
+        since_dt = datetime.utcfromtimestamp(
+                modified_since - ASANA.MODIFIED_SINCE_OVERLAP)
+        target = "tasks?workspace={}&assignee={}&modified_since={}".format(
+                workspace_id,
+                ASANA.ME,
+                since_dt.strftime("%Y-%m-%dT%H:%M:%SZ"))
+
+        # the wrapper's list_tasks can't filter, so use its request helper.
+        return self._asana_api._asana(target)
+
+
     def update_task(self, task):
-        """Connect to Worker's service and update the task."""
-        transformer = AsanaTaskTransformer()
-        transformer.set_task(task)
+        """Connect to Worker's service and update the task. Only what changed
+        since the task was read is sent, and nothing at all if nothing
+        changed."""
+        if not task.is_updated():
+            return task
+
+        # the notes hold every embedded field, so they go out whole or not
+        # at all, and are only serialized when one of them changed.
+        raw_task = _task_transformer.deconstruct_task(
+                task,
+                _task_transformer.has_embedded_changes(task))
+        notes = _task_transformer.get_embedding_field_value(raw_task)
 
         new_raw_task_dict = self._asana_api.update_task(
                 task.id(),
-                task.name(),
+                None,  # the name never changes
                 None,  # updated assignee
                 None,  # assignee status
-                transformer.is_asana_completed(),
+                _task_transformer.is_asana_completed(raw_task),
                 None,  # updated due date
-                transformer.get_embedding_field_value())  # update notes
-
-        new_transformer = AsanaTaskTransformer()
-        new_transformer.set_raw_task(new_raw_task_dict)
+                notes)  # updated notes
+        self._remember_raw_task(task.id(), new_raw_task_dict)
+        task.reset_updated()
 
         # FIXME XXX: These need to be queued somewhere
         #self.add_comment(task.id(), Phrase.task_posted_note)
         #self.add_comment(task.id(), Phrase.task_assigned_note)
         #self.add_comment(task.id(), Phrase.task_completed_note)
 
-        return self._ready_spec(new_transformer.get_task())
+        return self._ready_spec(
+                _task_transformer.construct_task(new_raw_task_dict))
 
 
     def request_required_fields(self, task):
@@ -202,10 +255,7 @@ class AsanaEmployer(Employer):
             if accessor() is None:
                 accessors_to_request.append(accessor)
 
-        transformer = AsanaTaskTransformer()
-        transformer.set_task(task)
-        fields_to_request = transformer.transform_accessors_to_fields(
-                task,
+        fields_to_request = _task_transformer.transform_accessors_to_fields(
                 accessors_to_request)
 
         # FIXME update all the fields instead of just status
@@ -225,9 +275,9 @@ class AsanaEmployer(Employer):
         return self._asana_api.add_story(to_integer(task_id), message)
 
 
-    def read_comments(self, task_id):
+    def read_comments(self, task_id, since_ts=None):
         """Read Comments for a task from service and return a dict keyed on
-        id.
+        id, leaving out those created before the epoch seconds since_ts.
 
         Note: Currently we're only returning the comments made by the service's
         user. Later this should be moved to a function in the Task.
@@ -235,6 +285,18 @@ class AsanaEmployer(Employer):
         """
         raw_stories = self._read_stories(task_id)
 
+        # the stories API can't filter on time, so drop the old stories
+        # before converting any. created_at is an ISO 8601 UTC string, which
+        # sorts like the time it stands for.
+        if since_ts is not None:
+            since = datetime.utcfromtimestamp(since_ts).strftime(
+                    "%Y-%m-%dT%H:%M:%S")
+            raw_stories = [
+                    raw_story
+                    for raw_story in raw_stories
+                    if raw_story[ASANA_FIELD.CREATED_AT] >= since
+                    ]
+
         # pull raw comments from raw stories list.
         raw_comments = []
         for raw_story in raw_stories:
@@ -285,10 +347,10 @@ class AsanaTaskTransformer(TaskTransformer):
         return is_task_in_project
 
 
-    def is_asana_completed(self):
+    def is_asana_completed(self, raw_task):
         """ Return True if Asana's completed status is True. This corresponds
         to states VALUE.COMPLETED and VALUE.APPROVED. """
-        is_completed = self.get_raw_task().get(ASANA_FIELD.COMPLETED)
+        is_completed = raw_task.get(ASANA_FIELD.COMPLETED)
         return is_completed
 
 
@@ -349,6 +411,8 @@ class AsanaTaskTransformer(TaskTransformer):
                 FIELD.STATUS,
                 ]
 
+_task_transformer = AsanaTaskTransformer()
+
 
 class AsanaCommentTransformer(CommentTransformer):
 
@@ -0,0 +1,80 @@
+"""
+    registry
+    --------
+
+    WorkerRegistry holds the process's ServiceWorkers. Building a worker can
+    talk to its service (AsanaEmployer lists its workspaces), so the workers
+    are built once at startup and shared by every Foreman instead of being
+    built for every request. refresh() rebuilds them and swaps the whole set
+    in at once, so a Foreman always sees workers from a single generation.
+
+"""
+import threading
+
+from .asana_employer import AsanaEmployer, ASANA
+from .send_jack_employer import SendJackEmployer, SEND_JACK
+from .task_rabbit_employee import TaskRabbitEmployee, TASK_RABBIT
+
+
+class WorkerRegistry(object):
+
+    """App-scoped ServiceWorkers shared safely across requests.
+
+    Attributes
+    ----------
+    _lock : `threading.Lock`
+        Guards swapping the worker set.
+    _worker_set : (employers, employees)
+        Two dicts of ServiceWorkers keyed on vendor name. They are never
+        mutated once built.
+
+    """
+
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._worker_set = None
+
+
+    def start(self):
+        """Build the workers. Call before anything asks for them."""
+        self.refresh()
+
+
+    def refresh(self):
+        """Rebuild every worker and swap the new set in."""
+        employers = {
+                ASANA.VENDOR: AsanaEmployer(),
+                SEND_JACK.VENDOR: SendJackEmployer()
+                }
+
+        employees = {
+                TASK_RABBIT.VENDOR: TaskRabbitEmployee()
+                }
+
+        with self._lock:
+            self._worker_set = (employers, employees)
+
+
+    def shutdown(self):
+        """Drop the workers. Foremen already holding them can finish."""
+        with self._lock:
+            self._worker_set = None
+
+
+    def get_worker_set(self):
+        """Return the current (employers, employees) dicts."""
+        with self._lock:
+            worker_set = self._worker_set
+
+        if worker_set is None:
+            raise RegistryNotStartedError()
+        return worker_set
+
+
+class RegistryNotStartedError(Exception):
+
+    REASON = unicode("The WorkerRegistry hasn't been started.")
+
+    def __init__(self):
+        super(RegistryNotStartedError, self).__init__(self.REASON)
@@ -6,6 +6,8 @@
     tasks.
 
 """
+from functools import partial
+
 from jutil.decorators import constant
 from jutil import environment
 
@@ -93,21 +95,22 @@ class SendJackEmployer(Employer):
         path = unicode("{}/{}").format(
                 SEND_JACK.TASK_PATH,
                 task_id)
-        raw_task = self._get(SEND_JACK.PROTOCOL, SEND_JACK.DOMAIN, path)
+        raw_task = self._read_raw_task(
+                task_id,
+                partial(self._get, SEND_JACK.PROTOCOL, SEND_JACK.DOMAIN, path))
 
-        transformer = SendJackTaskTransformer()
-        transformer.set_raw_task(raw_task)
-        return self._ready_spec(transformer.get_task())
+        return self._ready_spec(_task_transformer.construct_task(raw_task))
 
 
-    def read_tasks(self):
+    def read_tasks(self, modified_since=None):
         raise NotImplementedError()
 
 
     def update_task(self, task):
-        transformer = SendJackTaskTransformer()
-        transformer.set_task(task)
-        raw_task_dict = transformer.get_raw_task()
+        """Send the fields that changed since the task was read, if any."""
+        raw_task_dict = _task_transformer.deconstruct_task_changes(task)
+        if not raw_task_dict:
+            return task
 
         path = unicode("{}/{}").format(SEND_JACK.TASK_PATH, task.id())
         updated_task_dict = self._put(
@@ -115,11 +118,11 @@ class SendJackEmployer(Employer):
                 SEND_JACK.DOMAIN,
                 path,
                 raw_task_dict)
+        self._remember_raw_task(task.id(), updated_task_dict)
+        task.reset_updated()
 
-        updated_transformer = SendJackTaskTransformer()
-        updated_transformer.set_raw_task(updated_task_dict)
-
-        return self._ready_spec(updated_transformer.get_task())
+        return self._ready_spec(
+                _task_transformer.construct_task(updated_task_dict))
 
 
     def request_required_fields(self, task):
@@ -149,7 +152,7 @@ class SendJackEmployer(Employer):
         return new_comment_dict is not None
 
 
-    def read_comments(self, task_id):
+    def read_comments(self, task_id, since_ts=None):
         # FIXME: This does nothing and it should.
         return {}
 
@@ -210,3 +213,5 @@ class SendJackTaskTransformer(TaskTransformer):
             raw_task[FIELD.STATUS] = SEND_JACK_VALUE.CONFIRMED
 
         return raw_task
+
+_task_transformer = SendJackTaskTransformer()
@@ -4,6 +4,8 @@ TaskRabbitEmployee subclasses Employee and handles all interaction between
 Jackalope and TaskRabbit.
 
 """
+from functools import partial
+
 from jutil.decorators import constant
 from jutil import environment
 from redflag import redflag
@@ -177,9 +179,7 @@ class TaskRabbitEmployee(Employee):
     def create_task(self, task):
         """Use Task to create a task in the Worker's service and then return
         the new Task."""
-        transformer = TaskRabbitTaskTransformer()
-        transformer.set_task(task)
-        raw_task_dict = transformer.get_raw_task()
+        raw_task_dict = _task_transformer.deconstruct_task(task)
 
         # TODO: do this check in the base class
         raw_task_dict.get(TASK_RABBIT_FIELD.TASK).pop(FIELD.ID)
@@ -206,28 +206,38 @@ class TaskRabbitEmployee(Employee):
                 TASK_RABBIT.DOMAIN,
                 path,
                 updated_fields_dict)
+        self._remember_raw_task(tr_id, new_raw_task_dict)
 
-        new_transformer = TaskRabbitTaskTransformer()
-        new_transformer.set_raw_task(new_raw_task_dict)
-
-        return self._ready_spec(new_transformer.get_task())
+        return self._ready_spec(
+                _task_transformer.construct_task(new_raw_task_dict))
 
 
     def read_task(self, task_id):
         """Connect to the ServiceWorker's service and return a Task."""
-        path = unicode("{}/{}").format(TASK_RABBIT.TASKS_PATH, str(task_id))
-        raw_task = self._get(
-                TASK_RABBIT.PROTOCOL,
-                TASK_RABBIT.DOMAIN,
-                path)
+        raw_task = self._get_raw_task(task_id)
+
+        return self._ready_spec(_task_transformer.construct_task(raw_task))
+
 
-        transformer = TaskRabbitTaskTransformer()
-        transformer.set_raw_task(raw_task)
-        return self._ready_spec(transformer.get_task())
+    def read_tasks(self, modified_since=None):
+        """ Connect to Worker's service and return all tasks. TaskRabbit
+        can't filter on modification time, so modified_since is ignored.
+
+        Return:
+        dict    all the Tasks keyed on id
+
+        """
+        tasks = self.list_tasks()
+        for task_rabbit_task_id in tasks.keys():
+            tasks[task_rabbit_task_id] = self._ready_spec(
+                    tasks[task_rabbit_task_id])
+
+        return tasks
 
 
-    def read_tasks(self):
-        """ Connect to Worker's service and return all tasks.
+    def list_tasks(self):
+        """ Connect to Worker's service and return all tasks as they are,
+        without readying their specs, so nothing is written back.
 
         Return:
         dict    all the Tasks keyed on id
@@ -242,10 +252,8 @@ class TaskRabbitEmployee(Employee):
 
         tasks = {}
         for task_rabbit_task_id in task_rabbit_tasks.keys():
-            transformer = TaskRabbitTaskTransformer()
-            transformer.set_raw_task(task_rabbit_tasks[task_rabbit_task_id])
-            tasks[task_rabbit_task_id] = self._ready_spec(
-                    transformer.get_task())
+            tasks[task_rabbit_task_id] = _task_transformer.construct_task(
+                    task_rabbit_tasks[task_rabbit_task_id])
 
         return tasks
 
@@ -254,17 +262,9 @@ class TaskRabbitEmployee(Employee):
         """Connect to worker's service and update the task."""
         # TODO: make update_task work for the general case.
         # Get the task status from Task Rabbit using the task_id
-        task_path = unicode("{}/{}").format(
-                TASK_RABBIT.TASKS_PATH,
-                str(task.id()))
-        raw_task = self._get(
-                TASK_RABBIT.PROTOCOL,
-                TASK_RABBIT.DOMAIN,
-                task_path)
+        raw_task = self._get_raw_task(task.id())
 
-        transformer = TaskRabbitTaskTransformer()
-        transformer.set_raw_task(raw_task)
-        tr_task = transformer.get_task()
+        tr_task = _task_transformer.construct_task(raw_task)
 
         updated_task = None
         if not tr_task.is_approved() and task.is_approved():
@@ -287,22 +287,15 @@ class TaskRabbitEmployee(Employee):
                 TASK_RABBIT.DOMAIN,
                 close_path,
                 {})
-        closed_transformer = TaskRabbitTaskTransformer()
-        closed_transformer.set_raw_task(closed_task_dict)
-
-        return self._ready_spec(closed_transformer.get_task())
+        self._remember_raw_task(id, closed_task_dict)
+        return self._ready_spec(
+                _task_transformer.construct_task(closed_task_dict))
 
 
     def add_comment(self, task_id, message):
         """Create a comment in the service on a task."""
         # Get the runner_email from Task Rabbit using the task_id
-        task_path = unicode("{}/{}").format(
-                TASK_RABBIT.TASKS_PATH,
-                str(task_id))
-        raw_task = self._get(
-                TASK_RABBIT.PROTOCOL,
-                TASK_RABBIT.DOMAIN,
-                task_path)
+        raw_task = self._get_raw_task(task_id)
         runner_email = raw_task.get(TASK_RABBIT_FIELD.RUNNER, {}).get(
                 TASK_RABBIT_FIELD.EMAIL)
 
@@ -317,7 +310,7 @@ class TaskRabbitEmployee(Employee):
         return True
 
 
-    def read_comments(self, task_id):
+    def read_comments(self, task_id, since_ts=None):
         """Read Comments for a task from service and return a dict keyed on
         id."""
         # the easiest way to get comments from task rabbit is through the task.
@@ -344,6 +337,17 @@ class TaskRabbitEmployee(Employee):
         return comments
 
 
+    def _get_raw_task(self, task_id):
+        """Return the raw task dict, fetched once per UnitOfWork."""
+        path = unicode("{}/{}").format(TASK_RABBIT.TASKS_PATH, str(task_id))
+        fetch = partial(
+                self._get,
+                TASK_RABBIT.PROTOCOL,
+                TASK_RABBIT.DOMAIN,
+                path)
+        return self._read_raw_task(task_id, fetch)
+
+
 class TaskRabbitTaskTransformer(TaskTransformer):
 
     """ Handle parsing the service's response dictionary to construct a Task
@@ -361,11 +365,11 @@ class TaskRabbitTaskTransformer(TaskTransformer):
         super(TaskRabbitTaskTransformer, self).__init__(None)
 
 
-    def _deconstruct_task_to_dict(self):
+    def _deconstruct_task_to_dict(self, task, with_embedding=True):
         """ Deconstruct Task into a raw task dict and return it. """
         raw_task = super(
                 TaskRabbitTaskTransformer,
-                self)._deconstruct_task_to_dict()
+                self)._deconstruct_task_to_dict(task, with_embedding)
 
         # TODO: Remove this when incoming tasks have location
         location_service_field = self._get_service_field_name(FIELD.LOCATION)
@@ -475,3 +479,5 @@ class TaskRabbitTaskTransformer(TaskTransformer):
     def _embedded_fields(self):
         """ Return a list of embedded fields as Jackalope field names. """
         return []
+
+_task_transformer = TaskRabbitTaskTransformer()
@@ -6,8 +6,10 @@
     api object. See worker.py for additional context.
 
 """
+import hashlib
 import re
-from copy import deepcopy
+import threading
+from collections import OrderedDict
 
 from jutil.base_type import to_unicode
 from jutil.decorators import constant
@@ -106,19 +108,115 @@ class _Value(object):
 VALUE = _Value()
 
 
+# The Task's (accessor, mutator) names for each Jackalope field. Fields that
+# are only set when the Task is built have no mutator.
+_TASK_PROPERTIES = {
+        FIELD.CATEGORY: ("category", None),
+        FIELD.ID: ("id", None),
+        FIELD.NAME: ("name", None),
+        FIELD.PRICE: ("price", "set_price"),
+        FIELD.EMAIL: ("email", "set_email"),
+        FIELD.DESCRIPTION: ("description", "set_description"),
+        FIELD.PRIVATE_DESCRIPTION: (
+                "private_description",
+                "set_private_description"),
+        FIELD.LOCATION: ("location", "set_location"),
+        }
+
+# Fields set by the Task's constructor or its status mutators rather than by
+# a mutator of their own.
+_CONSTRUCTOR_FIELDS = frozenset([
+        FIELD.ID,
+        FIELD.NAME,
+        FIELD.CATEGORY,
+        FIELD.STATUS,
+        ])
+
+
+class FieldSchema(object):
+
+    """A service's field mapping, compiled once with forward and reverse
+    indexes and never changed afterwards.
+
+    Attributes
+    ----------
+    _service_fields : {jack field name, service field name}
+    _jack_fields : {service field name, jack field name}
+    _accessor_fields : {accessor name, jack field name}
+    _embedded_fields : tuple
+        Service field names of the fields in the embedding field.
+    _mutated_fields : tuple
+        (service field name, mutator name) of the fields that are set after
+        the Task is built.
+    _accessed_fields : tuple
+        (service field name, accessor name) of the fields read off a Task,
+        other than the status.
+
+    """
+
+
+    def __init__(self, field_name_map, embedded_fields):
+        self._service_fields = dict(field_name_map)
+        self._jack_fields = dict(
+                (service_field, jack_field)
+                for (jack_field, service_field) in field_name_map.items())
+        self._accessor_fields = dict(
+                (accessor, jack_field)
+                for (jack_field, (accessor, mutator))
+                        in _TASK_PROPERTIES.items())
+        self._embedded_fields = tuple(
+                field_name_map[jack_field] for jack_field in embedded_fields)
+        self._mutated_fields = tuple(
+                (service_field, _TASK_PROPERTIES[jack_field][1])
+                for (jack_field, service_field) in field_name_map.items()
+                if jack_field not in _CONSTRUCTOR_FIELDS)
+        self._accessed_fields = tuple(
+                (service_field, _TASK_PROPERTIES[jack_field][0])
+                for (jack_field, service_field) in field_name_map.items()
+                if jack_field != FIELD.STATUS)
+
+
+    def embedded_fields(self):
+        return self._embedded_fields
+
+
+    def mutated_fields(self):
+        return self._mutated_fields
+
+
+    def accessed_fields(self):
+        return self._accessed_fields
+
+
+    def service_field(self, jack_field_name):
+        """Return the service's name for a Jackalope field."""
+        return self._service_fields[jack_field_name]
+
+
+    def jack_field(self, service_field_name):
+        """Return the Jackalope name for a service field."""
+        return self._jack_fields[service_field_name]
+
+
+    def service_field_from_accessor(self, accessor):
+        """Return the service's name for the field a Task accessor reads."""
+        return self._service_fields[self._accessor_fields[accessor.__name__]]
+
+
 class TaskTransformer(object):
 
     """ Handle parsing the service's response dictionary to construct a Task
     and deconstructing a Task into a raw task dictionary for the service.
 
-    Required:
-    str _embedding_field        The field to use to embed other fields.
+    A TaskTransformer keeps no state between calls, only the FieldSchema its
+    service's field mapping is compiled into. Each service builds one when
+    its module is imported and shares it between all its calls and threads.
 
-    Optional:
-    Task _task      Once the TaskTransformer has been used it stores the Task
-                    for further access.
-    dict _raw_task  Once the TaskTransformer has been used it stores the Task's
-                    dict for further access.
+    Attributes
+    ----------
+    _embedding_field : str, optional
+        The field to use to embed other fields.
+    _schema : `FieldSchema`
 
     """
 
@@ -126,62 +224,71 @@ class TaskTransformer(object):
     def __init__(self, embedding_field=None):
         self._embedding_field = embedding_field
 
-        self._task = None
-        self._raw_task = None
+        embedded_fields = []
+        if embedding_field:
+            embedded_fields = self._embedded_fields()
+        self._schema = FieldSchema(
+                self._get_field_name_map(),
+                embedded_fields)
 
 
-    def get_task(self):
-        """ Return the set task or construct it from the raw_task. """
-        task = None
-        if self._task:
-            task = self._task
-        elif self._raw_task:
-            task = self._construct_task_from_dict()
-        else:
+    def construct_task(self, raw_task):
+        """ Construct a Task from the raw task dict and return it. The Task
+        starts out with no updated fields, since it matches its service. """
+        if not raw_task:
             raise BadTransformationError()
 
+        task = self._construct_task_from_dict(raw_task)
+        task.reset_updated()
         return task
 
 
-    def set_task(self, task):
-        """ Set the Task for this Transformation and make it uneditable. """
-        if self._task or self._raw_task:
+    def deconstruct_task(self, task, with_embedding=True):
+        """ Deconstruct a Task into a raw task dict and return it. Without
+        with_embedding the embedding field is left out and never serialized,
+        which is what an update whose embedded fields didn't change wants. """
+        if not task:
             raise BadTransformationError()
-        else:
-            self._task = task
 
+        return self._deconstruct_task_to_dict(task, with_embedding)
 
-    def get_raw_task(self):
-        """ Return the raw task dict or deconstruct it from task. """
-        raw_task = None
-        if self._raw_task:
-            raw_task = self._raw_task
-        elif self._task:
-            raw_task = self._deconstruct_task_to_dict()
-        else:
-            raise BadTransformationError()
 
-        return raw_task
+    def deconstruct_task_changes(self, task):
+        """ Deconstruct only the fields of a Task that changed since it was
+        loaded into a flat raw task dict and return it. An embedded field
+        that changed brings the whole embedding field along; otherwise the
+        embedding field isn't serialized at all. """
+        has_embedded_changes = self.has_embedded_changes(task)
+        raw_task = self._deconstruct_task_to_dict(task, has_embedded_changes)
 
+        changed_fields = self._get_changed_service_fields(task)
+        if self._embedding_field and has_embedded_changes:
+            changed_fields.add(self._embedding_field)
+
+        return dict([
+                (service_field, value)
+                for (service_field, value) in raw_task.items()
+                if service_field in changed_fields
+                ])
 
-    def set_raw_task(self, raw_task):
-        """ Set the raw task dict for this Transformation and make it
-        uneditable. """
-        if self._raw_task or self._task:
-            raise BadTransformationError()
-        else:
-            self._raw_task = raw_task
 
+    def has_embedded_changes(self, task):
+        """ Return True if a field in the embedding field changed since the
+        Task was loaded. """
+        changed_fields = self._get_changed_service_fields(task)
+        return not changed_fields.isdisjoint(self._schema.embedded_fields())
 
-    def get_embedding_field_value(self):
-        """ Return the value of the Task's embedded field. """
-        return self.get_raw_task().get(self._embedding_field)
 
+    def get_embedding_field_value(self, raw_task):
+        """ Return the value of the embedded field of a deconstructed raw
+        task. """
+        return raw_task.get(self._embedding_field)
 
-    def transform_accessors_to_fields(self, task, accessors):
-        """ Transform a list of accessors to a list of fields (str). """
+
+    def transform_accessors_to_fields(self, accessors):
+        """ Transform a list of Task accessors to a list of fields (str). """
         return [
-                self._get_service_field_name_from_accessor(task, a)
+                self._schema.service_field_from_accessor(a)
                 for a in accessors
                 ]
 
@@ -207,17 +314,16 @@ class TaskTransformer(object):
         return jackalope_blurb
 
 
-    def _construct_task_from_dict(self):
+    def _construct_task_from_dict(self, raw_task):
         """ Construct Task from the raw task.
 
         Return:
         Task The Task built from the raw task.
 
         """
-        raw_task = deepcopy(self._raw_task)
-
-        # flatten raw task dict
-        raw_task = self._flatten_raw_task(raw_task)
+        # flatten a view of the raw task dict, which may be shared through
+        # the UnitOfWork and mustn't change.
+        raw_task = self._flatten_raw_task(RawTaskView(raw_task))
 
         # build task
         if not raw_task.get(self._get_service_field_name(FIELD.ID)):
@@ -234,15 +340,15 @@ class TaskTransformer(object):
         return task
 
 
-    def _deconstruct_task_to_dict(self):
+    def _deconstruct_task_to_dict(self, task, with_embedding=True):
         """ Deconstruct Task into a raw task dict and return it. """
 
         # turn task into dict
         raw_task = {}
-        raw_task = self._populate_raw_task(raw_task, self._task)
+        raw_task = self._populate_raw_task(raw_task, task)
 
         # unflatten raw task dict
-        raw_task = self._unflatten_raw_task(raw_task)
+        raw_task = self._unflatten_raw_task(raw_task, with_embedding)
 
         return raw_task
 
@@ -258,8 +364,7 @@ class TaskTransformer(object):
                     embedding_field_value)
 
             # update raw_task with the embedded fields we can handle
-            for jack_field_name in self._embedded_fields():
-                service_field = self._get_service_field_name(jack_field_name)
+            for service_field in self._schema.embedded_fields():
                 raw_task[service_field] = embedded_fields_dict.get(
                         service_field)
 
@@ -270,9 +375,10 @@ class TaskTransformer(object):
         return raw_task
 
 
-    def _unflatten_raw_task(self, raw_task):
+    def _unflatten_raw_task(self, raw_task, with_embedding=True):
         """ Insert embedded fields into embedding field, remove those fields
-        from the dict, and add the new embedding field to the dict. """
+        from the dict, and add the new embedding field to the dict. Without
+        with_embedding the embedded fields are only removed. """
         # take a jackalope raw task and use service specific knowledge to
         # create service specific fields (e.g., pushing "completed" to asana)
         raw_task = self._push_service_quirks(raw_task)
@@ -281,11 +387,15 @@ class TaskTransformer(object):
 
             # pop embedded fields and insert them into embedding value
             embedded_fields_dict = {}
-            for jack_field_name in self._embedded_fields():
-                service_field = self._get_service_field_name(jack_field_name)
+            for service_field in self._schema.embedded_fields():
                 embedded_fields_dict[service_field] = raw_task.pop(
                         service_field,
                         None)
+
+            # the embedded fields are unchanged, so skip serializing them.
+            if not with_embedding:
+                return raw_task
+
             embedding_field_value = Tokenizer.convert_dict_to_blob(
                     embedded_fields_dict)
 
@@ -318,18 +428,8 @@ class TaskTransformer(object):
         Task The Task built from the raw task.
 
         """
-        for field_name in self._get_field_names():
-            id_cond = field_name != FIELD.ID
-            name_cond = field_name != FIELD.NAME
-            category_cond = field_name != FIELD.CATEGORY
-            status_cond = field_name != FIELD.STATUS
-            if id_cond and name_cond and category_cond and status_cond:
-                service_field_name = self._get_service_field_name(field_name)
-                mutator = self._get_mutator_from_jack_field_name(
-                        task,
-                        field_name)
-
-                mutator(raw_task.get(service_field_name))
+        for (service_field_name, mutator) in self._schema.mutated_fields():
+            getattr(task, mutator)(raw_task.get(service_field_name))
 
         # add status info to task
         status = raw_task.get(self._get_service_field_name(FIELD.STATUS))
@@ -355,13 +455,8 @@ class TaskTransformer(object):
 
     def _populate_raw_task(self, raw_task, task):
         """ Grabs fields from the Task and updates the raw task dict. """
-        for field_name in self._get_field_names():
-            if field_name != FIELD.STATUS:
-                service_field_name = self._get_service_field_name(field_name)
-                accessor = self._get_accessor_from_jack_field_name(
-                        task,
-                        field_name)
-                raw_task[service_field_name] = accessor()
+        for (service_field_name, accessor) in self._schema.accessed_fields():
+            raw_task[service_field_name] = getattr(task, accessor)()
 
         # add status info to raw task
         status = None
@@ -389,9 +484,13 @@ class TaskTransformer(object):
         raise OverrideRequiredError()
 
 
-    def _get_field_names(self):
-        """ Return a list of Jackalope field names. """
-        return [field for field in self._get_field_name_map().keys()]
+    def _get_changed_service_fields(self, task):
+        """ Return a set of the service's names for the Task's updated
+        fields. """
+        return set([
+                self._get_service_field_name(field)
+                for field in task.get_updated_fields()
+                ])
 
 
     def _get_service_field_name(self, jack_field_name):
@@ -405,93 +504,99 @@ class TaskTransformer(object):
         str service's field name.
 
         """
-        return self._get_field_name_map()[jack_field_name]
+        return self._schema.service_field(jack_field_name)
 
 
-    def _get_service_field_name_from_accessor(self, task, accessor):
-        """ Converts the task's accessor to the service's field name.
+    def _get_field_name_map(self):
+        """ Return a dict keyed on Jackalope's field name and valued on the
+        service's field name. Only read once, to compile the FieldSchema. """
+        return {
+                FIELD.CATEGORY: FIELD.CATEGORY,
+                FIELD.ID: FIELD.ID,
+                FIELD.NAME: FIELD.NAME,
+                FIELD.PRICE: FIELD.PRICE,
+                FIELD.EMAIL: FIELD.EMAIL,
+                FIELD.DESCRIPTION: FIELD.DESCRIPTION,
+                FIELD.PRIVATE_DESCRIPTION: FIELD.PRIVATE_DESCRIPTION,
+                FIELD.LOCATION: FIELD.LOCATION,
+                FIELD.STATUS: FIELD.STATUS,
+                }
 
-        Required:
-        Task task - the task whose accessor should be used as a key.
-        function accessor - the Task's accessor to the field.
 
-        Return:
-        str - the service's field name.
+class RawTaskView(object):
 
-        """
-        accessor_to_field_name_dict = {
-                tuple[0]: field_name
-                for field_name, tuple
-                in self._get_field_task_property_map(task).items()
-                }
-        field_name = accessor_to_field_name_dict[accessor]
-        return self._get_service_field_name(field_name)
+    """A raw task dict seen through a layer of changes.
 
+    Flattening and the service quirks rewrite a handful of top-level fields.
+    Writing them to the layer instead of the vendor's dict saves deep-copying
+    the whole payload, nested runner, city and comment structures included,
+    for every Task built.
 
-    def _get_accessor_from_jack_field_name(self, task, jack_field_name):
-        """ Converts Jackalope field name to accessor.
+    Attributes
+    ----------
+    _raw_task : dict
+        Read, never changed.
+    _changes : dict
+        Fields set through the view.
+    _removed : set
+        Fields popped through the view.
 
-        Required:
-        Task task - the Task whose accessor should be returned.
-        str jack_field_name - the name that we use.
+    """
 
-        Return:
-        function - accessor to Task's field.
+    _MISSING = object()
 
-        """
-        (accessor, mutator) = self._get_field_task_property_map(task)[
-                jack_field_name]
-        return accessor
 
+    def __init__(self, raw_task):
+        self._raw_task = raw_task
+        self._changes = {}
+        self._removed = set()
 
-    def _get_mutator_from_jack_field_name(self, task, jack_field_name):
-        """ Converts Jackalope field name to mutator.
 
-        Required:
-        Task task - the Task whose mutator should be returned.
-        str jack_field_name - the name that we use.
+    def __getitem__(self, key):
+        value = self.get(key, self._MISSING)
+        if value is self._MISSING:
+            raise KeyError(key)
+        return value
 
-        Return:
-        function - mutator to Task's field.
 
-        """
-        (accessor, mutator) = self._get_field_task_property_map(task)[
-                jack_field_name]
-        return mutator
+    def __setitem__(self, key, value):
+        self._changes[key] = value
+        self._removed.discard(key)
 
 
-    def _get_field_name_map(self):
-        """ Return a dict keyed on Jackalope's field name and valued on the
-        service's field name. """
-        return {
-                FIELD.CATEGORY: FIELD.CATEGORY,
-                FIELD.ID: FIELD.ID,
-                FIELD.NAME: FIELD.NAME,
-                FIELD.PRICE: FIELD.PRICE,
-                FIELD.EMAIL: FIELD.EMAIL,
-                FIELD.DESCRIPTION: FIELD.DESCRIPTION,
-                FIELD.PRIVATE_DESCRIPTION: FIELD.PRIVATE_DESCRIPTION,
-                FIELD.LOCATION: FIELD.LOCATION,
-                FIELD.STATUS: FIELD.STATUS,
-                }
+    def __contains__(self, key):
+        return self.get(key, self._MISSING) is not self._MISSING
 
 
-    def _get_field_task_property_map(self, task):
-        """ Return a dict keyed on field name and valued by a tuple, (accessor,
-        mutator). """
-        return {
-                FIELD.CATEGORY: (task.category, None),
-                FIELD.ID: (task.id, None),
-                FIELD.NAME: (task.name, None),
-                FIELD.PRICE: (task.price, task.set_price),
-                FIELD.EMAIL: (task.email, task.set_email),
-                FIELD.DESCRIPTION: (task.description, task.set_description),
-                FIELD.PRIVATE_DESCRIPTION: (
-                        task.private_description,
-                        task.set_private_description
-                        ),
-                FIELD.LOCATION: (task.location, task.set_location),
-                }
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
+    def get(self, key, default=None):
+        if key in self._changes:
+            return self._changes[key]
+        elif key in self._removed:
+            return default
+        return self._raw_task.get(key, default)
+
+
+    def pop(self, key, default=_MISSING):
+        value = self.get(key, default)
+        if value is self._MISSING:
+            raise KeyError(key)
+        self._changes.pop(key, None)
+        self._removed.add(key)
+        return value
+
+
+    def to_dict(self):
+        """Return a new dict of the view's top-level fields."""
+        raw_task = dict(
+                (key, value)
+                for (key, value) in self._raw_task.items()
+                if key not in self._removed)
+        raw_task.update(self._changes)
+        return raw_task
 
 
 class CommentTransformer(object):
@@ -521,25 +626,100 @@ class CommentTransformer(object):
         return raw_comment
 
 
+class _LruCache(object):
+
+    """A thread-safe map bounded by the total size of its entries, dropping
+    the least recently used ones when it grows past the limit.
+
+    Attributes
+    ----------
+    _max_bytes : `int`
+    _bytes : `int`
+        Total size of the entries, as given to put.
+    _lock : `threading.Lock`
+    _entries : `OrderedDict`
+        (value, size) for each key, least recently used first.
+
+    """
+
+
+    def __init__(self, max_bytes):
+        self._max_bytes = max_bytes
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+
+    def get(self, key):
+        """Return the value for key, or None."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            self._entries[key] = entry
+            return entry[0]
+
+
+    def put(self, key, value, size):
+        """Store value under key, counting size bytes against the limit. A
+        value bigger than the whole limit isn't stored."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+            if size > self._max_bytes:
+                return
+
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self._max_bytes:
+                (_, (_, dropped_size)) = self._entries.popitem(last=False)
+                self._bytes -= dropped_size
+
+
 class Tokenizer(object):
 
     """ Tokenize a text blob into key value pairs and reconstruct that blob.
+
+    A blob is a series of "key: value" entries, each starting on a line that
+    begins with a word and the delimiter; a value runs up to the next such
+    line. The blob is parsed in one pass over its line starts, matching each
+    only against the anchored key_pattern. This gives the same results as
+    the DOTALL/MULTILINE regex it replaces,
+
+        ^(\w+?):\s?(.*?)(?=^\w+?:|\Z)
+
+    without rescanning the text at every line start. Blobs don't change
+    between most sweeps, so parses are cached on a digest of the blob, up to
+    cache_bytes of blobs.
+
     """
 
     delimiter = unicode(":")
-    regex = unicode(r"^(\w+?){}\s?(.*?)(?=^\w+?{}|\Z)").format(
-            delimiter,
-            delimiter)
-    key_pattern = re.compile(regex, re.DOTALL + re.MULTILINE + re.UNICODE)
+    key_pattern = re.compile(
+            unicode(r"(\w+){}\s?").format(delimiter),
+            re.UNICODE)
+    cache_bytes = 4 * 1024 * 1024
+
+    _blob_cache = _LruCache(cache_bytes)
 
 
     @classmethod
     def convert_blob_to_dict(class_, text_blob):
         """ Convert text blob into dictionary of fields. """
-        return {
-                m[0].lower(): m[1].strip()
-                for m in class_.key_pattern.findall(text_blob)
-                }
+        blob_bytes = text_blob
+        if isinstance(text_blob, unicode):
+            blob_bytes = text_blob.encode("utf-8")
+        digest = hashlib.sha1(blob_bytes).digest()
+
+        field_dict = class_._blob_cache.get(digest)
+        if field_dict is None:
+            field_dict = class_._parse_blob(text_blob)
+            # the fields hold about as much text as the blob they came from.
+            class_._blob_cache.put(digest, field_dict, len(blob_bytes))
+
+        # the cached dict is shared; hand out a copy.
+        return dict(field_dict)
 
 
     @classmethod
@@ -559,6 +739,30 @@ class Tokenizer(object):
         return unicode("\n").join(new_entries)
 
 
+    @classmethod
+    def _parse_blob(class_, text_blob):
+        """ Parse text blob into a dictionary of fields, in one pass. """
+        # (key, value start, line start) of every line that starts an entry.
+        entries = []
+        line_start = 0
+        while line_start != -1:
+            match = class_.key_pattern.match(text_blob, line_start)
+            if match:
+                entries.append((match.group(1), match.end(), line_start))
+            line_start = text_blob.find("\n", line_start)
+            if line_start != -1:
+                line_start += 1
+
+        field_dict = {}
+        for (i, (key, value_start, _)) in enumerate(entries):
+            value_end = len(text_blob)
+            if i + 1 < len(entries):
+                value_end = entries[i + 1][2]
+            field_dict[key.lower()] = text_blob[value_start:value_end].strip()
+
+        return field_dict
+
+
 class BadTransformationError(Exception):
 
     REASON = unicode("Misused the Transformer.")
@@ -18,6 +18,10 @@
     Each service has its own ServiceWorker, TaskTransformer, and
     CommentTransformer subclasses.
 
+    ServiceWorkers read and write raw tasks through the thread's current
+    UnitOfWork, if there is one, so a task is only fetched once while a pair
+    is being reconciled.
+
 """
 import copy
 import json
@@ -25,6 +29,8 @@ import requests
 
 from jutil.errors import OverrideRequiredError, OverrideNotAllowedError
 
+from model.unit_of_work import current_unit_of_work
+
 from .client import REQUEST
 
 
@@ -53,9 +59,13 @@ class ServiceWorker(object):
         raise OverrideRequiredError()
 
 
-    def read_tasks(self):
+    def read_tasks(self, modified_since=None):
         """ Connect to Worker's service and return all tasks.
 
+        modified_since, in epoch seconds, lets a service that can filter
+        return only the tasks modified since then. Services that can't
+        return all of them, which is always safe.
+
         Return:
         dict    all the Tasks keyed on id
 
@@ -78,9 +88,10 @@ class ServiceWorker(object):
         raise OverrideRequiredError()
 
 
-    def read_comments(self, task_id):
+    def read_comments(self, task_id, since_ts=None):
         """Read Comments for a task from service and return a dict keyed on
-        id."""
+        id. A service that can may leave out the comments created before the
+        epoch seconds since_ts."""
         raise OverrideRequiredError()
 
 
@@ -128,6 +139,23 @@ class ServiceWorker(object):
         return response.json
 
 
+    def _read_raw_task(self, task_id, fetch):
+        """Return the raw task dict for task_id, only calling fetch() for it
+        if the current UnitOfWork hasn't already."""
+        work = current_unit_of_work()
+        if work is None:
+            return fetch()
+        return work.read_raw_task(self.name, task_id, fetch)
+
+
+    def _remember_raw_task(self, task_id, raw_task):
+        """Tell the current UnitOfWork that a write left the service's copy of
+        task_id as raw_task."""
+        work = current_unit_of_work()
+        if work is not None and raw_task is not None:
+            work.remember_raw_task(self.name, task_id, raw_task)
+
+
     def _ready_spec(self, task):
         """ Check to make sure task has a ready spec before handing it over to
         the Foreman. """
@@ -177,6 +205,13 @@ class Employer(ServiceWorker):
         raise OverrideNotAllowedError()
 
 
+    def list_task_ids_modified_since(self, modified_since):
+        """ Return the set of unicode ids of the tasks modified since the
+        epoch seconds modified_since, new comments included, or None if the
+        service can't tell. This lists ids only and reads no Tasks. """
+        return None
+
+
 class Employee(ServiceWorker):
 
     """ Abstract superclass for interacting with Employee (e.g., task doers)
@@ -185,3 +220,15 @@ class Employee(ServiceWorker):
 
     def __init__(self):
         raise OverrideRequiredError()
+
+
+    def list_tasks(self):
+        """ Connect to Worker's service and return all tasks as they are.
+        Unlike read_tasks this has no side effects: specs aren't readied and
+        nothing is written back to the service.
+
+        Return:
+        dict    all the Tasks keyed on id
+
+        """
+        raise OverrideRequiredError()
@@ -9,15 +9,24 @@
     This separation between Foreman and Workflow allows for more complicated
     Task combinations in the future.
 
-"""
+    A Workflow reconciles its Tasks in memory, repeating until they stop
+    changing, and then plans the writes that bring the services in line as a
+    list of Actions. Nothing is written while planning; an ActionExecutor
+    runs the Actions afterwards.
 
+"""
+import logging
 from time import time
 
+import settings
 from jutil.errors import OverrideRequiredError
 from jackalope.phrase import Phrase
 
+from .actions import ActionExecutor, AddComment, FerryComment
+from .actions import UpdateCommentCursor, UpdateSynchedTs, UpdateTask
 from .data.db_worker import DbWorker
 from .task import Task, PricedTask, RegistrationTask
+from .transitions import SIDE, TRANSITION_TABLE, TransitionTable
 
 
 class Workflow(object):
@@ -33,6 +42,8 @@ class Workflow(object):
         If Employer initiated this Workflow, then True.
     _task_changed : `bool`
         If the Task has been updated by this Workflow, then True.
+    iterations : `int`
+        Times the Tasks were reconciled before they stopped changing.
 
     """
 
@@ -44,20 +55,53 @@ class Workflow(object):
         self._foreman = foreman
         self._is_employer_workflow = is_employer_workflow
         self._task_changed = False
+        self.iterations = 0
 
         # a Task must have a status before it gets handed to a Workflow.
         if not self._task.has_status():
             raise WorkflowError()
 
 
-    def process(self):
-        """Evaluate the tasks and then use the Workers to process the Tasks,
-        returning a Task if it's been updated or None if it hasn't."""
+    def process(self, max_iterations):
+        """Plan the Workflow and run its Actions. Return the number of
+        iterations it took to converge."""
+        actions = self.plan(max_iterations)
+        ActionExecutor().execute(actions)
+        return self.iterations
+
+
+    def plan(self, max_iterations):
+        """Reconcile the Tasks until they stop changing, or for at most
+        max_iterations, and return the Actions that write the changes to the
+        services."""
         self._jack_task = self._fetch_jack_task(self._task.id(), )
         if self._jack_task is None:
             self._jack_task = self._task
             print "\tDB-TASK-TODO: create - write task to db"
-        self._reconcile_tasks()
+
+        iterations = 1
+        while self._reconcile_tasks():
+            if iterations >= max_iterations:
+                logging.warning(
+                        "task %s still changing after %s iterations",
+                        self._task.id(),
+                        iterations)
+                break
+            iterations += 1
+
+        self.iterations = iterations
+        return self._plan_writes()
+
+
+    def get_fingerprints(self):
+        """Return a list of (vendor_task_id, vendor_name, fingerprint,
+        status_code) of the Workflow's Tasks, to store once its Actions went
+        through."""
+        return [(
+                self._task.id(),
+                self._worker.name,
+                self._task.fingerprint(),
+                self._task.status_code())]
 
 
     def _fetch_jack_task(self, task_id):
@@ -66,8 +110,14 @@ class Workflow(object):
         return None
 
     def _reconcile_tasks(self):
-        """Evaluate the Tasks, update them appropriately, and return a Task if
-        it's been updated or None if it hasn't."""
+        """Evaluate the Tasks, update them in memory, and return True if
+        either one changed."""
+        raise OverrideRequiredError()
+
+
+    def _plan_writes(self):
+        """Return the Actions that write the changed Tasks to their
+        services."""
         raise OverrideRequiredError()
 
 
@@ -77,8 +127,8 @@ class SoloWorkflow(Workflow):
     is not an additional service or Task."""
 
     def _reconcile_tasks(self):
-        """Evaluate the Tasks, update them appropriately, and return a Task if
-        it's been updated or None if it hasn't."""
+        """Evaluate the Tasks, update them in memory, and return True if
+        either one changed."""
         # only process SoloWorkflows from Employers.
         if not self._is_employer_workflow:
             raise WorkflowError()
@@ -87,22 +137,27 @@ class SoloWorkflow(Workflow):
         if self._task.is_posted():
             print "\tDB-TASK-TODO: update - update jack task to completed"
             self._task.set_status_to_completed()
-            self._task = self._worker.update_task()
-            self._worker.add_comment(
-                    self._task.id(),
-                    Phrase.registration_confirmation)
             self._task_changed = True
+            return True
         # if completed, then do nothing.
         elif self._task.is_completed():
-            self._task_changed = False
+            return False
         # any other case is an error.
         else:
             raise WorkflowError()
 
-        updated_task = None
+
+    def _plan_writes(self):
+        """Return the Actions that write the changed Tasks to their
+        services."""
+        actions = []
         if self._task_changed:
-            updated_task = self._task
-        return updated_task
+            actions.append(UpdateTask(self._worker, self._task))
+            actions.append(AddComment(
+                    self._worker,
+                    self._task.id(),
+                    Phrase.registration_confirmation))
+        return actions
 
 
 class PairedWorkflow(Workflow):
@@ -130,98 +185,89 @@ class PairedWorkflow(Workflow):
         self._set_reciprocal_worker_and_task()
 
 
-    def _reconcile_tasks(self):
-        """Evaluate the Tasks, update them appropriately, and return a Task if
-        it's been updated or None if it hasn't."""
+    def get_fingerprints(self):
+        """Return a list of (vendor_task_id, vendor_name, fingerprint,
+        status_code) of the Workflow's Tasks, to store once its Actions went
+        through."""
+        fingerprints = super(PairedWorkflow, self).get_fingerprints()
+        fingerprints.append((
+                self._reciprocal_task.id(),
+                self._reciprocal_worker.name,
+                self._reciprocal_task.fingerprint(),
+                self._reciprocal_task.status_code()))
+        return fingerprints
+
 
-        self._reconcile_statuses()
+    def _reconcile_tasks(self):
+        """Evaluate the Tasks, update them in memory, and return True if
+        either one changed."""
         # self._reconcile_content_between_tasks()
-        self._reconcile_comments()
+        return self._reconcile_statuses()
+
+
+    def _plan_writes(self):
+        """Return the Actions that ferry the comments and write the Tasks
+        that changed to their services."""
+        actions = self._reconcile_comments()
 
         # if either task has changed make sure synch ts is updated and pushed.
-        updated_task = None
         current_ts = int(time())
         if self._task_changed:
-            self._db_worker.update_vendor_synched_ts(
+            actions.append(UpdateSynchedTs(
                     self._task.id(),
                     self._worker.name,
-                    current_ts)
-            updated_task = self._worker.update_task(self._task)
+                    current_ts))
+            actions.append(UpdateTask(self._worker, self._task))
         if self._reciprocal_task_changed:
-            self._db_worker.update_vendor_synched_ts(
+            actions.append(UpdateSynchedTs(
                     self._reciprocal_task.id(),
                     self._reciprocal_worker.name,
-                    current_ts)
-            # TODO: uncomment this line when TaskRabbitWorker.update_task works
-            #self._reciprocal_worker.update_task(self._reciprocal_task)
-        return updated_task
+                    current_ts))
+            actions.append(UpdateTask(
+                    self._reciprocal_worker,
+                    self._reciprocal_task))
+        return actions
 
 
     def _reconcile_statuses(self):
+        """Move the statuses one step closer together in memory and return
+        True, or return False if they already agree."""
         # this assignment makes the code way more readable
-        employer = self._get_employer()
         employer_task = self._get_employer_task()
-        employee = self._get_employee()
         employee_task = self._get_employee_task()
 
         print "employer status:", employer_task._get_status()
         print "employee status:", employee_task._get_status()
 
+        outcome = TRANSITION_TABLE.evaluate(
+                employer_task.status_code(),
+                employee_task.status_code())
+
         # same state
-        if employer_task.has_same_status(employee_task):
+        if outcome == TransitionTable.NO_CHANGE:
             print "Employee and Employer in same STATE"
-
-        # employer created / employee posted
-        elif employer_task.is_created() and employee_task.is_posted():
-            print "Task just POSTED to employee"
-            employer_task.set_status_to_posted()
-            updated_task = employer.update_task(employer_task)
-            self._update_employee_task(updated_task)
-
-        # employer posted / employee assigned
-        elif employer_task.is_posted() and employee_task.is_assigned():
-            print "Task just ASSIGNED to employee."
-            employer_task.set_status_to_assigned()
-            updated_task = employer.update_task(employer_task)
-            self._update_employer_task(updated_task)
-
-        # employee task is completed and employer task is assigned, then update
-        elif (
-                (employer_task.is_posted() or employer_task.is_assigned()) and
-                employee_task.is_completed()
-                ):
-            print "Task just COMPLETED by employee."
-            employer_task.set_status_to_completed()
-            updated_task = employer.update_task(employer_task)
-            self._update_employer_task(updated_task)
-
-        # employer approved / employee completed
-        elif employer_task.is_approved() and employee_task.is_completed():
-            print "Task just APPROVED by employer."
-            employee_task.set_status_to_approved()
-            updated_task = employee.update_task(employee_task)
-            self._update_employee_task(updated_task)
-
-        # employee expired
-        elif employee_task.is_expired():
-            print "Task just EXPIRED by employee."
-            employer_task.set_status_to_expired()
-            updated_task = employer.update_task(employer_task)
-            self._update_employer_task(updated_task)
-
-        # employer canceled
-        elif employer_task.is_canceled():
-            print "Task just CANCELED by employer."
-            employee_task.set_status_to_canceled()
-            updated_task = employee.update_task(employee_task)
-            self._update_employee_task(updated_task)
+            return False
 
         # error state.
-        else:
+        if outcome == TransitionTable.INVALID:
             raise WorkflowError()
 
+        transition = TRANSITION_TABLE.get_transition(outcome)
+        print transition.note
+        if transition.side == SIDE.EMPLOYER:
+            employer_task.set_status_code(transition.status_code)
+            self._set_employer_task_changed()
+        else:
+            employee_task.set_status_code(transition.status_code)
+            self._set_employee_task_changed()
+
+        return True
+
 
     def _reconcile_comments(self):
+        """Return the Actions that ferry the comments after the task's
+        comment cursor to the reciprocal task and move the cursor past
+        them."""
         # sync comments between the services when they've been paired
         # FIXME: Currently only pulls comments from workflow initiator
         # (employer)
@@ -233,17 +279,39 @@ class PairedWorkflow(Workflow):
         reciprocal_task = self._reciprocal_task
         reciprocal_worker = self._reciprocal_worker
 
+        actions = []
         if task.is_assigned() or task.is_completed() or task.is_approved():
-            comments = worker.read_comments(task.id())
+            (cursor_ts, cursor_id) = db_worker.get_comment_cursor(
+                    task.id(),
+                    worker.name)
+            comments = worker.read_comments(task.id(), cursor_ts)
             task.set_comments(comments)
-            synched_ts = db_worker.get_synched_ts(task.id(), worker.name)
-            new_comments = task.get_comments_since_ts(synched_ts)
-            if new_comments:
-                self._task_changed = True
+            new_comments = task.get_comments_after_cursor(cursor_ts, cursor_id)
+            lease_expired_ts = int(time()) - settings.COMMENT_FERRY_LEASE
+            settled_ids = db_worker.get_settled_comment_ids(
+                    [comment.id() for comment in new_comments],
+                    worker.name,
+                    lease_expired_ts)
             for comment in new_comments:
-                reciprocal_worker.add_comment(
+                if unicode(comment.id()) in settled_ids:
+                    continue
+                actions.append(FerryComment(
+                        comment,
+                        task.id(),
+                        worker.name,
+                        reciprocal_worker,
                         reciprocal_task.id(),
-                        comment.message())
+                        lease_expired_ts))
+
+            if new_comments:
+                last_comment = new_comments[-1]
+                actions.append(UpdateCommentCursor(
+                        reciprocal_worker.name,
+                        task.id(),
+                        worker.name,
+                        last_comment.created_ts(),
+                        last_comment.id()))
+        return actions
 
 
     def _get_employer(self):
@@ -279,14 +347,12 @@ class PairedWorkflow(Workflow):
         return employer_task
 
 
-    def _update_employer_task(self, updated_task):
+    def _set_employer_task_changed(self):
         # this conditional allows the Workflow to be initiated by an Employee
         # or Employer
         if self._is_employer_workflow:
-            self._task = updated_task
             self._task_changed = True
         else:
-            self._reciprocal_task = updated_task
             self._reciprocal_task_changed = True
 
 
@@ -301,14 +367,12 @@ class PairedWorkflow(Workflow):
         return employee_task
 
 
-    def _update_employee_task(self, updated_task):
+    def _set_employee_task_changed(self):
         # this conditional allows the Workflow to be initiated by an Employee
         # or Employer
         if self._is_employer_workflow:
-            self._reciprocal_task = updated_task
             self._reciprocal_task_changed = True
         else:
-            self._task = updated_task
             self._task_changed = True
 
 
@@ -354,7 +418,8 @@ class PairedWorkflow(Workflow):
                 self._task.id(),
                 self._worker.name)
 
-        self._task = self._worker.update_task(self._task)
+        # the Task is written by the planned Actions along with any status
+        # change.
         #self._worker.add_comment(
         #        self._task.id(),
         #        Phrase.task_posted_note)
@@ -25,6 +25,126 @@ define("port", default=PORT, help="run on the given port", type=int)
 
 define("config", default=None, help="tornado config file")
 define("debug", default=True, help="debug mode")
+
+# Concurrency
+define(
+        "processes",
+        default=1,
+        help="server processes to fork, 0 for one per CPU",
+        type=int)
+define(
+        "worker_pool_size",
+        default=8,
+        help="threads running blocking vendor and database calls",
+        type=int)
+
+# Webhook intake
+define(
+        "intake_consumers",
+        default=4,
+        help="webhook jobs reconciled concurrently",
+        type=int)
+define(
+        "intake_poll_interval",
+        default=1.0,
+        help="seconds an idle intake consumer waits between polls",
+        type=float)
+define(
+        "intake_lease",
+        default=300,
+        help="seconds a claimed webhook job is hidden from other consumers",
+        type=int)
+define(
+        "intake_max_attempts",
+        default=10,
+        help="claims before a webhook job is given up on",
+        type=int)
+define(
+        "intake_debounce",
+        default=5,
+        help="seconds duplicate task notifications are coalesced for",
+        type=int)
+define(
+        "intake_vendor_concurrency",
+        default=3,
+        help="webhook jobs reconciled concurrently for any one vendor",
+        type=int)
+
+# Admission control
+define(
+        "admission_route_limit",
+        default=100,
+        help="requests in flight per route before answering 503",
+        type=int)
+define(
+        "admission_vendor_limit",
+        default=50,
+        help="requests in flight per vendor before answering 503",
+        type=int)
+define(
+        "admission_limit",
+        default=[],
+        help="per route or vendor limit override as name=limit",
+        multiple=True)
+define(
+        "admission_retry_after",
+        default=5,
+        help="seconds rejected clients are told to wait",
+        type=int)
+
+# Worker registry
+define(
+        "registry_refresh_interval",
+        default=3600,
+        help="seconds between rebuilding the shared vendor workers, 0 never",
+        type=int)
+
+# Sweeper
+define(
+        "sweep_interval",
+        default=300,
+        help="seconds between background sweeps, 0 to only sweep on demand",
+        type=int)
+define(
+        "sweep_full_interval",
+        default=86400,
+        help="seconds between sweeps that read every employer task in full",
+        type=int)
+define(
+        "sweep_concurrency",
+        default=8,
+        help="tasks reconciled concurrently by a sweep",
+        type=int)
+
+# Workflows
+define(
+        "workflow_max_iterations",
+        default=10,
+        help="times a Workflow reconciles a task before giving up converging",
+        type=int)
+define(
+        "synched_ts_buffer_size",
+        default=100,
+        help="synched_ts updates held before a batched write, 0 to write "
+                "each one through",
+        type=int)
+define(
+        "synched_ts_flush_interval",
+        default=10.0,
+        help="most seconds a buffered synched_ts update waits to be written",
+        type=float)
+define(
+        "comment_ferry_lease",
+        default=300,
+        help="seconds before a comment claimed but never marked ferried is "
+                "sent again",
+        type=int)
+define(
+        "write_concurrency",
+        default=8,
+        help="threads running the vendor and database writes Workflows plan",
+        type=int)
+
 options.parse_command_line()
 
 MEDIA_ROOT = path(ROOT, 'media')
@@ -33,6 +153,9 @@ MEDIA_ROOT = path(ROOT, 'media')
 # settings dictionary
 settings = {}
 settings['debug'] = options.debug
+# autoreload, which debug turns on, can't run with forked processes.
+if options.processes != 1:
+    settings['debug'] = False
 settings['static_path'] = MEDIA_ROOT
 #settings['cookie_secret'] = (
 #        "\xee\x0ec\x9bl\x02\xeb/.\xd4\xeb\xc2(\xb0\xb1\x8a\x0b\xb5[^Tq\xecy")
@@ -44,6 +167,36 @@ settings['ui_modules'] = {}
 if options.config:
     tornado.options.parse_config_file(options.config)
 
+PROCESSES = options.processes
+WORKER_POOL_SIZE = options.worker_pool_size
+
+INTAKE_CONSUMERS = options.intake_consumers
+INTAKE_POLL_INTERVAL = options.intake_poll_interval
+INTAKE_LEASE = options.intake_lease
+INTAKE_MAX_ATTEMPTS = options.intake_max_attempts
+INTAKE_DEBOUNCE = options.intake_debounce
+INTAKE_VENDOR_CONCURRENCY = options.intake_vendor_concurrency
+
+ADMISSION_ROUTE_LIMIT = options.admission_route_limit
+ADMISSION_VENDOR_LIMIT = options.admission_vendor_limit
+ADMISSION_LIMITS = dict([
+        (name, int(limit))
+        for (name, limit) in [o.split("=") for o in options.admission_limit]
+        ])
+ADMISSION_RETRY_AFTER = options.admission_retry_after
+
+REGISTRY_REFRESH_INTERVAL = options.registry_refresh_interval
+
+SWEEP_INTERVAL = options.sweep_interval
+SWEEP_FULL_INTERVAL = options.sweep_full_interval
+SWEEP_CONCURRENCY = options.sweep_concurrency
+
+WORKFLOW_MAX_ITERATIONS = options.workflow_max_iterations
+WRITE_CONCURRENCY = options.write_concurrency
+SYNCHED_TS_BUFFER_SIZE = options.synched_ts_buffer_size
+SYNCHED_TS_FLUSH_INTERVAL = options.synched_ts_flush_interval
+COMMENT_FERRY_LEASE = options.comment_ferry_lease
+
 # SERVICES
 MAILGUN_API_KEY = environment.get_unicode(unicode("MAILGUN_API_KEY"))
 MAILGUN_DOMAIN = environment.get_unicode(unicode("MAILGUN_DOMAIN"))
@@ -0,0 +1,132 @@
+"""
+    bench_field_schema
+    ------------------
+
+    Tasks transformed per second through the compiled FieldSchema against
+    the lookups it replaced, which rebuilt the field name map on every call
+    and a dict of the Task's bound accessors and mutators on every field.
+
+    Run from the jackalope directory:
+
+        python -m tests.bench_field_schema [task_count]
+
+"""
+import sys
+import time
+
+from model.worker.transformer import FIELD, VALUE, TaskTransformer
+
+
+_TASK_COUNT = 20000
+
+
+class _Transformer(TaskTransformer):
+
+    """A service with no embedding field, so only the field mapping is
+    timed."""
+
+    def __init__(self):
+        super(_Transformer, self).__init__(None)
+
+
+class _PerCallTransformer(_Transformer):
+
+    """The same service, looking its fields up the way TaskTransformer did
+    before the FieldSchema."""
+
+
+    def _get_service_field_name(self, jack_field_name):
+        return self._get_field_name_map()[jack_field_name]
+
+
+    def _populate_task(self, task, raw_task):
+        for field_name in self._get_field_name_map().keys():
+            if field_name not in (
+                    FIELD.ID,
+                    FIELD.NAME,
+                    FIELD.CATEGORY,
+                    FIELD.STATUS):
+                service_field_name = self._get_service_field_name(field_name)
+                (_, mutator) = self._get_field_task_property_map(task)[
+                        field_name]
+                mutator(raw_task.get(service_field_name))
+
+        status = raw_task.get(self._get_service_field_name(FIELD.STATUS))
+        if status == VALUE.POSTED:
+            task.set_status_to_posted()
+        return task
+
+
+    def _populate_raw_task(self, raw_task, task):
+        for field_name in self._get_field_name_map().keys():
+            if field_name != FIELD.STATUS:
+                service_field_name = self._get_service_field_name(field_name)
+                (accessor, _) = self._get_field_task_property_map(task)[
+                        field_name]
+                raw_task[service_field_name] = accessor()
+
+        status = None
+        if task.is_posted():
+            status = VALUE.POSTED
+        raw_task[self._get_service_field_name(FIELD.STATUS)] = status
+        return raw_task
+
+
+    def _get_field_task_property_map(self, task):
+        return {
+                FIELD.CATEGORY: (task.category, None),
+                FIELD.ID: (task.id, None),
+                FIELD.NAME: (task.name, None),
+                FIELD.PRICE: (task.price, task.set_price),
+                FIELD.EMAIL: (task.email, task.set_email),
+                FIELD.DESCRIPTION: (task.description, task.set_description),
+                FIELD.PRIVATE_DESCRIPTION: (
+                        task.private_description,
+                        task.set_private_description),
+                FIELD.LOCATION: (task.location, task.set_location),
+                }
+
+
+def make_raw_tasks(task_count):
+    return [
+            {
+                    FIELD.ID: index,
+                    FIELD.NAME: unicode("Task {}").format(index),
+                    FIELD.CATEGORY: unicode("cleaning"),
+                    FIELD.PRICE: 40,
+                    FIELD.EMAIL: unicode("jack@example.com"),
+                    FIELD.DESCRIPTION: unicode("Two bedrooms"),
+                    FIELD.PRIVATE_DESCRIPTION: unicode("Key under the mat"),
+                    FIELD.LOCATION: 3,
+                    FIELD.STATUS: VALUE.POSTED,
+                    }
+            for index in xrange(1, task_count + 1)
+            ]
+
+
+def _round_trip(transformer, raw_tasks):
+    for raw_task in raw_tasks:
+        transformer.deconstruct_task(transformer.construct_task(raw_task))
+
+
+def main(task_count=_TASK_COUNT):
+    raw_tasks = make_raw_tasks(task_count)
+    print "%d tasks, constructed and deconstructed" % task_count
+    for (label, transformer) in [
+            ("per call lookups", _PerCallTransformer()),
+            ("FieldSchema", _Transformer()),
+            ]:
+        start = time.time()
+        _round_trip(transformer, raw_tasks)
+        elapsed = time.time() - start
+        print "%-20s %8.1f ms %10.0f tasks/s" % (
+                label,
+                elapsed * 1000,
+                task_count / elapsed)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
@@ -0,0 +1,123 @@
+"""
+    bench_raw_task_view
+    -------------------
+
+    Building Tasks from a large TaskRabbit read_tasks response through the
+    copy-free RawTaskView against deep-copying each raw task first, as the
+    transformers did before. Memory is the size of the working copy each
+    parse makes: the whole payload for a deepcopy, only the overlay for a
+    view.
+
+    Run from the jackalope directory:
+
+        python -m tests.bench_raw_task_view [task_count]
+
+"""
+import sys
+import time
+from copy import deepcopy
+
+from model.worker.task_rabbit_employee import (
+        TASK_RABBIT_FIELD,
+        TASK_RABBIT_VALUE,
+        _task_transformer,
+        )
+from model.worker.transformer import FIELD, RawTaskView
+
+
+_TASK_COUNT = 2000
+
+_COMMENT_COUNT = 40
+
+
+def make_raw_task(index):
+    """Return a raw TaskRabbit task with the nested runner, city and comment
+    structures of a real read_tasks item."""
+    return {
+            FIELD.ID: index,
+            FIELD.NAME: unicode("Task {}").format(index),
+            TASK_RABBIT_FIELD.STATE: TASK_RABBIT_VALUE.ASSIGNED,
+            TASK_RABBIT_FIELD.PRICE: 40,
+            TASK_RABBIT_FIELD.LOCATION: 3,
+            FIELD.DESCRIPTION: unicode("Two bedrooms, one bath"),
+            TASK_RABBIT_FIELD.RUNNER: {
+                    FIELD.ID: index * 7,
+                    TASK_RABBIT_FIELD.EMAIL: unicode("runner@example.com"),
+                    unicode("display_name"): unicode("Jack R."),
+                    unicode("skills"): [unicode("cleaning")] * 5,
+                    },
+            unicode("city"): {
+                    FIELD.ID: 3,
+                    FIELD.NAME: unicode("San Francisco"),
+                    unicode("bounds"): [[37.7, -122.5], [37.8, -122.3]],
+                    },
+            unicode("comments"): [
+                    {
+                            FIELD.ID: comment_index,
+                            unicode("created_at"): unicode(
+                                    "2014-01-01T00:00:00Z"),
+                            TASK_RABBIT_FIELD.CONTENT: unicode(
+                                    "On my way, be there in ten"),
+                            }
+                    for comment_index in xrange(_COMMENT_COUNT)
+                    ],
+            }
+
+
+def deep_sizeof(value):
+    """Return the bytes held by value and everything it contains."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum([
+                deep_sizeof(key) + deep_sizeof(item)
+                for (key, item) in value.items()
+                ])
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum([deep_sizeof(item) for item in value])
+    return size
+
+
+def _overlay_sizeof(view):
+    return (
+            sys.getsizeof(view) +
+            deep_sizeof(view._changes) +
+            deep_sizeof(view._removed))
+
+
+def main(task_count=_TASK_COUNT):
+    raw_tasks = [make_raw_task(index) for index in xrange(1, task_count + 1)]
+
+    start = time.time()
+    for raw_task in raw_tasks:
+        _task_transformer.construct_task(deepcopy(raw_task))
+    deepcopy_s = time.time() - start
+
+    start = time.time()
+    for raw_task in raw_tasks:
+        _task_transformer.construct_task(raw_task)
+    view_s = time.time() - start
+
+    # what the parse of one raw task holds besides the vendor's dict.
+    raw_task = raw_tasks[0]
+    copy_bytes = deep_sizeof(deepcopy(raw_task))
+    view = _task_transformer._flatten_raw_task(RawTaskView(raw_task))
+    view_bytes = _overlay_sizeof(view)
+
+    print "%d tasks of %d bytes each" % (task_count, deep_sizeof(raw_task))
+    print "%-10s %10s %12s %16s" % ("", "ms", "tasks/s", "copy bytes/task")
+    for (label, elapsed, copy_size) in [
+            ("deepcopy", deepcopy_s, copy_bytes),
+            ("view", view_s, view_bytes),
+            ]:
+        print "%-10s %10.1f %12.0f %16d" % (
+                label,
+                elapsed * 1000,
+                task_count / elapsed,
+                copy_size)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
@@ -0,0 +1,141 @@
+"""
+    bench_task_memory
+    -----------------
+
+    Memory held by 100k Tasks and 1M Comments in the slotted, integer status
+    representation against the dict-backed one it replaced, where each Task
+    kept its fields and string status in a _properties dict on top of its
+    instance __dict__ and each Comment had an instance __dict__.
+
+    Each representation is built in its own child process and measured by
+    how much the process's peak resident set grew. Run from the jackalope
+    directory:
+
+        python -m tests.bench_task_memory [task_count comment_count]
+
+"""
+import resource
+import subprocess
+import sys
+
+from model.comment import Comment
+from model.task import STATUS, PricedTask
+
+
+_TASK_COUNT = 100000
+
+_COMMENT_COUNT = 1000000
+
+
+class _DictComment(object):
+
+    def __init__(self, id, created_ts, message):
+        self._id = id
+        self._created_ts = created_ts
+        self._message = message
+
+
+class _DictTask(object):
+
+    def __init__(self, category, id, name):
+        self._category = category
+        self._id = unicode(id)
+        self._name = name
+        self._properties = {
+                "status": None,
+                "description": None,
+                "private_description": None,
+                "email": None,
+                "price": None,
+                "location": None,
+                }
+        self._comments = {}
+        self._updated = False
+
+
+    def set_status_to_assigned(self):
+        self._properties["status"] = STATUS.ASSIGNED
+        self._updated = True
+
+
+    def set_price(self, price):
+        self._properties["price"] = price
+        self._updated = True
+
+
+    def set_comments(self, comments):
+        self._comments = comments
+
+
+_REPRESENTATIONS = {
+        "slotted": (PricedTask, Comment),
+        "dict": (_DictTask, _DictComment),
+        }
+
+
+def build(task_class, comment_class, task_count, comment_count):
+    """Return task_count Tasks sharing comment_count Comments between
+    them."""
+    comments_per_task = comment_count // task_count
+    tasks = []
+    comment_id = 0
+    for index in xrange(task_count):
+        task = task_class(
+                "cleaning",
+                index,
+                unicode("Task {}").format(index))
+        task.set_status_to_assigned()
+        task.set_price(40)
+        comments = {}
+        for _ in xrange(comments_per_task):
+            comments[comment_id] = comment_class(
+                    comment_id,
+                    1388534400 + comment_id,
+                    "On my way")
+            comment_id += 1
+        task.set_comments(comments)
+        tasks.append(task)
+    return tasks
+
+
+def _max_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure(name, task_count, comment_count):
+    """Build one representation in this process and print its peak resident
+    set growth in KB."""
+    (task_class, comment_class) = _REPRESENTATIONS[name]
+    before_kb = _max_rss_kb()
+    tasks = build(task_class, comment_class, task_count, comment_count)
+    print _max_rss_kb() - before_kb
+    return tasks
+
+
+def main(task_count=_TASK_COUNT, comment_count=_COMMENT_COUNT):
+    print "%d tasks, %d comments" % (task_count, comment_count)
+    print "%-10s %12s %16s" % ("", "MB", "bytes/object")
+    for name in ["dict", "slotted"]:
+        output = subprocess.check_output([
+                sys.executable,
+                "-m",
+                "tests.bench_task_memory",
+                "--measure",
+                name,
+                str(task_count),
+                str(comment_count),
+                ])
+        grown_kb = int(output.split()[-1])
+        print "%-10s %12.1f %16.1f" % (
+                name,
+                grown_kb / 1024.0,
+                grown_kb * 1024.0 / (task_count + comment_count))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--measure":
+        measure(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
+    elif len(sys.argv) > 2:
+        main(int(sys.argv[1]), int(sys.argv[2]))
+    else:
+        main()
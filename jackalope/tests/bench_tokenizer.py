@@ -0,0 +1,78 @@
+"""
+    bench_tokenizer
+    ---------------
+
+    Tokenizer parse and serialize times for blobs from 1 KB to 1 MB, parsing
+    both uncached and through the blob cache.
+
+    Run from the jackalope directory:
+
+        python -m tests.bench_tokenizer [repeat]
+
+"""
+import sys
+import time
+
+from model.worker.transformer import Tokenizer
+
+
+_SIZES = [1024, 10 * 1024, 100 * 1024, 1024 * 1024]
+
+_REPEAT = 20
+
+
+def make_blob(size):
+    """Return a blob of about size bytes of "key: value" entries, some of
+    them running over several lines."""
+    entries = []
+    length = 0
+    index = 0
+    while length < size:
+        entry = unicode("field{}: value {}\n  and a second line").format(
+                index,
+                index)
+        entries.append(entry)
+        length += len(entry) + 1
+        index += 1
+    return unicode("\n").join(entries)
+
+
+def _time(repeat, function):
+    start = time.time()
+    for _ in xrange(repeat):
+        function()
+    return (time.time() - start) / repeat
+
+
+def main(repeat=_REPEAT):
+    print "%10s %8s %14s %14s %14s" % (
+            "bytes",
+            "fields",
+            "parse ms",
+            "cached ms",
+            "serialize ms")
+    for size in _SIZES:
+        text_blob = make_blob(size)
+        field_dict = Tokenizer.convert_blob_to_dict(text_blob)
+
+        parse_s = _time(repeat, lambda: Tokenizer._parse_blob(text_blob))
+        cached_s = _time(
+                repeat,
+                lambda: Tokenizer.convert_blob_to_dict(text_blob))
+        serialize_s = _time(
+                repeat,
+                lambda: Tokenizer.convert_dict_to_blob(field_dict))
+
+        print "%10d %8d %14.3f %14.3f %14.3f" % (
+                len(text_blob),
+                len(field_dict),
+                parse_s * 1000,
+                cached_s * 1000,
+                serialize_s * 1000)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
@@ -0,0 +1,129 @@
+"""
+    bench_transitions
+    -----------------
+
+    The elif ladder the transition table replaced against the table, one
+    pair at a time and with the whole sweep evaluated in one pass.
+
+    Run from the jackalope directory:
+
+        python -m tests.bench_transitions [pair_count]
+
+"""
+import random
+import sys
+import time
+from array import array
+
+from model.task import STATUS, STATUS_CODES
+from model.transitions import TRANSITION_TABLE, TransitionTable
+
+
+_PAIR_COUNT = 100000
+
+
+def reconcile_by_ladder(employer_code, employee_code):
+    """Return the outcome the elif ladder of `PairedWorkflow` gave, in the
+    transition table's terms."""
+    employer_status = STATUS_CODES[employer_code]
+    employee_status = STATUS_CODES[employee_code]
+
+    if employer_status == employee_status:
+        return TransitionTable.NO_CHANGE
+
+    elif (
+            employer_status == STATUS.CREATED and
+            employee_status == STATUS.POSTED
+            ):
+        return 0
+
+    elif (
+            employer_status == STATUS.POSTED and
+            employee_status == STATUS.ASSIGNED
+            ):
+        return 1
+
+    elif (
+            employer_status in (STATUS.POSTED, STATUS.ASSIGNED) and
+            employee_status == STATUS.COMPLETED
+            ):
+        return 2
+
+    elif (
+            employer_status == STATUS.APPROVED and
+            employee_status == STATUS.COMPLETED
+            ):
+        return 3
+
+    elif employee_status == STATUS.EXPIRED:
+        return 4
+
+    elif employer_status == STATUS.CANCELED:
+        return 5
+
+    return TransitionTable.INVALID
+
+
+def check_agreement():
+    """Raise AssertionError unless the table gives the ladder's outcome for
+    every pair of status codes."""
+    for employer_code in range(len(STATUS_CODES)):
+        for employee_code in range(len(STATUS_CODES)):
+            expected = reconcile_by_ladder(employer_code, employee_code)
+            actual = TRANSITION_TABLE.evaluate(employer_code, employee_code)
+            assert actual == expected, (employer_code, employee_code)
+
+
+def _time(label, pair_count, function):
+    start = time.time()
+    outcomes = function()
+    elapsed = time.time() - start
+    print "%-24s %8.1f ms %12.0f pairs/s" % (
+            label,
+            elapsed * 1000,
+            pair_count / elapsed)
+    return outcomes
+
+
+def main(pair_count=_PAIR_COUNT):
+    check_agreement()
+
+    rng = random.Random(0)
+    codes = range(1, len(STATUS_CODES))
+    employer_codes = array("b")
+    employee_codes = array("b")
+    for _ in xrange(pair_count):
+        employer_codes.append(rng.choice(codes))
+        employee_codes.append(rng.choice(codes))
+    pairs = zip(employer_codes, employee_codes)
+
+    print "%d pairs" % pair_count
+    ladder_outcomes = _time(
+            "ladder",
+            pair_count,
+            lambda: [
+                    reconcile_by_ladder(employer_code, employee_code)
+                    for (employer_code, employee_code) in pairs
+                    ])
+    table_outcomes = _time(
+            "table, per pair",
+            pair_count,
+            lambda: [
+                    TRANSITION_TABLE.evaluate(employer_code, employee_code)
+                    for (employer_code, employee_code) in pairs
+                    ])
+    many_outcomes = _time(
+            "table, evaluate_many",
+            pair_count,
+            lambda: TRANSITION_TABLE.evaluate_many(
+                    employer_codes,
+                    employee_codes))
+
+    assert ladder_outcomes == table_outcomes == list(many_outcomes)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
@@ -0,0 +1,83 @@
+"""
+    test_actions
+    ------------
+
+    FerryComment's claim, send and mark against the ferried_comments ledger.
+
+"""
+import unittest
+
+from model import actions
+from model.actions import FerryComment
+from model.comment import Comment
+
+
+class _DbWorker(object):
+
+    claimable = True
+    calls = []
+
+    def claim_comment_ferry(self, *args):
+        self.calls.append("claim")
+        return self.claimable
+
+
+    def mark_comment_ferried(self, vendor_comment_id, vendor_name):
+        self.calls.append("mark")
+
+
+    def release_comment_ferry(self, vendor_comment_id, vendor_name):
+        self.calls.append("release")
+
+
+class _Worker(object):
+
+    name = "taskrabbit"
+
+    def __init__(self, fails=False):
+        self.fails = fails
+
+
+    def add_comment(self, task_id, message):
+        _DbWorker.calls.append("post")
+        if self.fails:
+            raise IOError("vendor is down")
+
+
+class FerryCommentTest(unittest.TestCase):
+
+
+    def setUp(self):
+        self.db_worker_class = actions.DbWorker
+        actions.DbWorker = _DbWorker
+        _DbWorker.claimable = True
+        _DbWorker.calls = []
+
+
+    def tearDown(self):
+        actions.DbWorker = self.db_worker_class
+
+
+    def _ferry(self, worker):
+        comment = Comment(3, 0, "on my way")
+        FerryComment(comment, 1, "asana", worker, 2, 0).run()
+
+
+    def test_marked_ferried_after_posting(self):
+        self._ferry(_Worker())
+        self.assertEqual(_DbWorker.calls, ["claim", "post", "mark"])
+
+
+    def test_claim_released_when_posting_fails(self):
+        self.assertRaises(IOError, self._ferry, _Worker(fails=True))
+        self.assertEqual(_DbWorker.calls, ["claim", "post", "release"])
+
+
+    def test_not_posted_without_a_claim(self):
+        _DbWorker.claimable = False
+        self._ferry(_Worker())
+        self.assertEqual(_DbWorker.calls, ["claim"])
+
+
+if __name__ == "__main__":
+    unittest.main()
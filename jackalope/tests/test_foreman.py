@@ -0,0 +1,201 @@
+"""
+    test_foreman
+    ------------
+
+    The employee snapshot a full sweep compares fingerprints against, and
+    how a sweep schedules its pairs.
+
+"""
+import unittest
+
+from model import foreman as foreman_module
+from model.foreman import Foreman
+from model.scheduler import PRIORITY
+from model.task import Task
+from model.worker.task_rabbit_employee import (
+        TaskRabbitEmployee,
+        TASK_RABBIT,
+        TASK_RABBIT_FIELD,
+        )
+
+
+class _Registry(object):
+
+    def __init__(self, employees):
+        self._employees = employees
+
+
+    def get_worker_set(self):
+        return ({}, self._employees)
+
+
+class _Worker(object):
+
+    def __init__(self, name):
+        self.name = name
+
+
+class _DbWorker(object):
+
+    pair_states = {}
+
+    def get_pair_states(self, vendor_task_ids, vendor_name):
+        return self.pair_states
+
+
+    def get_synched_ts_many(self, vendor_task_ids, vendor_name):
+        return {}
+
+
+class ReadEmployeeTasksTest(unittest.TestCase):
+
+
+    def setUp(self):
+        # skip __init__, which wants TaskRabbit credentials.
+        self.employee = TaskRabbitEmployee.__new__(TaskRabbitEmployee)
+        self.writes = []
+        unready_task = {
+                unicode("id"): 7,
+                unicode("name"): unicode(""),
+                unicode("state"): unicode("opened"),
+                }
+        self.employee._get = lambda *args: {
+                TASK_RABBIT_FIELD.ITEMS: [unready_task],
+                }
+        self.employee.update_task = (
+                lambda task: self.writes.append(("update_task", task)))
+        self.employee.request_required_fields = (
+                lambda task: self.writes.append(("request", task)))
+
+
+    def test_unready_uncreated_task_is_listed_as_is(self):
+        foreman = Foreman(_Registry({TASK_RABBIT.VENDOR: self.employee}))
+        employee_tasks = foreman._read_employee_tasks()
+
+        tasks = employee_tasks[TASK_RABBIT.VENDOR]
+        task_id = unicode("7")
+        self.assertEqual(tasks.keys(), [task_id])
+        self.assertFalse(tasks[task_id].is_spec_ready())
+        self.assertFalse(tasks[task_id].is_created())
+        self.assertEqual(self.writes, [])
+
+
+
+class ScheduleSweepTest(unittest.TestCase):
+
+
+    def setUp(self):
+        self.db_worker_class = foreman_module.DbWorker
+        foreman_module.DbWorker = _DbWorker
+        self.employer = _Worker("asana")
+        self.employee_tasks = {TASK_RABBIT.VENDOR: {}}
+        _DbWorker.pair_states = {}
+        self.modified_ids = set()
+
+
+    def tearDown(self):
+        foreman_module.DbWorker = self.db_worker_class
+
+
+    def _add_pair(self, task_id, employer_status, employee_status):
+        task = Task("cleaning", task_id, "Task %s" % task_id)
+        employer_status(task)
+        employee_task = Task("cleaning", task_id + 100, "Task")
+        employee_status(employee_task)
+        self.employee_tasks[TASK_RABBIT.VENDOR][employee_task.id()] = (
+                employee_task)
+        _DbWorker.pair_states[task.id()] = (
+                task.fingerprint(),
+                employee_task.id(),
+                TASK_RABBIT.VENDOR,
+                employee_task.fingerprint(),
+                employee_task.status_code())
+        return task
+
+
+    def _schedule(self, tasks, is_full):
+        employer_reads = [(
+                self.employer,
+                dict([(task.id(), task) for task in tasks]),
+                0,
+                is_full,
+                0,
+                self.modified_ids)]
+        foreman = Foreman(_Registry({}))
+        scheduler = foreman._schedule_sweep(
+                employer_reads,
+                self.employee_tasks,
+                None)
+        return [
+                (scheduled.task, scheduled.priority)
+                for scheduled in scheduler.drain()
+                ]
+
+
+    def test_full_read_skips_settled_unchanged_pairs(self):
+        settled = self._add_pair(
+                1,
+                Task.set_status_to_posted,
+                Task.set_status_to_posted)
+        pending = self._add_pair(
+                2,
+                Task.set_status_to_posted,
+                Task.set_status_to_assigned)
+        scheduled = self._schedule([settled, pending], True)
+        self.assertEqual(
+                [task for (task, _) in scheduled],
+                [pending])
+
+
+    def test_full_read_keeps_pairs_modified_since_the_watermark(self):
+        commented = self._add_pair(
+                1,
+                Task.set_status_to_assigned,
+                Task.set_status_to_assigned)
+        self.modified_ids = set([commented.id()])
+        scheduled = self._schedule([commented], True)
+        self.assertEqual([task for (task, _) in scheduled], [commented])
+
+
+    def test_full_read_skips_nothing_without_modified_ids(self):
+        settled = self._add_pair(
+                1,
+                Task.set_status_to_posted,
+                Task.set_status_to_posted)
+        self.modified_ids = None
+        scheduled = self._schedule([settled], True)
+        self.assertEqual([task for (task, _) in scheduled], [settled])
+
+
+    def test_pending_pairs_go_before_settled_ones(self):
+        settled = self._add_pair(
+                1,
+                Task.set_status_to_posted,
+                Task.set_status_to_posted)
+        pending = self._add_pair(
+                2,
+                Task.set_status_to_posted,
+                Task.set_status_to_assigned)
+        settled.set_price(50)
+        scheduled = self._schedule([settled, pending], False)
+        self.assertEqual(
+                [task for (task, _) in scheduled],
+                [pending, settled])
+
+
+    def test_completed_employee_pair_is_urgent(self):
+        idle = self._add_pair(
+                1,
+                Task.set_status_to_posted,
+                Task.set_status_to_posted)
+        completed = self._add_pair(
+                2,
+                Task.set_status_to_posted,
+                Task.set_status_to_completed)
+        self.assertEqual(
+                self._schedule([idle, completed], False),
+                [(completed, PRIORITY.URGENT), (idle, PRIORITY.IDLE)])
+
+
+if __name__ == "__main__":
+    unittest.main()
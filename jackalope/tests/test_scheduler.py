@@ -0,0 +1,79 @@
+"""
+    test_scheduler
+    --------------
+
+    Priority classes and the order a sweep works through its Tasks.
+
+"""
+import unittest
+
+from model.scheduler import PRIORITY, PriorityScheduler, get_priority
+from model.task import STATUS, STATUS_CODES, Task
+
+
+class _Worker(object):
+
+    def __init__(self, name):
+        self.name = name
+
+
+def _make_task(task_id, set_status):
+    task = Task("cleaning", task_id, "Task %s" % task_id)
+    set_status(task)
+    return task
+
+
+class GetPriorityTest(unittest.TestCase):
+
+
+    def test_completed_employee_posted_employer_is_urgent(self):
+        employer_task = _make_task(1, Task.set_status_to_posted)
+        completed_code = STATUS_CODES.index(STATUS.COMPLETED)
+        self.assertEqual(
+                get_priority(employer_task, completed_code),
+                PRIORITY.URGENT)
+
+
+    def test_posted_pair_is_idle(self):
+        employer_task = _make_task(1, Task.set_status_to_posted)
+        posted_code = STATUS_CODES.index(STATUS.POSTED)
+        self.assertEqual(get_priority(employer_task), PRIORITY.IDLE)
+        self.assertEqual(
+                get_priority(employer_task, posted_code),
+                PRIORITY.IDLE)
+
+
+    def test_more_urgent_side_wins(self):
+        employer_task = _make_task(1, Task.set_status_to_canceled)
+        assigned_code = STATUS_CODES.index(STATUS.ASSIGNED)
+        self.assertEqual(
+                get_priority(employer_task, assigned_code),
+                PRIORITY.URGENT)
+
+
+class PrioritySchedulerTest(unittest.TestCase):
+
+
+    def test_completed_employee_pair_is_scheduled_urgent(self):
+        worker = _Worker("asana")
+        idle_task = _make_task(1, Task.set_status_to_posted)
+        completed_pair_task = _make_task(2, Task.set_status_to_posted)
+
+        scheduler = PriorityScheduler()
+        scheduler.add(worker, idle_task)
+        scheduler.add(
+                worker,
+                completed_pair_task,
+                reciprocal_status_code=STATUS_CODES.index(STATUS.COMPLETED))
+
+        scheduled = scheduler.drain()
+        self.assertEqual(
+                [(item.task, item.priority) for item in scheduled],
+                [
+                        (completed_pair_task, PRIORITY.URGENT),
+                        (idle_task, PRIORITY.IDLE),
+                        ])
+
+
+if __name__ == "__main__":
+    unittest.main()
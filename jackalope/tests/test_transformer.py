@@ -0,0 +1,182 @@
+"""
+    test_transformer
+    ----------------
+
+    Tokenizer parsing, serialization and caching, and when the embedding
+    field is serialized.
+
+"""
+import random
+import unittest
+
+from model.worker.transformer import (
+        FIELD,
+        TaskTransformer,
+        Tokenizer,
+        _LruCache,
+        )
+
+
+_KEY_CHARACTERS = unicode("abcdefghijklmnopqrstuvwxyz0123456789_")
+
+# no newline is followed by a word character, which would start a new key.
+_VALUE_PIECES = [
+        unicode("x"),
+        unicode("Price"),
+        unicode("40"),
+        unicode(" "),
+        unicode(": "),
+        unicode("\n "),
+        unicode("\n- "),
+        u"caf\u00e9",
+        u"\u65e5\u672c",
+        ]
+
+
+def _random_field_dict(rng):
+    field_dict = {}
+    for _ in range(rng.randint(0, 8)):
+        key = unicode("").join([
+                rng.choice(_KEY_CHARACTERS)
+                for _ in range(rng.randint(1, 10))
+                ])
+        value = unicode("").join([
+                rng.choice(_VALUE_PIECES)
+                for _ in range(rng.randint(0, 12))
+                ])
+        field_dict[key] = value.strip()
+    return field_dict
+
+
+class TokenizerTest(unittest.TestCase):
+
+
+    def test_round_trip(self):
+        field_dict = {
+                unicode("address"): unicode("1 Main St\nApt 2"),
+                unicode("price"): unicode("40"),
+                unicode("notes"): u"caf\u00e9: bring keys",
+                }
+
+        text_blob = Tokenizer.convert_dict_to_blob(field_dict)
+        self.assertEqual(Tokenizer.convert_blob_to_dict(text_blob), field_dict)
+        self.assertEqual(
+                Tokenizer.convert_dict_to_blob(
+                        Tokenizer.convert_blob_to_dict(text_blob)),
+                text_blob)
+
+
+    def test_random_round_trips(self):
+        rng = random.Random(22)
+        for _ in range(500):
+            field_dict = _random_field_dict(rng)
+            text_blob = Tokenizer.convert_dict_to_blob(field_dict)
+            self.assertEqual(
+                    Tokenizer.convert_blob_to_dict(text_blob),
+                    field_dict)
+            self.assertEqual(
+                    Tokenizer.convert_dict_to_blob(
+                            Tokenizer.convert_blob_to_dict(text_blob)),
+                    text_blob)
+
+
+    def test_parse(self):
+        text_blob = unicode("Intro line\nPrice: 40\nNotes:first\n  second\n")
+        self.assertEqual(
+                Tokenizer.convert_blob_to_dict(text_blob),
+                {
+                        unicode("price"): unicode("40"),
+                        unicode("notes"): unicode("first\n  second"),
+                        })
+
+
+    def test_cached_parse_is_copied(self):
+        text_blob = unicode("price: 40")
+        field_dict = Tokenizer.convert_blob_to_dict(text_blob)
+        field_dict[unicode("price")] = unicode("0")
+
+        self.assertEqual(
+                Tokenizer.convert_blob_to_dict(text_blob),
+                {unicode("price"): unicode("40")})
+
+
+class LruCacheTest(unittest.TestCase):
+
+
+    def test_bounded_by_bytes(self):
+        cache = _LruCache(10)
+        cache.put("a", 1, 4)
+        cache.put("b", 2, 4)
+        cache.get("a")
+        cache.put("c", 3, 4)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("b"), None)
+        self.assertEqual(cache.get("c"), 3)
+
+
+    def test_skips_values_over_the_limit(self):
+        cache = _LruCache(10)
+        cache.put("a", 1, 4)
+        cache.put("b", 2, 11)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("b"), None)
+
+
+
+class _NotesTransformer(TaskTransformer):
+
+    def __init__(self):
+        super(_NotesTransformer, self).__init__("notes")
+
+
+    def _embedded_fields(self):
+        return [FIELD.DESCRIPTION, FIELD.PRICE, FIELD.STATUS]
+
+
+class EmbeddingTest(unittest.TestCase):
+
+
+    def setUp(self):
+        self.transformer = _NotesTransformer()
+        self.task = self.transformer.construct_task({
+                FIELD.ID: 5,
+                FIELD.NAME: unicode("Walk the dog"),
+                unicode("notes"): unicode("price: 40\nstatus: posted"),
+                })
+
+        self.serialized = []
+        self.convert_dict_to_blob = Tokenizer.__dict__["convert_dict_to_blob"]
+        def convert_dict_to_blob(class_, field_dict):
+            self.serialized.append(field_dict)
+            return self.convert_dict_to_blob.__func__(class_, field_dict)
+        Tokenizer.convert_dict_to_blob = classmethod(convert_dict_to_blob)
+
+
+    def tearDown(self):
+        Tokenizer.convert_dict_to_blob = self.convert_dict_to_blob
+
+
+    def test_unchanged_embedding_is_not_serialized(self):
+        self.task.set_email(unicode("jack@example.com"))
+        raw_task = self.transformer.deconstruct_task_changes(self.task)
+
+        self.assertEqual(
+                raw_task,
+                {FIELD.EMAIL: unicode("jack@example.com")})
+        self.assertEqual(self.serialized, [])
+
+
+    def test_changed_embedding_is_serialized(self):
+        self.task.set_price(50)
+        raw_task = self.transformer.deconstruct_task_changes(self.task)
+
+        self.assertEqual(len(self.serialized), 1)
+        notes_dict = Tokenizer.convert_blob_to_dict(raw_task[unicode("notes")])
+        self.assertEqual(notes_dict[FIELD.PRICE], unicode("50"))
+        self.assertEqual(notes_dict[FIELD.STATUS], unicode("posted"))
+
+
+if __name__ == "__main__":
+    unittest.main()
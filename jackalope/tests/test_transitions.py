@@ -0,0 +1,46 @@
+"""
+    test_transitions
+    ----------------
+
+    The transition table against the elif ladder it replaced.
+
+"""
+import unittest
+from array import array
+
+from model.task import STATUS_CODES
+from model.transitions import TRANSITION_TABLE
+from tests.bench_transitions import reconcile_by_ladder
+
+
+class TransitionTableTest(unittest.TestCase):
+
+
+    def setUp(self):
+        codes = range(len(STATUS_CODES))
+        self.pairs = [
+                (employer_code, employee_code)
+                for employer_code in codes
+                for employee_code in codes
+                ]
+
+
+    def test_evaluate_matches_ladder(self):
+        for (employer_code, employee_code) in self.pairs:
+            self.assertEqual(
+                    TRANSITION_TABLE.evaluate(employer_code, employee_code),
+                    reconcile_by_ladder(employer_code, employee_code))
+
+
+    def test_evaluate_many_matches_evaluate(self):
+        employer_codes = array("b", [pair[0] for pair in self.pairs])
+        employee_codes = array("b", [pair[1] for pair in self.pairs])
+        self.assertEqual(
+                list(TRANSITION_TABLE.evaluate_many(
+                        employer_codes,
+                        employee_codes)),
+                [TRANSITION_TABLE.evaluate(*pair) for pair in self.pairs])
+
+
+if __name__ == "__main__":
+    unittest.main()
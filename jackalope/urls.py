@@ -8,6 +8,7 @@
 from handlers.sendjack import SendJackTaskHandler, SendJackCommentHandler
 from handlers.taskrabbit import TaskRabbitTaskHandler, TaskRabbitCommentHandler
 from handlers.foreman import ForemanHandler
+from handlers.status import AdmissionHandler, MetricsHandler
 
 
 url_patterns = [
@@ -16,4 +17,6 @@ url_patterns = [
         (r"/taskrabbit/tasks/?([0-9]+)?", TaskRabbitTaskHandler),
         (r"/taskrabbit/comments/?([0-9]+)?", TaskRabbitCommentHandler),
         (r"/jackalope", ForemanHandler),
+        (r"/admission", AdmissionHandler),
+        (r"/metrics", MetricsHandler),
         ]